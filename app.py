@@ -1,5 +1,4 @@
 import streamlit as st
-import random
 
 
 # Import custom modules
@@ -7,12 +6,22 @@ from utils import (
     apply_custom_css, 
     display_business_dashboard, 
     display_metric_changes, 
-    apply_scenario_consequences,
-    INITIAL_METRICS, 
     FRANCHISE_SCENARIO_TOPICS
 )
-from scenarios import SCENARIO_DATABASE
-from generator import generate_scenario, generate_simulation_analysis, generate_scenario_topics, generate_random_business_profile
+from engine import Simulation, MAX_DECISIONS
+from generator import (
+    generate_scenario_batch,
+    generate_random_business_profile,
+    stream_scenario,
+    stream_scenario_topics,
+    stream_simulation_analysis,
+    ANALYSIS_INTERRUPTED,
+    parse_simulation_analysis,
+    analysis_cache_key
+)
+from narratives import narrate, impact_label
+from prefetch import ScenarioPrefetcher
+from resolver import get_resolver
 from assets import (
     styled_metric, 
     styled_card, 
@@ -21,6 +30,16 @@ from assets import (
     generate_logo, 
     display_intro_animation
 )
+import profiling
+import session_store
+import telemetry
+
+# Start the metrics exporters configured in the environment (once per process)
+telemetry.start_exporters()
+
+# Time each section of this rerun; ?debug=1 shows the breakdown in the sidebar
+# and ?profile=1 also captures a downloadable cProfile report
+rerun_timer = profiling.start_rerun()
 
 # Set the page configuration
 st.set_page_config(
@@ -29,28 +48,27 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+rerun_timer.lap("set_page_config")
 
 # Apply the CSS
 apply_custom_css()
+rerun_timer.lap("apply_custom_css")
+
+# Resume the session named by ?sid= after a reload, restart or on another replica
+session_store.restore_session()
+rerun_timer.lap("restore session")
 
 # Initialize session state
+# Current page: 0 for the profile, 0.5 for topic selection and 1 once the simulation runs
 if 'step' not in st.session_state:
     st.session_state.step = 0
 
-if 'scenario_history' not in st.session_state:
-    st.session_state.scenario_history = []
-    
-if 'business_metrics' not in st.session_state:
-    st.session_state.business_metrics = INITIAL_METRICS.copy()
-
-if 'current_scenario' not in st.session_state:
-    st.session_state.current_scenario = None
+# Game state lives in the headless simulation engine; this script is a view over it
+if 'simulation' not in st.session_state:
+    st.session_state.simulation = Simulation(MAX_DECISIONS)
 
 if 'custom_scenarios' not in st.session_state:
     st.session_state.custom_scenarios = {}
-    
-if 'game_completed' not in st.session_state:
-    st.session_state.game_completed = False
 
 if 'show_intro' not in st.session_state:
     st.session_state.show_intro = True
@@ -65,31 +83,45 @@ if 'business_profile' not in st.session_state:
 if 'scenario_topics' not in st.session_state:
     st.session_state.scenario_topics = []
 
-if 'current_impact_multipliers' not in st.session_state:
-    st.session_state.current_impact_multipliers = {
-        'cash_flow': 1.0,
-        'customer_satisfaction': 1.0,
-        'growth_potential': 1.0,
-        'risk_level': 1.0
-    }
+# Whether the scenario topics still have to be streamed in on the topic page
+if 'topics_pending' not in st.session_state:
+    st.session_state.topics_pending = False
+
+# Whether the pending topics must be generated afresh instead of taken from the shared cache
+if 'topics_refresh' not in st.session_state:
+    st.session_state.topics_refresh = False
+
+# Custom topic entered with the business profile, used when streaming topics
+if 'profile_custom_topic' not in st.session_state:
+    st.session_state.profile_custom_topic = None
+
+if 'analysis_cache' not in st.session_state:
+    st.session_state.analysis_cache = {}
+
+if 'prefetcher' not in st.session_state:
+    st.session_state.prefetcher = ScenarioPrefetcher()
+
+simulation = st.session_state.simulation
+rerun_timer.lap("session init")
 
 # Callback functions for topic selection
 def select_topic(topic):
     st.session_state.selected_topic = topic
     
-# Number of decisions before summary
-MAX_DECISIONS = 5
+# Generate the scenarios for a whole run in one request when the first scenario is needed
+USE_BATCH_GENERATION = True
+BATCH_SCENARIO_COUNT = 2 * MAX_DECISIONS
 
 def display_scenario_history():
     """Display the history of scenarios and choices made"""
-    if st.session_state.scenario_history:
+    if simulation.history:
         with st.expander("Decision History", expanded=False):
             # Display path visualization
-            path_visual = generate_path_visual(st.session_state.scenario_history)
+            path_visual = generate_path_visual(simulation.history)
             st.markdown(path_visual, unsafe_allow_html=True)
             
             # Display detailed history
-            for i, scenario in enumerate(st.session_state.scenario_history):
+            for i, scenario in enumerate(simulation.history):
                 choice_type = "best_case" if scenario['choice'] == "Best Case" else "worst_case"
                 
                 # Use a container for each history item
@@ -101,97 +133,187 @@ def display_scenario_history():
                         st.error(f"**Step {i+1}: {scenario['topic']}**")
                     
                     st.markdown(f"**Decision:** {scenario['choice']} - {scenario['title']}")
+                    st.markdown(f"*{narrate(scenario['consequences'])}*")
                     st.markdown("**Impact:**")
                     
                     # Show impact with metrics
                     cols = st.columns(4)
                     for j, (metric, value) in enumerate(scenario['consequences'].items()):
-                        formatted_metric = metric.replace("_", " ").title()
-                        prefix = "$" if metric == "cash_flow" else ""
-                        suffix = "%" if metric != "cash_flow" else ""
-                        
                         with cols[j]:
-                            if value > 0 and metric != "risk_level":
-                                st.markdown(f"**{formatted_metric}**: ↑ {prefix}{abs(value)}{suffix}")
-                            elif value < 0 and metric != "risk_level":
-                                st.markdown(f"**{formatted_metric}**: ↓ {prefix}{abs(value)}{suffix}")
-                            elif value > 0 and metric == "risk_level":
-                                st.markdown(f"**{formatted_metric}**: ↑ {prefix}{abs(value)}{suffix}")
-                            elif value < 0 and metric == "risk_level":
-                                st.markdown(f"**{formatted_metric}**: ↓ {prefix}{abs(value)}{suffix}")
-                            else:
-                                st.markdown(f"**{formatted_metric}**: → {prefix}{abs(value)}{suffix}")
+                            st.markdown(impact_label(metric, value))
                     
                     # Add a separator between history items
-                    if i < len(st.session_state.scenario_history) - 1:
+                    if i < len(simulation.history) - 1:
                         st.markdown("---")
 
 def reset_simulation():
     """Reset the simulation to the beginning"""
     st.session_state.step = 0
-    st.session_state.scenario_history = []
-    st.session_state.business_metrics = INITIAL_METRICS.copy()
-    st.session_state.current_scenario = None
+    simulation.reset()
     st.session_state.custom_scenarios = {}
-    st.session_state.game_completed = False
     st.session_state.selected_topic = None  # Ensure topic selection is also reset
     st.session_state.business_profile = None
     st.session_state.scenario_topics = []
-    st.session_state.current_impact_multipliers = {
-        'cash_flow': 1.0,
-        'customer_satisfaction': 1.0,
-        'growth_potential': 1.0,
-        'risk_level': 1.0
-    }
+    st.session_state.topics_pending = False
+    st.session_state.topics_refresh = False
+    st.session_state.profile_custom_topic = None
+    st.session_state.prefetcher.clear()
+
+def generate_scenario_data(scenario_key, business_profile):
+    """Generate a scenario, taking the prefetched result if there is one"""
+    scenario_data = st.session_state.prefetcher.pop(scenario_key, business_profile)
+    if scenario_data is not None:
+        return scenario_data
+    
+    # On the first step, generate the whole run at once; later steps then
+    # resolve from the session instead of making a request each
+    if USE_BATCH_GENERATION and not simulation.history:
+        batch = generate_scenario_batch(scenario_key, business_profile, BATCH_SCENARIO_COUNT)
+        if batch:
+            st.session_state.custom_scenarios.update(
+                (topic, scenario) for topic, scenario in batch.items() if topic != scenario_key
+            )
+            return batch[scenario_key]
+    
+    # Stream the scenario so its description shows before the options are complete
+    description_placeholder = st.empty()
+    for part, value in stream_scenario(scenario_key, business_profile, use_cache=False):
+        if part == "description":
+            description_placeholder.markdown(f"**{scenario_key}:** {value}")
+        else:
+            scenario_data = value
+    description_placeholder.empty()
+    return scenario_data
 
 def get_scenario_data(scenario_key):
-    """Get the scenario data from either predefined or custom scenarios"""
-    # Check if the scenario is in the predefined database
-    if scenario_key in SCENARIO_DATABASE:
-        return SCENARIO_DATABASE[scenario_key]
-        
-    # Check if we already have a generated version in custom_scenarios
-    if scenario_key in st.session_state.custom_scenarios:
-        return st.session_state.custom_scenarios[scenario_key]
-    
-    # Only use LLM for custom scenarios explicitly entered by the user
-    custom_scenario = generate_scenario(scenario_key, st.session_state.business_profile)
-    st.session_state.custom_scenarios[scenario_key] = custom_scenario
-    return custom_scenario
+    """Get the scenario data from the predefined database, the session, the shared cache or the LLM"""
+    scenario_data, tier = get_resolver().resolve(
+        scenario_key,
+        st.session_state.business_profile,
+        st.session_state.custom_scenarios,
+        generate=generate_scenario_data
+    )
+    st.session_state.current_scenario_tier = tier
+    return scenario_data
 
-def choose_scenario(topic, choice, title, consequences, next_scenarios):
+def choose_scenario(scenario_data, option):
     """Process the user's scenario choice and move to the next step"""
-    # Apply impact multipliers to consequences
-    adjusted_consequences = {
-        metric: int(value * st.session_state.current_impact_multipliers[metric])
-        for metric, value in consequences.items()
-    }
-    
-    # Record the choice
-    st.session_state.scenario_history.append({
-        'topic': topic,
-        'choice': choice,
-        'title': title,
-        'consequences': adjusted_consequences
-    })
-    
-    # Apply consequences to metrics
-    st.session_state.business_metrics = apply_scenario_consequences(adjusted_consequences, st.session_state.business_metrics)
-    
-    # Check if we've reached the maximum number of decisions
-    if len(st.session_state.scenario_history) >= MAX_DECISIONS:
-        st.session_state.game_completed = True
-        return
-    
-    # Set up next scenario
-    if next_scenarios:
-        st.session_state.current_scenario = random.choice(next_scenarios)
-    else:
-        # Generate a new scenario based on the business profile
-        st.session_state.current_scenario = generate_scenario(st.session_state.business_profile)
+    # The engine applies the impact multipliers to the consequences
+    next_topic = simulation.choose(scenario_data, option)
+    
+    # Only the chosen next scenario is reachable now, so drop the other branches
+    st.session_state.prefetcher.retain([next_topic] if next_topic else [])
+
+def display_impact(consequences):
+    """Display the multiplied consequences of an option as one column per metric"""
+    impact_cols = st.columns(4)
+    for i, (metric, value) in enumerate(simulation.adjusted_consequences(consequences).items()):
+        with impact_cols[i]:
+            st.markdown(impact_label(metric, value))
+
+def display_option(scenario_data, option):
+    """Display one decision option with its impact and the button choosing it"""
+    best_case = option == 'best_case'
+    with st.container():
+        st.markdown(f"#### {'✅' if best_case else '⚠️'} {scenario_data[option]['title']}")
+        if best_case:
+            st.success(scenario_data[option]['description'])
+        else:
+            st.error(scenario_data[option]['description'])
+        
+        # Show consequences
+        st.markdown("**Impact:**")
+        display_impact(scenario_data[option]['consequences'])
+    
+    if st.button(f"Choose {'Best' if best_case else 'Worst'} Case", key=f"{option}_btn"):
+        choose_scenario(scenario_data, option)
+        # Clear the cached scenario data to force a new API call for the next scenario
+        if 'current_scenario_data' in st.session_state:
+            del st.session_state.current_scenario_data
+            del st.session_state.current_scenario_data_key
+        # Choosing changes the whole page, so rerun the app and not only the fragment
+        st.rerun()
+
+def update_multiplier(metric):
+    """Slider callback copying the new multiplier into the simulation"""
+    simulation.set_multiplier(metric, st.session_state[f"{metric}_slider"])
+    # Slider changes only rerun the fragment, which never reaches the end of the script
+    session_store.persist_session()
+
+def multiplier_slider(label, metric, first=False):
+    """Display the impact multiplier slider of one metric"""
+    key = f"{metric}_slider"
+    # The slider keeps its value in session state, so it is only seeded from the
+    # simulation; passing value= would give the widget a new identity on every change
+    if key not in st.session_state:
+        st.session_state[key] = simulation.multipliers[metric]
+    
+    # Larger label with custom styling
+    margin = "" if first else " margin-top: 1em;"
+    st.markdown(f"<div style='font-size: 1.1em; font-weight: 500; margin-bottom: 0.2em;{margin}'>{label}</div>", unsafe_allow_html=True)
+    # Smaller slider
+    st.slider(
+        "##",  # Hide the actual label
+        min_value=0.0,
+        max_value=2.0,
+        step=0.1,
+        key=key,
+        on_change=update_multiplier,
+        args=(metric,)
+    )
+
+@st.fragment
+def display_decision_options(scenario_data):
+    """
+    Display both options and the impact multiplier sliders
+
+    Runs as a fragment: moving a slider updates the multiplier in its
+    callback and reruns only this function, so the impact numbers change
+    without redrawing the dashboard, history and sidebar.
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        display_option(scenario_data, 'best_case')
+    with col2:
+        display_option(scenario_data, 'worst_case')
+    
+    # Add impact multiplier sliders
+    st.markdown("---")
+    st.markdown("<h4 style='font-size: 1.2em; margin-bottom: 0.5em;'>Adjust Impact Multipliers</h4>", unsafe_allow_html=True)
+    st.info("Use the sliders below to adjust how much each decision affects different aspects of your business.")
     
-    # Increment step
-    st.session_state.step += 1
+    col1, col2 = st.columns(2)
+    with col1:
+        multiplier_slider("Cash Flow Impact", 'cash_flow', first=True)
+        multiplier_slider("Customer Satisfaction Impact", 'customer_satisfaction')
+    with col2:
+        multiplier_slider("Growth Potential Impact", 'growth_potential', first=True)
+        multiplier_slider("Risk Level Impact", 'risk_level')
+
+def analysis_box_html(analysis):
+    """Wrap the business analysis in a highlighted box"""
+    return f"""
+        <div style="background-color: #2a3f5f; border-left: 5px solid #4e89ae; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;">
+            <p style="color: #ffffff; font-size: 1rem; line-height: 1.5; margin: 0;">
+                {analysis}
+            </p>
+        </div>
+        """
+
+def display_topic_option(topic, index, cols):
+    """Display one scenario topic card with its select button in a row of three columns"""
+    row_start, column = index - index % 3, index % 3
+    with cols[column]:
+        # Use a more contrasting background with clear text styling
+        st.markdown(f"""
+        <div style="background-color: #2c3e50; padding: 1rem; border-radius: 0.5rem; margin-bottom: 1rem; min-height: 80px; color: white; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
+            <h4 style="margin-top: 0; margin-bottom: 0.5rem; color: white;">{topic}</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        if st.button(f"Select", key=f"select_{row_start}_{column}"):
+            simulation.start(topic)
+            st.session_state.step = 1
+            st.rerun()
 
 def display_summary():
     """Display a summary of the simulation results"""
@@ -201,40 +323,59 @@ def display_summary():
     with st.container():
         st.info("Your franchise journey has concluded. Here's how your business is performing after all your decisions:")
     
-    display_business_dashboard(st.session_state.business_metrics)
+    display_business_dashboard(simulation.metrics)
+    rerun_timer.lap("summary dashboard")
     
     # Display path visualization
-    path_visual = generate_path_visual(st.session_state.scenario_history, width=800, height=200, text_color="#ffffff")
+    path_visual = generate_path_visual(simulation.history, width=800, height=200, text_color="#ffffff")
     st.markdown("### Your Decision Path", unsafe_allow_html=False)
     st.markdown(path_visual, unsafe_allow_html=True)
+    rerun_timer.lap("summary path")
     
     # Generate and display AI analysis of decisions
     st.markdown("### Business Analysis")
     
     # Only generate analysis if we have a proper simulation history
-    if len(st.session_state.scenario_history) > 0:
-        with st.spinner("Generating business analysis..."):
-            analysis = generate_simulation_analysis(
-                st.session_state.scenario_history, 
-                st.session_state.business_metrics,
+    if len(simulation.history) > 0:
+        # Reruns of the summary page reuse the analysis instead of regenerating it
+        analysis_key = analysis_cache_key(
+            simulation.history,
+            simulation.metrics,
+            st.session_state.business_profile
+        )
+        analysis = st.session_state.analysis_cache.get(analysis_key)
+        analysis_placeholder = st.empty()
+        if analysis is None:
+            # Render the analysis progressively as it streams in
+            streamed_analysis = ""
+            interrupted = False
+            for chunk in stream_simulation_analysis(
+                simulation.history, 
+                simulation.metrics,
                 st.session_state.business_profile
-            )
+            ):
+                if chunk is ANALYSIS_INTERRUPTED:
+                    # The stream broke off; the fallback analysis replaces the partial text
+                    streamed_analysis = ""
+                    interrupted = True
+                    continue
+                streamed_analysis += chunk
+                analysis_placeholder.markdown(analysis_box_html(streamed_analysis), unsafe_allow_html=True)
+            analysis = parse_simulation_analysis(streamed_analysis)
+            # Keep an interrupted analysis out of the session so the next rerun tries again
+            if not interrupted:
+                st.session_state.analysis_cache[analysis_key] = analysis
         
         # Display analysis in a highlighted box
-        st.markdown(f"""
-        <div style="background-color: #2a3f5f; border-left: 5px solid #4e89ae; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;">
-            <p style="color: #ffffff; font-size: 1rem; line-height: 1.5; margin: 0;">
-                {analysis}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        analysis_placeholder.markdown(analysis_box_html(analysis), unsafe_allow_html=True)
     else:
         st.info("No simulation data available for analysis.")
+    rerun_timer.lap("summary analysis")
     
     # Display key insights
     st.markdown("### Key Decisions", unsafe_allow_html=False)
     
-    for i, decision in enumerate(st.session_state.scenario_history):
+    for i, decision in enumerate(simulation.history):
         choice_type = "best_case" if decision['choice'] == "Best Case" else "worst_case"
         
         # Create a container for each decision
@@ -251,73 +392,8 @@ def display_summary():
             # Generate a summary of how this choice affected metrics
             consequences = decision['consequences']
             
-            # Create human-friendly descriptions for the impact of each metric
-            # Cash flow impact descriptions
-            if consequences['cash_flow'] >= 30000:
-                cash_desc = "significantly boosted your finances"
-            elif consequences['cash_flow'] >= 10000:
-                cash_desc = "improved your cash position"
-            elif consequences['cash_flow'] > 0:
-                cash_desc = "slightly increased available funds"
-            elif consequences['cash_flow'] <= -30000:
-                cash_desc = "caused a major financial setback"
-            elif consequences['cash_flow'] <= -10000:
-                cash_desc = "created a notable financial strain"
-            elif consequences['cash_flow'] < 0:
-                cash_desc = "required a small financial investment"
-            else:
-                cash_desc = "had no financial impact"
-            
-            # Customer satisfaction impact
-            if consequences['customer_satisfaction'] >= 15:
-                satisfaction_desc = "delighted your customers"
-            elif consequences['customer_satisfaction'] >= 5:
-                satisfaction_desc = "made customers noticeably happier"
-            elif consequences['customer_satisfaction'] > 0:
-                satisfaction_desc = "slightly improved the customer experience"
-            elif consequences['customer_satisfaction'] <= -15:
-                satisfaction_desc = "seriously disappointed customers"
-            elif consequences['customer_satisfaction'] <= -5:
-                satisfaction_desc = "created some customer dissatisfaction"
-            elif consequences['customer_satisfaction'] < 0:
-                satisfaction_desc = "slightly upset some customers"
-            else:
-                satisfaction_desc = "kept customers at their current satisfaction level"
-            
-            # Growth potential impact
-            if consequences['growth_potential'] >= 15:
-                growth_desc = "created significant new growth opportunities"
-            elif consequences['growth_potential'] >= 5:
-                growth_desc = "opened up new growth avenues"
-            elif consequences['growth_potential'] > 0:
-                growth_desc = "slightly improved future prospects"
-            elif consequences['growth_potential'] <= -15:
-                growth_desc = "severely limited growth opportunities"
-            elif consequences['growth_potential'] <= -5:
-                growth_desc = "constrained some growth options"
-            elif consequences['growth_potential'] < 0:
-                growth_desc = "slightly narrowed future possibilities"
-            else:
-                growth_desc = "maintained current growth trajectory"
-            
-            # Risk level impact
-            if consequences['risk_level'] >= 15:
-                risk_desc = "substantially increased business vulnerability"
-            elif consequences['risk_level'] >= 5:
-                risk_desc = "introduced new risk elements"
-            elif consequences['risk_level'] > 0:
-                risk_desc = "slightly raised exposure to risk"
-            elif consequences['risk_level'] <= -15:
-                risk_desc = "dramatically improved business security"
-            elif consequences['risk_level'] <= -5:
-                risk_desc = "improved business stability"
-            elif consequences['risk_level'] < 0:
-                risk_desc = "slightly reduced business vulnerability"
-            else:
-                risk_desc = "kept risk levels steady"
-            
-            # Combine into a natural-sounding summary
-            summary = f"This decision {cash_desc}. It {satisfaction_desc}, {growth_desc}, and {risk_desc}."
+            # Describe the impact of the decision in a natural-sounding sentence
+            summary = narrate(consequences)
             
             st.markdown(f"*{summary}*")
                 
@@ -327,25 +403,14 @@ def display_summary():
             # Add metrics display
             cols = st.columns(4)
             for j, (metric, value) in enumerate(decision['consequences'].items()):
-                formatted_metric = metric.replace("_", " ").title()
-                prefix = "$" if metric == "cash_flow" else ""
-                suffix = "%" if metric != "cash_flow" else ""
-                
                 with cols[j]:
-                    if value > 0 and metric != "risk_level":
-                        st.markdown(f"**{formatted_metric}**: ↑ {prefix}{abs(value)}{suffix}")
-                    elif value < 0 and metric != "risk_level":
-                        st.markdown(f"**{formatted_metric}**: ↓ {prefix}{abs(value)}{suffix}")
-                    elif value > 0 and metric == "risk_level":
-                        st.markdown(f"**{formatted_metric}**: ↑ {prefix}{abs(value)}{suffix}")
-                    elif value < 0 and metric == "risk_level":
-                        st.markdown(f"**{formatted_metric}**: ↓ {prefix}{abs(value)}{suffix}")
-                    else:
-                        st.markdown(f"**{formatted_metric}**: → {prefix}{abs(value)}{suffix}")
+                    st.markdown(impact_label(metric, value))
             
             # Add separator
             st.markdown("---")
     
+    rerun_timer.lap("summary decisions")
+    
     # Offer option to restart
     col1, col2 = st.columns([1, 3])
     with col1:
@@ -407,6 +472,9 @@ if st.session_state.show_intro:
             st.session_state.show_intro = False
             st.rerun()
     
+    rerun_timer.lap("intro")
+    session_store.persist_session()
+    profiling.end_rerun(rerun_timer)
     st.stop()
 
 # Main header - only show on start page
@@ -418,10 +486,14 @@ else:
     st.sidebar.title("🏢 Franchise Cockpit Simulator")
     st.sidebar.markdown("### Explore the outcomes of different franchise decisions")
     st.sidebar.markdown("---")  # Add a separator after the header
+rerun_timer.lap("header")
 
 # Check if game is completed
-if st.session_state.game_completed:
+if simulation.completed:
     display_summary()
+    rerun_timer.lap("summary controls")
+    session_store.persist_session()
+    profiling.end_rerun(rerun_timer)
     st.stop()
 
 # Step 0: Business Profile Input
@@ -468,20 +540,13 @@ if st.session_state.step == 0:
         with col1:
             submitted = st.form_submit_button("Generate Scenarios")
             if submitted and business_profile:
-                with st.spinner("Generating personalized scenarios..."):
-                    # Generate scenario topics based on business profile
-                    st.session_state.scenario_topics = generate_scenario_topics(
-                        business_profile,
-                        uploaded_files,
-                        custom_topic
-                    )
-                    
-                    if st.session_state.scenario_topics:
-                        st.session_state.business_profile = business_profile
-                        st.session_state.step = 0.5  # Use intermediate step for topic selection
-                        st.rerun()
-                    else:
-                        st.error("Failed to generate scenarios. Please try again with more detailed business information.")
+                # Scenario topics are streamed in on the topic selection page
+                st.session_state.business_profile = business_profile
+                st.session_state.profile_custom_topic = custom_topic
+                st.session_state.scenario_topics = []
+                st.session_state.topics_pending = True
+                st.session_state.step = 0.5  # Use intermediate step for topic selection
+                st.rerun()
         
         with col2:
             if st.form_submit_button("Generate Random Profile"):
@@ -516,6 +581,7 @@ if st.session_state.step == 0:
         - Reduce operational costs
         - Increase market share
         """)
+    rerun_timer.lap("profile page")
 
 # Step 0.5: Topic Selection (intermediate step)
 elif st.session_state.step == 0.5:
@@ -532,22 +598,28 @@ elif st.session_state.step == 0.5:
     st.markdown("### Available Scenarios")
     
     # Create rows of 3 topics each
-    for i in range(0, len(st.session_state.scenario_topics), 3):
-        cols = st.columns(3)
-        for j in range(3):
-            if i + j < len(st.session_state.scenario_topics):
-                topic = st.session_state.scenario_topics[i + j]
-                with cols[j]:
-                    # Use a more contrasting background with clear text styling
-                    st.markdown(f"""
-                    <div style="background-color: #2c3e50; padding: 1rem; border-radius: 0.5rem; margin-bottom: 1rem; min-height: 80px; color: white; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-                        <h4 style="margin-top: 0; margin-bottom: 0.5rem; color: white;">{topic}</h4>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    if st.button(f"Select", key=f"select_{i}_{j}"):
-                        st.session_state.current_scenario = topic
-                        st.session_state.step = 1
-                        st.rerun()
+    if st.session_state.topics_pending:
+        # Show each topic as soon as its line of the generation arrives
+        with st.spinner("Generating personalized scenarios..."):
+            topics = []
+            for topic in stream_scenario_topics(
+                st.session_state.business_profile,
+                None,  # Uploaded files are not used for topic generation
+                st.session_state.profile_custom_topic,
+                use_cache=not st.session_state.topics_refresh
+            ):
+                if len(topics) % 3 == 0:
+                    cols = st.columns(3)
+                display_topic_option(topic, len(topics), cols)
+                topics.append(topic)
+        st.session_state.scenario_topics = topics
+        st.session_state.topics_pending = False
+        st.session_state.topics_refresh = False
+    else:
+        for i, topic in enumerate(st.session_state.scenario_topics):
+            if i % 3 == 0:
+                cols = st.columns(3)
+            display_topic_option(topic, i, cols)
     
     # Option to add a custom topic
     st.markdown("### Or Enter Your Own Topic")
@@ -556,224 +628,80 @@ elif st.session_state.step == 0.5:
         user_custom_topic = st.text_input("Custom topic:", placeholder="Enter your own scenario topic")
     with custom_topic_col2:
         if st.button("Add Topic", disabled=not user_custom_topic):
-            st.session_state.current_scenario = user_custom_topic
+            simulation.start(user_custom_topic)
             st.session_state.step = 1
             st.rerun()
             
     # Option to regenerate topics
     if st.button("Regenerate Topics"):
-        with st.spinner("Generating new scenario topics..."):
-            st.session_state.scenario_topics = generate_scenario_topics(
-                st.session_state.business_profile,
-                None,  # No files for regeneration
-                None   # No custom topic for regeneration
-            )
-            st.rerun()
+        st.session_state.scenario_topics = []
+        st.session_state.profile_custom_topic = None  # No custom topic for regeneration
+        st.session_state.topics_pending = True
+        st.session_state.topics_refresh = True
+        st.rerun()
+    rerun_timer.lap("topic page")
 
 # Step 1+: Scenario handling
 elif st.session_state.step > 0:
-    current_scenario_key = st.session_state.current_scenario
+    current_scenario_key = simulation.current_topic
     
-    # Cache the scenario data in session state to avoid API calls when adjusting sliders
+    # Cache the scenario data in session state to avoid API calls on later reruns.
+    # The scenario is never modified; the multipliers are applied when displaying and choosing
     if 'current_scenario_data' not in st.session_state or st.session_state.current_scenario_data_key != current_scenario_key:
         with st.spinner("Generating scenario..."):
-            scenario_data = generate_scenario(current_scenario_key, st.session_state.business_profile)
+            scenario_data = get_scenario_data(current_scenario_key)
             st.session_state.current_scenario_data = scenario_data
             st.session_state.current_scenario_data_key = current_scenario_key
-            
-            # Save the original consequences to session state
-            if 'original_best_consequences' not in st.session_state:
-                st.session_state.original_best_consequences = {}
-            if 'original_worst_consequences' not in st.session_state:
-                st.session_state.original_worst_consequences = {}
-                
-            st.session_state.original_best_consequences = scenario_data['best_case']['consequences'].copy()
-            st.session_state.original_worst_consequences = scenario_data['worst_case']['consequences'].copy()
     else:
         scenario_data = st.session_state.current_scenario_data
-        
-        # Update the consequences based on the current multipliers
-        for metric, value in st.session_state.original_best_consequences.items():
-            scenario_data['best_case']['consequences'][metric] = int(value * st.session_state.current_impact_multipliers[metric])
-            
-        for metric, value in st.session_state.original_worst_consequences.items():
-            scenario_data['worst_case']['consequences'][metric] = int(value * st.session_state.current_impact_multipliers[metric])
+    
+    # Start generating every scenario the user can reach next while they decide,
+    # skipping topics that are already available without a network call
+    if scenario_data and simulation.step < MAX_DECISIONS:
+        st.session_state.prefetcher.prefetch(
+            [
+                topic
+                for topic in scenario_data['best_case']['next_scenarios'] + scenario_data['worst_case']['next_scenarios']
+                if not get_resolver().is_local(topic, st.session_state.custom_scenarios)
+            ],
+            st.session_state.business_profile
+        )
+    rerun_timer.lap("scenario load")
     
     if scenario_data:
         # Show progress
-        progress_text = f"Decision {st.session_state.step} of {MAX_DECISIONS}"
-        st.progress(st.session_state.step / MAX_DECISIONS, text=progress_text)
+        progress_text = f"Decision {simulation.step} of {MAX_DECISIONS}"
+        st.progress(simulation.step / MAX_DECISIONS, text=progress_text)
         
         # 1. FIRST: Display business health dashboard
-        display_business_dashboard(st.session_state.business_metrics)
+        display_business_dashboard(simulation.metrics)
+        rerun_timer.lap("dashboard")
         
         # 2. SECOND: Display scenario description and options
-        st.markdown(f"<h2>Scenario {st.session_state.step}: {current_scenario_key}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2>Scenario {simulation.step}: {current_scenario_key}</h2>", unsafe_allow_html=True)
         
         # Display scenario description using native Streamlit components
         with st.container():
             st.subheader(current_scenario_key)
             st.markdown(scenario_data['description'])
         
+        rerun_timer.lap("scenario description")
+        
         # Show decision options
         st.markdown("<h3>Choose Your Path</h3>", unsafe_allow_html=True)
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Replace styled scenario option with native Streamlit components
-            with st.container():
-                st.markdown(f"#### ✅ {scenario_data['best_case']['title']}")
-                st.success(scenario_data['best_case']['description'])
-                
-                # Show consequences
-                st.markdown("**Impact:**")
-                impact_cols = st.columns(4)
-                for i, (metric, value) in enumerate(scenario_data['best_case']['consequences'].items()):
-                    metric_name = metric.replace("_", " ").title()
-                    prefix = "$" if metric == "cash_flow" else ""
-                    suffix = "%" if metric != "cash_flow" else ""
-                    
-                    with impact_cols[i]:
-                        if value > 0 and metric != "risk_level":
-                            st.markdown(f"**{metric_name}**: ↑ {prefix}{abs(value)}{suffix}")
-                        elif value < 0 and metric != "risk_level":
-                            st.markdown(f"**{metric_name}**: ↓ {prefix}{abs(value)}{suffix}")
-                        elif value > 0 and metric == "risk_level":
-                            st.markdown(f"**{metric_name}**: ↑ {prefix}{abs(value)}{suffix}")
-                        elif value < 0 and metric == "risk_level":
-                            st.markdown(f"**{metric_name}**: ↓ {prefix}{abs(value)}{suffix}")
-                        else:
-                            st.markdown(f"**{metric_name}**: → {prefix}{abs(value)}{suffix}")
-            
-            if st.button("Choose Best Case", key="best_case_btn"):
-                choose_scenario(
-                    current_scenario_key,
-                    "Best Case",
-                    scenario_data['best_case']['title'],
-                    scenario_data['best_case']['consequences'],
-                    scenario_data['best_case']['next_scenarios']
-                )
-                # Clear the cached scenario data to force a new API call for the next scenario
-                if 'current_scenario_data' in st.session_state:
-                    del st.session_state.current_scenario_data
-                    del st.session_state.current_scenario_data_key
-                st.rerun()
-        
-        with col2:
-            # Replace styled scenario option with native Streamlit components
-            with st.container():
-                st.markdown(f"#### ⚠️ {scenario_data['worst_case']['title']}")
-                st.error(scenario_data['worst_case']['description'])
-                
-                # Show consequences
-                st.markdown("**Impact:**")
-                impact_cols = st.columns(4)
-                for i, (metric, value) in enumerate(scenario_data['worst_case']['consequences'].items()):
-                    metric_name = metric.replace("_", " ").title()
-                    prefix = "$" if metric == "cash_flow" else ""
-                    suffix = "%" if metric != "cash_flow" else ""
-                    
-                    with impact_cols[i]:
-                        if value > 0 and metric != "risk_level":
-                            st.markdown(f"**{metric_name}**: ↑ {prefix}{abs(value)}{suffix}")
-                        elif value < 0 and metric != "risk_level":
-                            st.markdown(f"**{metric_name}**: ↓ {prefix}{abs(value)}{suffix}")
-                        elif value > 0 and metric == "risk_level":
-                            st.markdown(f"**{metric_name}**: ↑ {prefix}{abs(value)}{suffix}")
-                        elif value < 0 and metric == "risk_level":
-                            st.markdown(f"**{metric_name}**: ↓ {prefix}{abs(value)}{suffix}")
-                        else:
-                            st.markdown(f"**{metric_name}**: → {prefix}{abs(value)}{suffix}")
-            
-            if st.button("Choose Worst Case", key="worst_case_btn"):
-                choose_scenario(
-                    current_scenario_key,
-                    "Worst Case",
-                    scenario_data['worst_case']['title'],
-                    scenario_data['worst_case']['consequences'],
-                    scenario_data['worst_case']['next_scenarios']
-                )
-                # Clear the cached scenario data to force a new API call for the next scenario
-                if 'current_scenario_data' in st.session_state:
-                    del st.session_state.current_scenario_data
-                    del st.session_state.current_scenario_data_key
-                st.rerun()
-                
-        # 3. THIRD: Add impact multiplier sliders
-        st.markdown("---")
-        st.markdown("<h4 style='font-size: 1.2em; margin-bottom: 0.5em;'>Adjust Impact Multipliers</h4>", unsafe_allow_html=True)
-        st.info("Use the sliders below to adjust how much each decision affects different aspects of your business.")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            # Larger label with custom styling
-            st.markdown("<div style='font-size: 1.1em; font-weight: 500; margin-bottom: 0.2em;'>Cash Flow Impact</div>", unsafe_allow_html=True)
-            # Smaller slider
-            new_cash_flow = st.slider(
-                "##",  # Hide the actual label
-                min_value=0.0,
-                max_value=2.0,
-                value=st.session_state.current_impact_multipliers['cash_flow'],
-                step=0.1,
-                key="cash_flow_slider"
-            )
-            if new_cash_flow != st.session_state.current_impact_multipliers['cash_flow']:
-                st.session_state.current_impact_multipliers['cash_flow'] = new_cash_flow
-                st.rerun()
-            
-            # Larger label with custom styling
-            st.markdown("<div style='font-size: 1.1em; font-weight: 500; margin-bottom: 0.2em; margin-top: 1em;'>Customer Satisfaction Impact</div>", unsafe_allow_html=True)
-            # Smaller slider
-            new_cust_sat = st.slider(
-                "##",  # Hide the actual label
-                min_value=0.0,
-                max_value=2.0,
-                value=st.session_state.current_impact_multipliers['customer_satisfaction'],
-                step=0.1,
-                key="customer_satisfaction_slider"
-            )
-            if new_cust_sat != st.session_state.current_impact_multipliers['customer_satisfaction']:
-                st.session_state.current_impact_multipliers['customer_satisfaction'] = new_cust_sat
-                st.rerun()
-        with col2:
-            # Larger label with custom styling
-            st.markdown("<div style='font-size: 1.1em; font-weight: 500; margin-bottom: 0.2em;'>Growth Potential Impact</div>", unsafe_allow_html=True)
-            # Smaller slider
-            new_growth = st.slider(
-                "##",  # Hide the actual label
-                min_value=0.0,
-                max_value=2.0,
-                value=st.session_state.current_impact_multipliers['growth_potential'],
-                step=0.1,
-                key="growth_potential_slider"
-            )
-            if new_growth != st.session_state.current_impact_multipliers['growth_potential']:
-                st.session_state.current_impact_multipliers['growth_potential'] = new_growth
-                st.rerun()
-            
-            # Larger label with custom styling
-            st.markdown("<div style='font-size: 1.1em; font-weight: 500; margin-bottom: 0.2em; margin-top: 1em;'>Risk Level Impact</div>", unsafe_allow_html=True)
-            # Smaller slider
-            new_risk = st.slider(
-                "##",  # Hide the actual label
-                min_value=0.0,
-                max_value=2.0,
-                value=st.session_state.current_impact_multipliers['risk_level'],
-                step=0.1,
-                key="risk_level_slider"
-            )
-            if new_risk != st.session_state.current_impact_multipliers['risk_level']:
-                st.session_state.current_impact_multipliers['risk_level'] = new_risk
-                st.rerun()
+        # Option cards and impact multiplier sliders; moving a slider reruns only this part
+        display_decision_options(scenario_data)
+        rerun_timer.lap("options and sliders")
     
     # Display scenario history
     display_scenario_history()
+    rerun_timer.lap("history")
     
     # Check if game over conditions are met
-    if st.session_state.business_metrics['cash_flow'] <= 0:
+    if simulation.game_over:
         st.error("Game Over! Your franchise has run out of cash.")
-        st.session_state.game_completed = True
+        simulation.end()
         if st.button("Start New Simulation", key="new_sim_game_over_btn"):
             reset_simulation()
             st.rerun()
@@ -782,6 +710,7 @@ elif st.session_state.step > 0:
     if st.button("Reset Simulation", key="reset_sim_btn_main"):
         reset_simulation()
         st.rerun()
+    rerun_timer.lap("controls")
 
 # Footer
 st.markdown("---")
@@ -791,13 +720,19 @@ st.markdown("This simulator is designed to help franchise owners and potential e
 # Sidebar
 st.sidebar.title("Navigation")
 st.sidebar.markdown("### Current Step")
-st.sidebar.markdown(f"Step {st.session_state.step} of {MAX_DECISIONS}")
+st.sidebar.markdown(f"Step {simulation.step if simulation.started else st.session_state.step} of {MAX_DECISIONS}")
 
-if st.session_state.step > 0:
+if simulation.started:
     st.sidebar.markdown("### Current Topic")
-    st.sidebar.markdown(f"{st.session_state.current_scenario}")
+    st.sidebar.markdown(f"{simulation.current_topic}")
+    if st.session_state.get('current_scenario_tier'):
+        st.sidebar.caption(f"Scenario source: {st.session_state.current_scenario_tier}")
 
 st.sidebar.markdown("### Settings")
 if st.sidebar.button("Reset Simulation", key="reset_sim_btn_sidebar"):
     reset_simulation()
-    st.rerun() 
\ No newline at end of file
+    st.rerun()
+rerun_timer.lap("footer and sidebar")
+
+session_store.persist_session()
+profiling.end_rerun(rerun_timer)
@@ -1,5 +1,10 @@
 import streamlit as st
 import html
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+
+from static_assets import asset_url, asset_text
 
 # Icons for different business aspects
 ICONS = {
@@ -148,7 +153,208 @@ def styled_scenario_option(title, description, consequences, option_type="best_c
     
     return html_content
 
-# Create path visual
+# Decision path visual
+
+# Connector line drawn through every decision point
+PATH_LINE_STYLE = 'fill="none" stroke="#dee2e6" stroke-width="2" stroke-dasharray="5,5"'
+
+# Path points, best-case circles, worst-case circles and labels of an empty history
+EMPTY_LAYERS = ("", "", "", "")
+
+# (topic, choice) of a decision, the unit the renderer caches by
+_decision_key = itemgetter('topic', 'choice')
+
+class PathVisualRenderer:
+    """
+    Renders decision histories as compact SVG, reusing earlier work
+
+    Decisions are laid out in rows of fixed spacing that wrap in a snake
+    pattern, so consecutive decisions are always neighbours and the labels
+    never get squeezed. Past max_rows rows the middle of the history is
+    collapsed into bucket nodes coloured by their share of best-case
+    choices, keeping the first and last decisions in detail.
+
+    The layers of every rendered history are kept in a small LRU cache,
+    together with running counts of its best-case choices. A history that
+    extends a cached one only renders its new decisions, so redrawing the
+    path after each decision costs one node. A collapsed history reads its
+    bucket counts off the running counts and redraws only its head, tail
+    and buckets, so its cost stays bounded by max_rows however long the
+    history gets. The renderer is thread-safe and can be shared by every
+    session.
+
+    Parameters:
+    - width: Width of the SVG element
+    - height: Minimum height of the SVG element; the rows are centered in it
+    - text_color: Color of the text labels
+    - node_spacing: Minimum horizontal distance between decisions
+    - row_height: Vertical distance between rows
+    - max_rows: Rows drawn in detail before the history is collapsed
+    - cache_size: Number of rendered histories to keep
+    """
+
+    def __init__(self, width=600, height=200, text_color="#333333", node_spacing=120, row_height=70, max_rows=4,
+                 cache_size=256):
+        self.width = width
+        self.height = height
+        self.text_color = text_color
+        self.per_row = max(1, int(width // node_spacing))
+        self.spacing = width / self.per_row
+        self.row_height = row_height
+        self.max_rows = max_rows
+        self.max_nodes = self.per_row * max_rows
+        self.label_chars = max(4, int(self.spacing // 6.5))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _position(self, slot):
+        """Center of the decision point in a layout slot, with rows running in a snake pattern"""
+        row, column = divmod(slot, self.per_row)
+        if row % 2:
+            column = self.per_row - 1 - column
+        return round((column + 0.5) * self.spacing), row * self.row_height
+
+    def _label(self, x, y, text):
+        """Label above a decision point, shortened to the node spacing with the full text as a tooltip"""
+        if len(text) > self.label_chars:
+            short = html.escape(text[:self.label_chars - 1].rstrip() + "…")
+            return f'<text x="{x}" y="{y - 18}">{short}<title>{html.escape(text)}</title></text>'
+        return f'<text x="{x}" y="{y - 18}">{html.escape(text)}</text>'
+
+    def _node(self, slot, topic, choice):
+        """Path point, circle, best-case flag and label of one decision"""
+        x, y = self._position(slot)
+        return f"{x} {y}", f'<circle cx="{x}" cy="{y}" r="10"/>', choice == "Best Case", self._label(x, y, topic)
+
+    def _extend(self, layers, keys, start=0, offset=0):
+        """Add the decisions keys[start:] to the layers of keys[:start], placing keys[0] in slot offset"""
+        points, best, worst, labels = layers
+        new_points, new_best, new_worst, new_labels = [], [], [], []
+        for index in range(start, len(keys)):
+            point, circle, is_best, label = self._node(offset + index, *keys[index])
+            new_points.append(point)
+            (new_best if is_best else new_worst).append(circle)
+            new_labels.append(label)
+        return (
+            "L".join(filter(None, [points] + new_points)),
+            best + "".join(new_best),
+            worst + "".join(new_worst),
+            labels + "".join(new_labels)
+        )
+
+    def _best_counts(self, keys, start=0, counts=None):
+        """
+        Running best-case counts of a history: entry i counts the best-case choices in keys[:i]
+
+        Extends the counts of the cached prefix keys[:start]. Prefixes share
+        one list, which is appended to in place while it ends at the prefix.
+        """
+        if counts is None:
+            counts = [0]
+        elif len(counts) != start + 1:
+            # Another history was already extended from this prefix
+            counts = counts[:start + 1]
+        for index in range(start, len(keys)):
+            counts.append(counts[-1] + (keys[index][1] == "Best Case"))
+        return counts
+
+    def _collapsed_layers(self, keys, counts):
+        """Layers, bucket markup and slot count of a history too long to draw in detail"""
+        head = tail = min(self.per_row, max(1, self.max_nodes // 3))
+        middle = keys[head:len(keys) - tail]
+        bucket_size = -(-len(middle) // max(1, self.max_nodes - head - tail))
+
+        points, best, worst, labels = self._extend(EMPTY_LAYERS, keys[:head])
+        bucket_points, buckets = [], []
+        slot = head
+        for start in range(0, len(middle), bucket_size):
+            bucket = middle[start:start + bucket_size]
+            best_count = counts[head + start + len(bucket)] - counts[head + start]
+            first, last = head + start + 1, head + start + len(bucket)
+            x, y = self._position(slot)
+            bucket_points.append(f"{x} {y}")
+            buckets.append(
+                f'<circle cx="{x}" cy="{y}" r="7" fill="{_mix_color(best_count / len(bucket))}">'
+                f'<title>Steps {first}-{last}: {best_count} best, {len(bucket) - best_count} worst</title></circle>'
+            )
+            labels += f'<text x="{x}" y="{y - 18}">{first}-{last}</text>'
+            slot += 1
+
+        # The last decisions follow the buckets in detail
+        tail_points, tail_best, tail_worst, tail_labels = self._extend(EMPTY_LAYERS, keys[len(keys) - tail:], offset=slot)
+        layers = (
+            "L".join(filter(None, [points] + bucket_points + [tail_points])),
+            best + tail_best,
+            worst + tail_worst,
+            labels + tail_labels
+        )
+        return layers, "".join(buckets), slot + tail
+
+    def _svg(self, layers, buckets, slots):
+        points, best, worst, labels = layers
+        rows = -(-slots // self.per_row)
+        height = max(self.height, rows * self.row_height + 30)
+        top = round((height - (rows - 1) * self.row_height) / 2) + 8
+        parts = [
+            f'<svg width="{self.width}" height="{height}" xmlns="http://www.w3.org/2000/svg">',
+            f'<g transform="translate(0 {top})">',
+            f'<path d="M{points}" {PATH_LINE_STYLE}/>' if slots > 1 else "",
+            f'<g fill="{COLORS["positive"]}">{best}</g>' if best else "",
+            f'<g fill="{COLORS["negative"]}">{worst}</g>' if worst else "",
+            buckets,
+            f'<g font-size="12" text-anchor="middle" fill="{self.text_color}">{labels}</g>',
+            '</g></svg>'
+        ]
+        return "".join(parts)
+
+    def render(self, history):
+        """Return the SVG of a decision history, or an empty string without decisions"""
+        if not history:
+            return ""
+        keys = tuple(map(_decision_key, history))
+
+        with self._lock:
+            cached = self._cache.get(keys)
+            if cached is not None:
+                self._cache.move_to_end(keys)
+                return cached[1]
+
+            # Start from the longest cached prefix within max_nodes decisions of this history
+            start, prefix = 0, (EMPTY_LAYERS, None, None)
+            for length in range(len(keys) - 1, max(0, len(keys) - 1 - self.max_nodes), -1):
+                entry = self._cache.get(keys[:length])
+                if entry is not None:
+                    start, prefix = length, entry
+                    break
+            counts = self._best_counts(keys, start, prefix[2])
+
+            if len(keys) > self.max_nodes:
+                layers = None
+                svg = self._svg(*self._collapsed_layers(keys, counts))
+            else:
+                # Only a history of at most max_nodes decisions can be a prefix here, so it has detailed layers
+                layers = self._extend(prefix[0], keys, start)
+                svg = self._svg(layers, "", len(keys))
+
+            self._cache[keys] = (layers, svg, counts)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return svg
+
+def _mix_color(share):
+    """Color between the negative and positive colors by the share of best-case choices"""
+    low, high = COLORS["negative"], COLORS["positive"]
+    channels = (
+        round(int(low[i:i + 2], 16) + (int(high[i:i + 2], 16) - int(low[i:i + 2], 16)) * share)
+        for i in (1, 3, 5)
+    )
+    return "#" + "".join(f"{channel:02x}" for channel in channels)
+
+# Renderers shared by every session, one per size and color
+_path_renderers = {}
+_path_renderers_lock = threading.Lock()
+
 def generate_path_visual(history, width=600, height=200, text_color="#333333"):
     """
     Generate a simple visualization of the decision path
@@ -157,104 +363,22 @@ def generate_path_visual(history, width=600, height=200, text_color="#333333"):
     Parameters:
     - history: List of scenario history items
     - width: Width of the SVG element
-    - height: Height of the SVG element
+    - height: Minimum height of the SVG element; long histories wrap into more rows
     - text_color: Color of the text labels
     """
-    if not history:
-        return ""
-    
-    step_width = width / (len(history) + 1)
-    path_html = f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
-    
-    # Draw connecting lines
-    path_html += f'<line x1="0" y1="{height/2}" x2="{width}" y2="{height/2}" stroke="#dee2e6" stroke-width="2" stroke-dasharray="5,5" />'
-    
-    # Draw decision points
-    for i, decision in enumerate(history):
-        x = (i + 1) * step_width
-        y = height / 2
-        
-        # Determine color based on decision type
-        color = "#28a745" if decision['choice'] == "Best Case" else "#dc3545"
-        
-        # Add circle for decision point
-        path_html += f'<circle cx="{x}" cy="{y}" r="10" fill="{color}" />'
-        
-        # Add decision label with specified text color
-        path_html += f'<text x="{x}" y="{y-20}" text-anchor="middle" font-size="12" fill="{text_color}">{html.escape(decision["topic"])}</text>'
-        
-    path_html += '</svg>'
-    
-    return path_html
+    settings = (width, height, text_color)
+    renderer = _path_renderers.get(settings)
+    if renderer is None:
+        with _path_renderers_lock:
+            renderer = _path_renderers.setdefault(settings, PathVisualRenderer(width, height, text_color))
+    return renderer.render(history)
 
 # Generate a business logo
 def generate_logo():
-    """Generate a simple business logo for the simulator"""
-    # Create a simple logo image
-    from PIL import Image, ImageDraw, ImageFont
-    import io
-    import base64
-    
-    # Create a white canvas
-    img = Image.new('RGBA', (200, 200), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Draw a circular background
-    draw.ellipse((10, 10, 190, 190), fill=(78, 137, 174, 255))
-    
-    # Add text
-    try:
-        # Try to load a font, fall back to default if not available
-        font = ImageFont.truetype("Arial.ttf", 65)
-    except IOError:
-        font = ImageFont.load_default()
-    
-    draw.text((100, 100), "BW", fill=(255, 255, 255, 255), font=font, anchor="mm")
-    
-    # Convert to bytes
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    
-    return f'<img src="data:image/png;base64,{img_str}" width="100">'
+    """Image tag for the simulator logo, drawn once at build time and served as a static file"""
+    return f'<img src="{asset_url("logo.png")}" width="100">'
 
 # Display an intro animation
 def display_intro_animation():
-    """Display a simple intro animation using HTML/CSS"""
-    intro_html = """
-    <style>
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    .intro-title {
-        animation: fadeIn 1.2s ease-out;
-    }
-    .intro-subtitle {
-        animation: fadeIn 1.5s ease-out;
-    }
-    .intro-text {
-        animation: fadeIn 1.8s ease-out;
-    }
-    .intro-button {
-        animation: fadeIn 2.1s ease-out;
-    }
-    </style>
-    
-    <div style="text-align: center; padding: 2rem 0;">
-        <div class="intro-title">
-            <h1 style="font-size: 2.5rem; color: #43658b; margin-bottom: 1rem;">Best Case, Worst Case</h1>
-        </div>
-        <div class="intro-subtitle">
-            <h2 style="font-size: 1.5rem; color: #6c757d; margin-bottom: 2rem;">Franchise Decision Simulator</h2>
-        </div>
-        <div class="intro-text">
-            <p style="font-size: 1.1rem; max-width: 600px; margin: 0 auto 2rem auto;">
-                Explore the impact of different business decisions on your franchise's success. 
-                Navigate challenging scenarios and see how your choices affect key metrics.
-            </p>
-        </div>
-    </div>
-    """
-    
-    return intro_html 
\ No newline at end of file
+    """Display a simple intro animation using HTML/CSS, prebuilt by static_assets.py"""
+    return asset_text("intro.html")
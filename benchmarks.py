@@ -0,0 +1,298 @@
+"""
+Benchmarks for the simulation engine, scenario parsing and HTML rendering hot paths
+
+Run with:
+    python benchmarks.py                           # print results
+    python benchmarks.py --output results.json     # also write machine-readable results
+    python benchmarks.py --save-baseline           # record a baseline
+    python benchmarks.py --compare                 # fail if slower than the baseline
+
+Every result records seconds per call (min, median, mean, stdev), so files from
+different releases can be compared directly. The full-run benchmark talks to
+an in-process stub instead of the protobots API, so no network is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+# Keep generated scenarios from the stubbed runs out of the real cache, and
+# let generation run without Streamlit secrets
+os.environ.setdefault("GENERATION_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="benchmarks-"), "generated.sqlite3"))
+os.environ.setdefault("PROTOBOTS_API_KEY", "benchmark")
+
+import numpy as np
+
+import protobots
+from assets import styled_metric, styled_card, styled_scenario_option, generate_path_visual
+from engine import Simulation, run_simulation
+from generator import parse_scenario
+from metrics import MetricsVector, to_array, apply_batch, health_batch
+from narratives import narrate, narrate_batch
+from resolver import ScenarioResolver
+from scenarios import SCENARIO_DATABASE
+from utils import apply_scenario_consequences, calculate_business_health, INITIAL_METRICS
+
+# Default location of the recorded baseline
+DEFAULT_BASELINE_PATH = os.path.join(".benchmarks", "baseline.json")
+
+# A benchmark is a regression when its fastest sample is this much slower than the baseline
+DEFAULT_THRESHOLD = 0.25
+
+SAMPLE_CONSEQUENCES = {
+    'cash_flow': -25000,
+    'customer_satisfaction': 15,
+    'growth_potential': 10,
+    'risk_level': -5
+}
+
+BUSINESS_PROFILE = "A family-owned coffee franchise with three locations in a mid-sized college town."
+
+
+def _stub_scenario(topic):
+    """Scenario shaped like a real generation, leading to further generated topics"""
+    scenario = json.loads(json.dumps(SCENARIO_DATABASE["Location Selection"]))
+    scenario["description"] = f"Your franchise faces a decision about {topic.lower()}."
+    scenario["best_case"]["next_scenarios"] = ["Vendor Contract Review", "Seasonal Menu Launch"]
+    scenario["worst_case"]["next_scenarios"] = ["Seasonal Menu Launch", "Vendor Contract Review"]
+    return scenario
+
+def _stub_response_text(topic):
+    return "```json\n" + json.dumps(_stub_scenario(topic), indent=2) + "\n```"
+
+
+class StubResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def close(self):
+        pass
+
+
+class StubClient:
+    """Stand-in for ProtobotsClient that answers instantly with a canned scenario"""
+
+    def post(self, data, headers=None, stream=False):
+        return StubResponse({"object": _stub_response_text("a stubbed topic")})
+
+    def stream(self, data, headers=None):
+        yield _stub_response_text("a stubbed topic")
+
+    def close(self):
+        pass
+
+
+def _decision_history(count):
+    topics = list(SCENARIO_DATABASE)
+    return [
+        {
+            'topic': topics[i % len(topics)],
+            'choice': "Best Case" if i % 3 else "Worst Case",
+            'title': f"Decision {i + 1}",
+            'consequences': SAMPLE_CONSEQUENCES
+        }
+        for i in range(count)
+    ]
+
+
+class _NullCache:
+    """Shared cache that always misses, so every generated topic reaches the LLM"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+def _full_run(seed):
+    """Play one run on generated topics, so every new scenario comes from the stub LLM"""
+    resolver = ScenarioResolver(shared_cache=_NullCache())
+    session_cache = {}
+    rng = random.Random(seed)
+
+    def get_scenario(topic):
+        scenario, _ = resolver.resolve(topic, BUSINESS_PROFILE, session_cache)
+        return scenario
+
+    return run_simulation("Vendor Contract Review", get_scenario, simulation=Simulation(rng=rng))
+
+
+def build_benchmarks():
+    """Return a dictionary mapping benchmark names to zero-argument callables"""
+    metrics = dict(INITIAL_METRICS)
+    vector = MetricsVector.from_mapping(INITIAL_METRICS)
+    states = to_array([INITIAL_METRICS] * 10000)
+    deltas = np.array([[SAMPLE_CONSEQUENCES[metric] for metric in SAMPLE_CONSEQUENCES]] * 10000)
+    scenario_text = _stub_response_text("Supply Chain Disruption")
+    history_5 = _decision_history(5)
+    history_500 = _decision_history(500)
+    option = SCENARIO_DATABASE["Location Selection"]["best_case"]
+    card_content = styled_metric("Cash Flow", 100000, delta=-25000, prefix="$") * 4
+    seeds = iter(range(1 << 30))
+
+    return {
+        "metrics.apply_scenario_consequences": lambda: apply_scenario_consequences(SAMPLE_CONSEQUENCES, metrics),
+        "metrics.calculate_business_health": lambda: calculate_business_health(metrics),
+        "metrics.vector_apply": lambda: vector.apply(SAMPLE_CONSEQUENCES),
+        "metrics.vector_health": lambda: vector.health(),
+        "metrics.apply_batch_10k": lambda: apply_batch(states, deltas),
+        "metrics.health_batch_10k": lambda: health_batch(states),
+        "generator.parse_scenario": lambda: parse_scenario(scenario_text),
+        "narratives.narrate": lambda: narrate(SAMPLE_CONSEQUENCES),
+        "narratives.narrate_batch_10k": lambda: narrate_batch(deltas),
+        "assets.generate_path_visual_5": lambda: generate_path_visual(history_5),
+        "assets.generate_path_visual_500": lambda: generate_path_visual(history_500),
+        "assets.styled_metric": lambda: styled_metric("Customer Satisfaction", 50, delta=15, suffix="%"),
+        "assets.styled_card": lambda: styled_card("Business Dashboard", card_content, "summary"),
+        "assets.styled_scenario_option": lambda: styled_scenario_option(
+            option['title'], option['description'], option['consequences'], "best_case"
+        ),
+        "run.full_simulation_stub_llm": lambda: _full_run(next(seeds)),
+    }
+
+
+def measure(func, repeat=7, min_time=0.2):
+    """
+    Time a callable and return per-call statistics in seconds
+
+    The number of calls per sample is chosen so one sample takes at least
+    min_time / repeat seconds, which keeps timer resolution out of the
+    numbers for very fast functions.
+    """
+    timer = timeit.Timer(func)
+    target = min_time / repeat
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= target:
+            break
+        number *= 10 if elapsed < target / 10 else 2
+
+    samples = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'calls_per_sample': number,
+        'samples': len(samples)
+    }
+
+
+def environment():
+    """Metadata stored with every result file"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': np.__version__
+    }
+
+
+def run(pattern=None, repeat=7, min_time=0.2):
+    """Run every benchmark whose name contains pattern and return the results document"""
+    # Scenario generation goes through the stub instead of the network
+    real_client = protobots._client
+    protobots._client = StubClient()
+    try:
+        results = {}
+        for name, func in build_benchmarks().items():
+            if pattern and pattern not in name:
+                continue
+            results[name] = measure(func, repeat=repeat, min_time=min_time)
+            print(f"{name:45s} {results[name]['median'] * 1e6:12.2f} us")
+    finally:
+        protobots._client = real_client
+    return {'environment': environment(), 'benchmarks': results}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the fastest samples against a baseline
+
+    The minimum is the least noisy estimate of the true cost, so it is used
+    instead of the median.
+
+    Returns a list of (name, baseline seconds, current seconds, ratio) for
+    every benchmark slower than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, current in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            print(f"{name:45s} {'new':>12s}")
+            continue
+        ratio = current['min'] / previous['min'] if previous['min'] else float('inf')
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:45s} {ratio:11.2f}x {flag}")
+        if flag:
+            regressions.append((name, previous['min'], current['min'], ratio))
+    return regressions
+
+
+def _write_json(path, document):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulator benchmarks")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE_PATH, help="Record results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE_PATH, help="Compare results with a baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown before failing, e.g. 0.25 for 25%%")
+    parser.add_argument("--repeat", type=int, default=7, help="Samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds spent per benchmark")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, repeat=args.repeat, min_time=args.min_time)
+
+    if args.output:
+        _write_json(args.output, results)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} ({baseline['environment'].get('commit')})")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+            status = 1
+
+    if args.save_baseline:
+        _write_json(args.save_baseline, results)
+        print(f"Baseline saved to {args.save_baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,664 @@
+"""
+Shared cache of generated content
+
+A Cache is a namespace (scenario, topics, analysis) over a backend
+that stores opaque bytes: an in-process LRU, a SQLite file or a Redis server.
+Replicas configured with the same SQLite file or Redis server share every
+generation instead of each paying for it. The Cache front end serializes
+values as JSON, compresses large payloads, enforces TTLs and a per-value
+size limit, and counts hits and misses both locally and in telemetry.
+
+The backend is selected with GENERATION_CACHE_BACKEND (sqlite, memory or
+redis); resp_server.py is a local stand-in for Redis.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from urllib.parse import urlparse
+
+import telemetry
+
+# Default cache settings. Each one can be overridden with an environment
+# variable of the same name.
+DEFAULT_SETTINGS = {
+    "GENERATION_CACHE_BACKEND": "sqlite",
+    "GENERATION_CACHE_PATH": os.path.join(".cache", "generated.sqlite3"),
+    "GENERATION_CACHE_URL": "redis://127.0.0.1:6379/0",
+    "GENERATION_CACHE_MAX_BYTES": 64 * 1024 * 1024,
+    "GENERATION_CACHE_MAX_VALUE_BYTES": 1024 * 1024,
+    "GENERATION_CACHE_COMPRESS_MIN_BYTES": 1024,
+}
+
+# Default time-to-live in seconds and maximum number of entries per namespace
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+
+# Run LRU eviction after this many writes instead of on every write
+EVICT_EVERY = 32
+
+# Seconds before a hit refreshes an entry's recency again. Recency only has
+# to be coarse for LRU eviction, and skipping the update keeps cache hits
+# read-only instead of taking the SQLite write lock on every hit.
+TOUCH_INTERVAL = 60
+
+# First byte of a stored payload: plain or zlib-compressed JSON
+PLAIN_PAYLOAD = b"j"
+COMPRESSED_PAYLOAD = b"z"
+
+# Prefix of every key written to Redis
+REDIS_KEY_PREFIX = "generated:"
+
+
+def _setting(name):
+    """Read a cache setting from the environment, falling back to the default"""
+    default = DEFAULT_SETTINGS[name]
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return type(default)(value)
+
+def normalize_text(text):
+    """Normalize free text so trivially different inputs share a cache key"""
+    return " ".join(str(text or "").split()).casefold()
+
+def _json_default(value):
+    # Mappings such as MetricsVector hash like the equivalent dict
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+def make_key(*parts):
+    """Build a stable cache key by hashing the given parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def encode_value(value, compress_min_bytes=None):
+    """
+    Serialize a JSON-serializable value into a cache payload
+
+    Parameters:
+    - value: Value to serialize
+    - compress_min_bytes: Compress the JSON with zlib from this size on (None never compresses)
+    """
+    payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    if compress_min_bytes is not None and len(payload) >= compress_min_bytes:
+        compressed = zlib.compress(payload, 6)
+        if len(compressed) < len(payload):
+            return COMPRESSED_PAYLOAD + compressed
+    return PLAIN_PAYLOAD + payload
+
+def decode_value(data):
+    """Deserialize a payload written by encode_value"""
+    marker, payload = data[:1], data[1:]
+    if marker == COMPRESSED_PAYLOAD:
+        payload = zlib.decompress(payload)
+    elif marker != PLAIN_PAYLOAD:
+        raise ValueError("Unknown cache payload format")
+    return json.loads(payload)
+
+
+class CacheError(Exception):
+    """A cache backend failed, e.g. Redis answered with an error"""
+
+
+# Failures a Cache logs and treats as a miss
+CACHE_ERRORS = (CacheError, OSError, sqlite3.Error, ValueError, zlib.error)
+
+
+class MemoryBackend:
+    """
+    In-process LRU backend
+
+    Only shares entries within one process, so it suits single-replica
+    deployments, tests and benchmarks. Each namespace is bounded by entries
+    and by total payload bytes.
+
+    Parameters:
+    - max_entries: Maximum number of entries per namespace
+    - max_bytes: Maximum total payload size per namespace
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._namespaces = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def _entries(self, namespace):
+        # Called with the lock held
+        entries = self._namespaces.get(namespace)
+        if entries is None:
+            entries = self._namespaces[namespace] = OrderedDict()
+            self._sizes[namespace] = 0
+        return entries
+
+    def _remove(self, namespace, key):
+        data, _ = self._namespaces[namespace].pop(key)
+        self._sizes[namespace] -= len(data)
+
+    def get(self, namespace, key):
+        with self._lock:
+            entries = self._entries(namespace)
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                self._remove(namespace, key)
+                return None
+            entries.move_to_end(key)
+            return data
+
+    def _store(self, namespace, key, data, ttl):
+        # Called with the lock held
+        entries = self._entries(namespace)
+        if key in entries:
+            self._remove(namespace, key)
+        entries[key] = (data, time.time() + ttl if ttl is not None else None)
+        self._sizes[namespace] += len(data)
+        while entries and (
+            (self.max_entries is not None and len(entries) > self.max_entries)
+            or (self.max_bytes is not None and self._sizes[namespace] > self.max_bytes)
+        ):
+            self._remove(namespace, next(iter(entries)))
+
+    def set(self, namespace, key, data, ttl=None):
+        with self._lock:
+            self._store(namespace, key, data, ttl)
+
+    def add(self, namespace, key, data, ttl=None):
+        with self._lock:
+            entry = self._entries(namespace).get(key)
+            if entry is not None and (entry[1] is None or entry[1] >= time.time()):
+                return False
+            self._store(namespace, key, data, ttl)
+            return True
+
+    def delete(self, namespace, key):
+        with self._lock:
+            if key in self._entries(namespace):
+                self._remove(namespace, key)
+
+    def clear(self, namespace):
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+            self._sizes.pop(namespace, None)
+
+    def count(self, namespace):
+        with self._lock:
+            return len(self._entries(namespace))
+
+
+class SQLiteBackend:
+    """
+    SQLite backend with TTL expiry and LRU eviction by entries and bytes
+
+    Each thread uses its own connection and the database runs in WAL mode,
+    so readers never block each other and writes from several Streamlit
+    session threads (or processes sharing the file) are serialized by
+    SQLite itself.
+
+    Parameters:
+    - path: Path of the SQLite database file
+    - max_entries: Maximum number of entries per namespace
+    - max_bytes: Maximum total payload size per namespace
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _connection(self):
+        """Return this thread's connection, creating the schema on first use"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)")
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace, key):
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+
+        data, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at is not None and expires_at < now:
+            connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+            return None
+
+        # Record the access so eviction drops the least recently used entries,
+        # at most once per TOUCH_INTERVAL per entry
+        if now - accessed_at >= TOUCH_INTERVAL:
+            connection.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+        return bytes(data)
+
+    def _written(self, namespace):
+        with self._writes_lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+        if evict:
+            self.evict(namespace)
+
+    def set(self, namespace, key, data, ttl=None):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (namespace, key, data, len(data), now + ttl if ttl is not None else None, now)
+        )
+        self._written(namespace)
+
+    def add(self, namespace, key, data, ttl=None):
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at < ?",
+                (namespace, key, now)
+            )
+            added = connection.execute(
+                "INSERT OR IGNORE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, data, len(data), now + ttl if ttl is not None else None, now)
+            ).rowcount == 1
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        if added:
+            self._written(namespace)
+        return added
+
+    def delete(self, namespace, key):
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def evict(self, namespace):
+        """Drop expired entries, then the least recently used ones beyond the entry and byte limits"""
+        connection = self._connection()
+        connection.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+            (namespace, time.time())
+        )
+        if self.max_entries is not None:
+            connection.execute("""
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache_entries WHERE namespace = ?
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (namespace, namespace, self.max_entries))
+        if self.max_bytes is not None:
+            connection.execute("""
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total
+                        FROM cache_entries WHERE namespace = ?
+                    ) WHERE total > ?
+                )
+            """, (namespace, namespace, self.max_bytes))
+
+    def clear(self, namespace):
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def count(self, namespace):
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0]
+
+
+class RedisBackend:
+    """
+    Backend on a Redis server, or anything else speaking the Redis protocol
+
+    Uses a minimal RESP client with one connection per thread, so there is
+    no dependency on redis-py. Entries are stored under
+    generated:<namespace>:<key> with SET ... PX for the TTL; total memory is
+    bounded by the server's maxmemory and eviction policy (allkeys-lru is
+    the natural choice for a cache).
+
+    Parameters:
+    - url: Server URL, e.g. redis://:password@host:6379/0
+    - timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, url, timeout=2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.connection = connection
+        self._local.reader = connection.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", self.db)
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.reader.close()
+            connection.close()
+            self._local.connection = None
+
+    def _read_reply(self):
+        reader = self._local.reader
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise CacheError(rest.decode("utf-8"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise CacheError(f"Unexpected reply from the cache server: {line!r}")
+
+    def _call(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(f"${len(arg)}\r\n".encode())
+            parts.append(arg)
+            parts.append(b"\r\n")
+        self._local.connection.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def command(self, *args):
+        """Run one command, reconnecting once if the connection was dropped"""
+        for attempt in range(2):
+            if getattr(self._local, "connection", None) is None:
+                self._connect()
+            try:
+                return self._call(*args)
+            except OSError:
+                self._close()
+                if attempt:
+                    raise
+
+    def _key(self, namespace, key):
+        return f"{REDIS_KEY_PREFIX}{namespace}:{key}"
+
+    def _set(self, namespace, key, data, ttl, *flags):
+        args = ["SET", self._key(namespace, key), data]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        return self.command(*args, *flags)
+
+    def get(self, namespace, key):
+        return self.command("GET", self._key(namespace, key))
+
+    def set(self, namespace, key, data, ttl=None):
+        self._set(namespace, key, data, ttl)
+
+    def add(self, namespace, key, data, ttl=None):
+        return self._set(namespace, key, data, ttl, "NX") is not None
+
+    def delete(self, namespace, key):
+        self.command("DEL", self._key(namespace, key))
+
+    def _scan(self, namespace):
+        cursor = "0"
+        while True:
+            cursor, keys = self.command("SCAN", cursor, "MATCH", self._key(namespace, "*"), "COUNT", 500)
+            cursor = cursor.decode("utf-8")
+            yield keys
+            if cursor == "0":
+                return
+
+    def clear(self, namespace):
+        for keys in self._scan(namespace):
+            if keys:
+                self.command("DEL", *keys)
+
+    def count(self, namespace):
+        return sum(len(keys) for keys in self._scan(namespace))
+
+
+class Cache:
+    """
+    Namespaced cache of JSON-serializable values on a shared backend
+
+    Every get() returns a fresh copy that the caller is free to mutate.
+    Payloads of compress_min_bytes or more are stored zlib-compressed and
+    values larger than max_value_bytes are not stored at all. Backend
+    failures are logged and treated as misses so they never break
+    generation. Hits, misses and writes are counted in stats() and in the
+    generation_cache_* metrics.
+
+    Parameters:
+    - namespace: Name that separates this cache's keys from other caches
+    - backend: MemoryBackend, SQLiteBackend or RedisBackend
+    - ttl: Seconds an entry stays valid (None keeps entries until evicted)
+    - max_value_bytes: Largest payload stored, after compression (None for no limit)
+    - compress_min_bytes: Payload size from which values are compressed (None never compresses)
+    """
+
+    def __init__(self, namespace, backend, ttl=DEFAULT_TTL, max_value_bytes=None, compress_min_bytes=None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0, 'writes': 0, 'oversize': 0, 'bytes_read': 0, 'bytes_written': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **amounts):
+        with self._stats_lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired"""
+        try:
+            data = self.backend.get(self.namespace, key)
+            value = decode_value(data) if data is not None else None
+        except CACHE_ERRORS as e:
+            print(f"Cache read failed: {str(e)}")
+            self._count(errors=1, misses=1)
+            telemetry.CACHE_REQUESTS.inc(namespace=self.namespace, result="error")
+            return None
+
+        if data is None:
+            self._count(misses=1)
+            telemetry.CACHE_REQUESTS.inc(namespace=self.namespace, result="miss")
+            return None
+        self._count(hits=1, bytes_read=len(data))
+        telemetry.CACHE_REQUESTS.inc(namespace=self.namespace, result="hit")
+        return value
+
+    def _encode(self, value):
+        try:
+            data = encode_value(value, self.compress_min_bytes)
+        except (TypeError, ValueError) as e:
+            print(f"Cache write failed: {str(e)}")
+            self._count(errors=1)
+            telemetry.CACHE_WRITES.inc(namespace=self.namespace, outcome="error")
+            return None
+        if self.max_value_bytes is not None and len(data) > self.max_value_bytes:
+            self._count(oversize=1)
+            telemetry.CACHE_WRITES.inc(namespace=self.namespace, outcome="oversize")
+            return None
+        return data
+
+    def _write(self, write, key, value, ttl):
+        data = self._encode(value)
+        if data is None:
+            return False
+        try:
+            stored = write(self.namespace, key, data, ttl if ttl is not None else self.ttl)
+        except CACHE_ERRORS as e:
+            print(f"Cache write failed: {str(e)}")
+            self._count(errors=1)
+            telemetry.CACHE_WRITES.inc(namespace=self.namespace, outcome="error")
+            return False
+        if stored is False:
+            return False
+        self._count(writes=1, bytes_written=len(data))
+        telemetry.CACHE_WRITES.inc(namespace=self.namespace, outcome="stored")
+        telemetry.CACHE_VALUE_BYTES.observe(len(data), namespace=self.namespace)
+        return True
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a JSON-serializable value under key
+
+        Returns False if the value was not stored because it is too large or
+        the backend failed. ttl overrides the cache's TTL for this entry.
+        """
+        return self._write(self.backend.set, key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Store a value only if key is not already present; returns whether it was stored"""
+        return self._write(self.backend.add, key, value, ttl)
+
+    def delete(self, key):
+        """Remove key from the cache"""
+        try:
+            self.backend.delete(self.namespace, key)
+        except CACHE_ERRORS as e:
+            print(f"Cache delete failed: {str(e)}")
+
+    def clear(self):
+        """Remove every entry in this namespace"""
+        try:
+            self.backend.clear(self.namespace)
+        except CACHE_ERRORS as e:
+            print(f"Cache clear failed: {str(e)}")
+
+    def stats(self):
+        """Hit, miss, error, write and byte counts of this process, with the hit ratio"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        try:
+            return self.backend.count(self.namespace)
+        except CACHE_ERRORS:
+            return 0
+
+
+def create_backend(kind=None):
+    """
+    Create the cache backend selected by GENERATION_CACHE_BACKEND
+
+    Parameters:
+    - kind: "sqlite", "memory" or "redis" (defaults to GENERATION_CACHE_BACKEND)
+    """
+    kind = (kind or _setting("GENERATION_CACHE_BACKEND")).lower()
+    max_bytes = _setting("GENERATION_CACHE_MAX_BYTES") or None
+    if kind == "sqlite":
+        return SQLiteBackend(_setting("GENERATION_CACHE_PATH"), max_bytes=max_bytes)
+    if kind == "memory":
+        return MemoryBackend(max_bytes=max_bytes)
+    if kind == "redis":
+        return RedisBackend(_setting("GENERATION_CACHE_URL"))
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+_backend = None
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide cache backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _caches_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+def get_cache(namespace, ttl=DEFAULT_TTL):
+    """Return the process-wide cache for a namespace, creating it on first use"""
+    cache = _caches.get(namespace)
+    if cache is None:
+        backend = get_backend()
+        with _caches_lock:
+            cache = _caches.get(namespace)
+            if cache is None:
+                cache = _caches[namespace] = Cache(
+                    namespace,
+                    backend,
+                    ttl=ttl,
+                    max_value_bytes=_setting("GENERATION_CACHE_MAX_VALUE_BYTES") or None,
+                    compress_min_bytes=_setting("GENERATION_CACHE_COMPRESS_MIN_BYTES") or None
+                )
+    return cache
+
+def get_scenario_cache():
+    """Return the shared cache of generated scenarios"""
+    return get_cache("scenario")
+
+def get_topics_cache():
+    """Return the shared cache of generated topic lists"""
+    return get_cache("topics")
+
+def get_analysis_cache():
+    """Return the shared cache of end-of-run analyses"""
+    return get_cache("analysis")
+
+def cache_stats():
+    """stats() of every cache created in this process, by namespace"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {namespace: cache.stats() for namespace, cache in sorted(caches.items())}
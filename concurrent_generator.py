@@ -0,0 +1,82 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from generator import (
+    generate_scenario,
+    generate_scenario_topics,
+    generate_simulation_analysis,
+    generate_random_business_profile
+)
+
+# Number of generations that may run side by side in one process
+MAX_WORKERS = int(os.environ.get("GENERATION_MAX_WORKERS", 8))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide generation thread pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="generator")
+    return _executor
+
+# Future-returning versions of the generator functions. These return
+# immediately so the Streamlit script thread is never blocked.
+
+def submit_scenario(topic, business_profile):
+    """Start generating a scenario in the background and return its Future"""
+    return get_executor().submit(generate_scenario, topic, business_profile)
+
+def submit_scenario_topics(business_profile, uploaded_files=None, custom_topic=None):
+    """Start generating scenario topics in the background and return their Future"""
+    return get_executor().submit(generate_scenario_topics, business_profile, uploaded_files, custom_topic)
+
+def submit_simulation_analysis(scenario_history, final_metrics, business_profile):
+    """Start generating the simulation analysis in the background and return its Future"""
+    return get_executor().submit(generate_simulation_analysis, scenario_history, final_metrics, business_profile)
+
+def submit_random_business_profile():
+    """Start generating a random business profile in the background and return its Future"""
+    return get_executor().submit(generate_random_business_profile)
+
+# Awaitable versions for asyncio callers. They share the same thread pool,
+# so the blocking HTTP calls never run on the event loop.
+
+async def agenerate_scenario(topic, business_profile):
+    """Awaitable version of generate_scenario"""
+    return await asyncio.wrap_future(submit_scenario(topic, business_profile))
+
+async def agenerate_scenario_topics(business_profile, uploaded_files=None, custom_topic=None):
+    """Awaitable version of generate_scenario_topics"""
+    return await asyncio.wrap_future(submit_scenario_topics(business_profile, uploaded_files, custom_topic))
+
+async def agenerate_simulation_analysis(scenario_history, final_metrics, business_profile):
+    """Awaitable version of generate_simulation_analysis"""
+    return await asyncio.wrap_future(submit_simulation_analysis(scenario_history, final_metrics, business_profile))
+
+async def agenerate_random_business_profile():
+    """Awaitable version of generate_random_business_profile"""
+    return await asyncio.wrap_future(submit_random_business_profile())
+
+def first_completed(futures, timeout=None):
+    """
+    Wait until the first of several generations finishes
+
+    Parameters:
+    - futures: Dictionary mapping a name to a Future
+    - timeout: Seconds to wait before giving up (None waits forever)
+
+    Returns a (name, future) tuple for the first finished generation, or
+    (None, None) if nothing finished within the timeout.
+    """
+    names = {future: name for name, future in futures.items()}
+    done, _ = wait(names, timeout=timeout, return_when=FIRST_COMPLETED)
+    for future in done:
+        return names[future], future
+    return None, None
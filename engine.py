@@ -0,0 +1,238 @@
+import random
+
+from utils import (
+    get_business_status,
+    INITIAL_METRICS,
+    FRANCHISE_SCENARIO_TOPICS
+)
+from metrics import MetricsVector
+from scenario_index import SCENARIO_INDEX
+
+# Number of decisions before summary
+MAX_DECISIONS = 5
+
+# Impact multipliers applied to every decision's consequences
+DEFAULT_IMPACT_MULTIPLIERS = {
+    'cash_flow': 1.0,
+    'customer_satisfaction': 1.0,
+    'growth_potential': 1.0,
+    'risk_level': 1.0
+}
+
+# Labels recorded in the history for each option
+CHOICE_LABELS = {
+    'best_case': "Best Case",
+    'worst_case': "Worst Case"
+}
+
+
+class Simulation:
+    """
+    Headless state of one franchise simulation run
+
+    Holds the metrics (a MetricsVector), the decision history, the current
+    topic and the impact multipliers, and implements the game rules without any Streamlit
+    dependency so runs can be driven, tested and benchmarked in-process.
+
+    Parameters:
+    - max_decisions: Number of decisions before the run is completed
+    - initial_metrics: Starting business metrics (defaults to INITIAL_METRICS)
+    - rng: random.Random used for next-topic transitions (optional)
+    - index: ScenarioIndex used for transitions out of its topics (None
+      always uses the scenario's own next_scenarios)
+    """
+
+    def __init__(self, max_decisions=MAX_DECISIONS, initial_metrics=None, rng=None, index=SCENARIO_INDEX):
+        self.max_decisions = max_decisions
+        self.index = index
+        self.initial_metrics = MetricsVector.from_mapping(initial_metrics if initial_metrics is not None else INITIAL_METRICS)
+        self.rng = rng if rng is not None else random.Random()
+        self.reset()
+
+    def reset(self):
+        """Reset the run to before the first decision"""
+        self.metrics = self.initial_metrics.copy()
+        self.history = []
+        self.current_topic = None
+        self.completed = False
+        self.multipliers = DEFAULT_IMPACT_MULTIPLIERS.copy()
+
+    @property
+    def started(self):
+        """Whether a starting topic has been chosen"""
+        return self.current_topic is not None or bool(self.history)
+
+    @property
+    def step(self):
+        """Number of the decision currently being made, starting at 1 (0 before the run starts)"""
+        if not self.started:
+            return 0
+        return min(len(self.history) + 1, self.max_decisions)
+
+    @property
+    def game_over(self):
+        """Whether the franchise has run out of cash"""
+        return self.metrics['cash_flow'] <= 0
+
+    @property
+    def finished(self):
+        """Whether no more decisions can be made"""
+        return self.completed or self.game_over
+
+    @property
+    def health(self):
+        """Overall business health score"""
+        return self.metrics.health()
+
+    @property
+    def status(self):
+        """Business status name and description"""
+        return get_business_status(self.health)
+
+    def start(self, topic):
+        """Start the run with the given scenario topic"""
+        self.reset_progress()
+        self.current_topic = topic
+
+    def reset_progress(self):
+        """Clear metrics and history but keep the impact multipliers"""
+        multipliers = self.multipliers
+        self.reset()
+        self.multipliers = multipliers
+
+    def set_multiplier(self, metric, value):
+        """Set the impact multiplier for one metric"""
+        if metric not in self.multipliers:
+            raise KeyError(f"Unknown metric: {metric}")
+        self.multipliers[metric] = value
+
+    def adjusted_consequences(self, consequences):
+        """Apply the impact multipliers to a set of consequences"""
+        return {
+            metric: int(value * self.multipliers[metric])
+            for metric, value in consequences.items()
+        }
+
+    def choose(self, scenario, option):
+        """
+        Make a decision on the current scenario
+
+        Parameters:
+        - scenario: Scenario dictionary with best_case and worst_case options
+        - option: Either "best_case" or "worst_case"
+
+        Records the choice, applies its multiplied consequences and moves to
+        a random next scenario. Returns the next topic, or None once the run
+        is completed.
+        """
+        if self.finished:
+            raise ValueError("The simulation has already finished")
+        if option not in CHOICE_LABELS:
+            raise ValueError(f"Unknown option: {option}")
+
+        chosen = scenario[option]
+        adjusted_consequences = self.adjusted_consequences(chosen['consequences'])
+
+        # Record the choice
+        self.history.append({
+            'topic': self.current_topic,
+            'choice': CHOICE_LABELS[option],
+            'title': chosen['title'],
+            'consequences': adjusted_consequences
+        })
+
+        # Apply consequences to metrics
+        self.metrics = self.metrics.apply(adjusted_consequences)
+
+        # Check if we've reached the maximum number of decisions
+        if len(self.history) >= self.max_decisions:
+            self.completed = True
+            return None
+
+        # Set up next scenario from the precomputed transitions when the topic is indexed
+        if self.index is not None and self.current_topic in self.index:
+            self.current_topic = self.index.sample_next_topic(self.current_topic, option, self.rng)
+            return self.current_topic
+
+        # Otherwise pick any known topic if the option lists none
+        next_scenarios = chosen.get('next_scenarios') or FRANCHISE_SCENARIO_TOPICS
+        self.current_topic = self.rng.choice(next_scenarios)
+        return self.current_topic
+
+    def step_with(self, scenario, policy):
+        """
+        Make the decision picked by a policy on the current scenario
+
+        policy is called with (simulation, scenario) and returns the option
+        to choose. Returns the next topic like choose().
+        """
+        return self.choose(scenario, policy(self, scenario))
+
+    def undo(self):
+        """
+        Take back the last decision
+
+        Metrics are replayed from the initial metrics because clamping makes
+        individual decisions irreversible. Returns the undone history entry.
+        """
+        if not self.history:
+            raise ValueError("There is no decision to undo")
+
+        undone = self.history.pop()
+        self.metrics = self.initial_metrics.copy()
+        for decision in self.history:
+            self.metrics = self.metrics.apply(decision['consequences'])
+        self.current_topic = undone['topic']
+        self.completed = False
+        return undone
+
+    def end(self):
+        """Mark the run as completed"""
+        self.completed = True
+
+    def to_dict(self):
+        """JSON-serializable state of the run (the random number generator is not included)"""
+        return {
+            'max_decisions': self.max_decisions,
+            'initial_metrics': self.initial_metrics.as_dict(),
+            'metrics': self.metrics.as_dict(),
+            'history': self.history,
+            'current_topic': self.current_topic,
+            'completed': self.completed,
+            'multipliers': self.multipliers
+        }
+
+    @classmethod
+    def from_dict(cls, state, rng=None, index=SCENARIO_INDEX):
+        """Rebuild a run from to_dict() output"""
+        simulation = cls(state['max_decisions'], state['initial_metrics'], rng=rng, index=index)
+        simulation.metrics = MetricsVector.from_mapping(state['metrics'])
+        simulation.history = [dict(decision) for decision in state['history']]
+        simulation.current_topic = state['current_topic']
+        simulation.completed = state['completed']
+        simulation.multipliers = dict(DEFAULT_IMPACT_MULTIPLIERS, **state['multipliers'])
+        return simulation
+
+
+def random_policy(simulation, scenario):
+    """Policy that picks either option with equal probability"""
+    return simulation.rng.choice(list(CHOICE_LABELS))
+
+def run_simulation(start_topic, get_scenario, policy=random_policy, simulation=None):
+    """
+    Play a full run without any UI
+
+    Parameters:
+    - start_topic: Topic of the first scenario
+    - get_scenario: Function returning the scenario dictionary for a topic
+    - policy: Function picking an option, see Simulation.step_with
+    - simulation: Simulation to play (a new one is created if omitted)
+
+    Returns the finished simulation.
+    """
+    if simulation is None:
+        simulation = Simulation()
+    simulation.start(start_topic)
+    while not simulation.finished:
+        simulation.step_with(get_scenario(simulation.current_topic), policy)
+    return simulation
@@ -1,8 +1,22 @@
 import random
 import streamlit as st
 from scenarios import SCENARIO_DATABASE
-import requests
+from protobots import get_client
+from cache import get_scenario_cache, get_topics_cache, get_analysis_cache, make_key, normalize_text
+import singleflight
+import telemetry
 import json
+import os
+import re
+
+# Bump these whenever a prompt changes so stale cached generations are not reused
+SCENARIO_PROMPT_VERSION = 1
+ANALYSIS_PROMPT_VERSION = 1
+TOPICS_PROMPT_VERSION = 1
+
+def get_api_key():
+    """Protobots API key from the PROTOBOTS_API_KEY environment variable or Streamlit secrets"""
+    return os.environ.get("PROTOBOTS_API_KEY") or st.secrets['PROTOBOTS_API_KEY']
 
 # Lists of scenario components for random generation
 BUSINESS_ASPECTS = [
@@ -57,11 +71,23 @@ BUSINESS_IMPACT_DESCRIPTIONS = [
     "The direction you take now will influence your financial stability."
 ]
 
-def generate_scenario_topics(business_profile, uploaded_files=None, custom_topic=None):
-    """Generate a list of relevant scenario topics based on the business profile"""
-    
-    # Create a prompt for topic generation
-    prompt = f"""You are a business scenario generator for a franchise management simulator. Based on the following business profile, generate 5-7 relevant scenario topics that would be most impactful for this business.
+# Fallback topics used when topic generation fails
+FALLBACK_SCENARIO_TOPICS = [
+    "Staff Management",
+    "Marketing Strategy",
+    "Financial Planning",
+    "Customer Service",
+    "Technology Implementation"
+]
+
+# Assistant messages that prime the bot for each kind of generation
+TOPICS_ASSISTANT_MESSAGE = "I am a business scenario generator. I will create relevant scenario topics based on the business profile."
+SCENARIO_ASSISTANT_MESSAGE = "I am a business scenario generator. I will create realistic franchise management scenarios following the specified JSON structure."
+ANALYSIS_ASSISTANT_MESSAGE = "I am a franchise business analyst. I will analyze your business decisions and provide detailed insights."
+
+def build_scenario_topics_prompt(business_profile, custom_topic=None):
+    """Build the prompt for scenario topic generation"""
+    return f"""You are a business scenario generator for a franchise management simulator. Based on the following business profile, generate 5-7 relevant scenario topics that would be most impactful for this business.
 
 Business Profile:
 {business_profile}
@@ -81,25 +107,65 @@ Marketing Campaign
 Supply Chain Optimization
 ..."""
 
+def clean_topic_line(line):
+    """Strip whitespace, numbering and bullet points from one line of topic output"""
+    return line.strip().lstrip('0123456789. -•*')
+
+def parse_scenario_topics(topics_text):
+    """Parse the topic generation output into a list of topics"""
+    # Remove any markdown code block markers if present
+    topics_text = topics_text.replace('```text', '').replace('```', '').strip()
+    
+    # Split the text into lines and clean each line
+    topics = []
+    for topic in topics_text.split('\n'):
+        topic = clean_topic_line(topic)
+        if topic:
+            topics.append(topic)
+    return topics
+
+def topics_cache_key(business_profile, custom_topic=None):
+    """Cache key for a generated topic list"""
+    return make_key("topics", TOPICS_PROMPT_VERSION, normalize_text(business_profile), normalize_text(custom_topic))
+
+@telemetry.instrumented("topics")
+@singleflight.coalesced("topics", lambda business_profile, uploaded_files=None, custom_topic=None, use_cache=True: (
+    topics_cache_key(business_profile, custom_topic), use_cache
+))
+def generate_scenario_topics(business_profile, uploaded_files=None, custom_topic=None, use_cache=True):
+    """
+    Generate a list of relevant scenario topics based on the business profile
+
+    Successful generations are always written to the shared topics cache.
+    With use_cache, the cache is also checked before calling the LLM; pass
+    use_cache=False to regenerate the topics.
+    """
+    cache_key = topics_cache_key(business_profile, custom_topic)
+    if use_cache:
+        cached_topics = get_topics_cache().get(cache_key)
+        if cached_topics is not None:
+            telemetry.record_cache_hit()
+            return cached_topics
+    
+    # Create a prompt for topic generation
+    prompt = build_scenario_topics_prompt(business_profile, custom_topic)
+
     try:
-        # Prepare the API request
-        url = "https://api.protobots.ai/proto_bots/generate_v2"
-        
-        # Headers
+        # Prepare the API request headers
         headers = {
-            "Authorization": f"Bearer {st.secrets['PROTOBOTS_API_KEY']}"
+            "Authorization": f"Bearer {get_api_key()}"
         }
         
         # Form data
         data = {
             "_id": "64f9ec54981dcfe5b966e5a3",  # Replace with your actual bot ID
             "stream": "false",
-            "message.assistant.0": "I am a business scenario generator. I will create relevant scenario topics based on the business profile.",
+            "message.assistant.0": TOPICS_ASSISTANT_MESSAGE,
             "message.user.1": prompt
         }
         
-        # Make the API request
-        response = requests.post(url, headers=headers, data=data)
+        # Make the API request through the shared pooled client
+        response = get_client().post(data, headers=headers)
         
         # Check if request was successful
         if response.status_code == 200:
@@ -112,29 +178,20 @@ Supply Chain Optimization
             
             if topics_text:
                 try:
-                    # Clean the response text
-                    # Remove any markdown code block markers if present
-                    topics_text = topics_text.replace('```text', '').replace('```', '').strip()
-                    
-                    # Split the text into lines and clean each line
-                    # Remove any numbers or bullet points from the start of each line
-                    topics = []
-                    for topic in topics_text.split('\n'):
-                        topic = topic.strip()
-                        # Remove any numbers or bullet points from the start
-                        topic = topic.lstrip('0123456789. -•*')
-                        if topic:
-                            topics.append(topic)
+                    # Clean the response text into a list of topics
+                    topics = parse_scenario_topics(topics_text)
                     
                     # Validate that we got a list of strings
                     if topics:
                         print("Successfully generated topics:", topics)  # Debug print
+                        get_topics_cache().set(cache_key, topics)
                         return topics
                     else:
                         print("No valid topics found in response")
                         print("Response:", topics_text)
                         raise Exception("No valid topics found in response")
                 except Exception as e:
+                    telemetry.record_parse_failure()
                     print(f"Error parsing topics: {str(e)}")
                     print("Raw response:", topics_text)
                     raise Exception("Failed to parse topics from response")
@@ -150,19 +207,12 @@ Supply Chain Optimization
     except Exception as e:
         print(f"Error in API call: {str(e)}")
         # Fallback to some generic topics
-        return [
-            "Staff Management",
-            "Marketing Strategy",
-            "Financial Planning",
-            "Customer Service",
-            "Technology Implementation"
-        ]
+        telemetry.record_fallback()
+        return list(FALLBACK_SCENARIO_TOPICS)
 
-def generate_scenario(topic, business_profile):
-    """Generate a scenario based on the topic and business profile"""
-    
-    # Create a prompt for scenario generation
-    prompt = f"""You are a business scenario generator for a franchise management simulator. Create a concise scenario based on the following topic and business profile.
+def build_scenario_prompt(topic, business_profile):
+    """Build the prompt for scenario generation"""
+    return f"""You are a business scenario generator for a franchise management simulator. Create a concise scenario based on the following topic and business profile.
 
 Topic: {topic}
 Business Profile: {business_profile}
@@ -206,25 +256,83 @@ Guidelines:
 
 Generate a scenario that follows this structure exactly."""
 
-    try:
-        # Prepare the API request
-        url = "https://api.protobots.ai/proto_bots/generate_v2"
+def parse_scenario(scenario_text):
+    """
+    Parse and validate the scenario generation output
+
+    Raises json.JSONDecodeError if the text is not valid JSON and ValueError
+    if the scenario does not follow the expected structure.
+    """
+    # Remove any markdown code block markers if present
+    scenario_text = scenario_text.replace('```json', '').replace('```', '').strip()
+    
+    # Parse the JSON response
+    scenario = json.loads(scenario_text)
+    validate_scenario(scenario)
+    return scenario
+
+def validate_scenario(scenario):
+    """Raise ValueError if a scenario does not follow the expected structure"""
+    if not isinstance(scenario, dict):
+        raise ValueError("Scenario is not a JSON object")
+    
+    if not all(key in scenario for key in ["description", "best_case", "worst_case"]):
+        raise ValueError("Missing required keys in scenario structure")
+        
+    if not all(key in scenario["best_case"] for key in ["title", "description", "consequences", "next_scenarios"]):
+        raise ValueError("Missing required keys in best_case structure")
         
-        # Headers
+    if not all(key in scenario["worst_case"] for key in ["title", "description", "consequences", "next_scenarios"]):
+        raise ValueError("Missing required keys in worst_case structure")
+
+    if not all(key in scenario["best_case"]["consequences"] for key in ["cash_flow", "customer_satisfaction", "growth_potential", "risk_level"]):
+        raise ValueError("Missing required keys in best_case consequences")
+
+    if not all(key in scenario["worst_case"]["consequences"] for key in ["cash_flow", "customer_satisfaction", "growth_potential", "risk_level"]):
+        raise ValueError("Missing required keys in worst_case consequences")
+
+def scenario_cache_key(topic, business_profile):
+    """Cache key for a generated scenario"""
+    return make_key("scenario", SCENARIO_PROMPT_VERSION, normalize_text(topic), normalize_text(business_profile))
+
+@telemetry.instrumented("scenario")
+# use_cache is part of the key, so a call skipping the cache never joins one served from it
+@singleflight.coalesced("scenario", lambda topic, business_profile, use_cache=True: (scenario_cache_key(topic, business_profile), use_cache))
+def generate_scenario(topic, business_profile, use_cache=True):
+    """
+    Generate a scenario based on the topic and business profile
+
+    Successful generations are always written to the shared scenario cache.
+    With use_cache, the cache is also checked before calling the LLM.
+    """
+    
+    # Reuse a scenario generated earlier for the same topic and profile
+    cache_key = scenario_cache_key(topic, business_profile)
+    if use_cache:
+        cached_scenario = get_scenario_cache().get(cache_key)
+        if cached_scenario is not None:
+            telemetry.record_cache_hit()
+            return cached_scenario
+    
+    # Create a prompt for scenario generation
+    prompt = build_scenario_prompt(topic, business_profile)
+
+    try:
+        # Prepare the API request headers
         headers = {
-            "Authorization": f"Bearer {st.secrets['PROTOBOTS_API_KEY']}"
+            "Authorization": f"Bearer {get_api_key()}"
         }
         
         # Form data
         data = {
             "_id": "64f9ec54981dcfe5b966e5a3",  # Replace with your actual bot ID
             "stream": "false",
-            "message.assistant.0": "I am a business scenario generator. I will create realistic franchise management scenarios following the specified JSON structure.",
+            "message.assistant.0": SCENARIO_ASSISTANT_MESSAGE,
             "message.user.1": prompt
         }
         
-        # Make the API request
-        response = requests.post(url, headers=headers, data=data)
+        # Make the API request through the shared pooled client
+        response = get_client().post(data, headers=headers)
         
         # Check if request was successful
         if response.status_code == 200:
@@ -237,34 +345,18 @@ Generate a scenario that follows this structure exactly."""
             
             if scenario_text:
                 try:
-                    # Clean the response text to ensure it's valid JSON
-                    # Remove any markdown code block markers if present
-                    scenario_text = scenario_text.replace('```json', '').replace('```', '').strip()
-                    
-                    # Parse the JSON response
-                    scenario = json.loads(scenario_text)
-                    
-                    # Validate the structure and values
-                    if not all(key in scenario for key in ["description", "best_case", "worst_case"]):
-                        raise ValueError("Missing required keys in scenario structure")
-                        
-                    if not all(key in scenario["best_case"] for key in ["title", "description", "consequences", "next_scenarios"]):
-                        raise ValueError("Missing required keys in best_case structure")
-                        
-                    if not all(key in scenario["worst_case"] for key in ["title", "description", "consequences", "next_scenarios"]):
-                        raise ValueError("Missing required keys in worst_case structure")
-            
-                    if not all(key in scenario["best_case"]["consequences"] for key in ["cash_flow", "customer_satisfaction", "growth_potential", "risk_level"]):
-                        raise ValueError("Missing required keys in best_case consequences")
-            
-                    if not all(key in scenario["worst_case"]["consequences"] for key in ["cash_flow", "customer_satisfaction", "growth_potential", "risk_level"]):
-                        raise ValueError("Missing required keys in worst_case consequences")
+                    # Parse the JSON response and validate the structure and values
+                    scenario = parse_scenario(scenario_text)
             
+                    # Only successfully generated scenarios are cached, never the random fallback
+                    get_scenario_cache().set(cache_key, scenario)
                     return scenario
-                except json.JSONDecodeError as e:
-                    print(f"JSON parsing error: {str(e)}")
+                except ValueError as e:
+                    # Invalid JSON as well as a scenario missing required keys
+                    telemetry.record_parse_failure()
+                    print(f"Scenario parsing error: {str(e)}")
                     print("Raw response:", scenario_text)
-                    raise Exception("Failed to parse scenario as JSON")
+                    raise Exception("Failed to parse scenario")
             else:
                 print("No scenario found in response")
                 print("Response:", response_data)
@@ -277,8 +369,145 @@ Generate a scenario that follows this structure exactly."""
     except Exception as e:
         print(f"Error in API call: {str(e)}")
         # Fallback to random generation if API fails
+        telemetry.record_fallback()
         return generate_random_scenario(topic)
 
+def build_scenario_batch_prompt(start_topic, business_profile, scenario_count):
+    """Build the prompt for generating a whole run of connected scenarios in one request"""
+    return f"""You are a business scenario generator for a franchise management simulator. Create a connected set of {scenario_count} concise scenarios for one complete simulation run, starting from the topic below.
+
+Starting Topic: {start_topic}
+Business Profile: {business_profile}
+
+Respond with a single JSON object of this exact structure, keyed by scenario topic:
+{{
+    "scenarios": {{
+        "<topic>": {{
+            "description": "A brief description of the situation (1-2 sentences)",
+            "best_case": {{
+                "title": "A short title for the best case option (3-5 words)",
+                "description": "Brief description of the best case approach (1-2 sentences)",
+                "consequences": {{
+                    "cash_flow": <integer between -100000 and 50000>,
+                    "customer_satisfaction": <integer between -25 and 25>,
+                    "growth_potential": <integer between -25 and 25>,
+                    "risk_level": <integer between -25 and 25>
+                }},
+                "next_scenarios": ["<topic>", "<topic>"]
+            }},
+            "worst_case": {{ same structure as best_case }}
+        }}
+    }}
+}}
+
+Guidelines:
+1. Include the starting topic "{start_topic}" exactly as written, plus {scenario_count - 1} other topics (2-4 words each)
+2. Every next_scenarios entry must be the topic key of another scenario in this response
+3. Keep all descriptions extremely concise - no more than 1-2 sentences
+4. Make the scenarios realistic, business-focused and specific to the business profile provided
+5. Best case should be ambitious but achievable; worst case should be conservative but not disastrous
+6. Ensure all numeric values are integers
+
+Generate the scenarios following this structure exactly."""
+
+def parse_scenario_batch(batch_text, start_topic):
+    """
+    Parse and validate a batch of scenarios and slice it into per-topic scenarios
+
+    Invalid scenarios are dropped. next_scenarios references are narrowed to
+    topics inside the batch whenever at least one of them is, so the whole
+    run can be served from the batch. Raises ValueError if the starting
+    topic is missing or invalid.
+    """
+    # Remove any markdown code block markers if present
+    batch_text = batch_text.replace('```json', '').replace('```', '').strip()
+    batch = json.loads(batch_text)
+    
+    if not isinstance(batch, dict) or not isinstance(batch.get("scenarios"), dict):
+        raise ValueError("Missing scenarios object in batch structure")
+    
+    scenarios = {}
+    for topic, scenario in batch["scenarios"].items():
+        try:
+            validate_scenario(scenario)
+        except (ValueError, TypeError) as e:
+            print(f"Dropping invalid scenario {topic} from batch: {str(e)}")
+            continue
+        scenarios[topic.strip()] = scenario
+    
+    if start_topic not in scenarios:
+        raise ValueError("Starting topic missing from batch")
+    
+    for scenario in scenarios.values():
+        for option in ("best_case", "worst_case"):
+            next_scenarios = [topic for topic in scenario[option]["next_scenarios"] if topic in scenarios]
+            if next_scenarios:
+                scenario[option]["next_scenarios"] = next_scenarios
+    
+    return scenarios
+
+@telemetry.instrumented("scenario_batch")
+@singleflight.coalesced("scenario_batch", lambda start_topic, business_profile, scenario_count=10: make_key(
+    "scenario_batch", SCENARIO_PROMPT_VERSION, normalize_text(start_topic), normalize_text(business_profile), scenario_count
+))
+def generate_scenario_batch(start_topic, business_profile, scenario_count=10):
+    """
+    Generate the scenarios for a whole run in a single request
+
+    Returns a dictionary of scenarios keyed by topic that always contains
+    start_topic, or an empty dictionary if batch generation failed so the
+    caller can fall back to generating one scenario at a time. Every
+    scenario is written to the shared scenario cache.
+    """
+    prompt = build_scenario_batch_prompt(start_topic, business_profile, scenario_count)
+    
+    try:
+        # Prepare the API request headers
+        headers = {
+            "Authorization": f"Bearer {get_api_key()}"
+        }
+        
+        # Form data
+        data = {
+            "_id": "64f9ec54981dcfe5b966e5a3",  # Replace with your actual bot ID
+            "stream": "false",
+            "message.assistant.0": SCENARIO_ASSISTANT_MESSAGE,
+            "message.user.1": prompt
+        }
+        
+        # Make the API request through the shared pooled client
+        response = get_client().post(data, headers=headers)
+        
+        if response.status_code != 200:
+            print(f"API request failed with status code {response.status_code}")
+            print("Response:", response.text)
+            raise Exception(f"API request failed with status code {response.status_code}")
+        
+        # The response structure is: {"object": "```json\n{...}\n```"}
+        batch_text = response.json().get('object', '')
+        if not batch_text:
+            raise Exception("No scenarios found in response")
+        
+        try:
+            scenarios = parse_scenario_batch(batch_text, start_topic)
+        except ValueError as e:
+            # Invalid JSON as well as a batch without the starting topic
+            telemetry.record_parse_failure()
+            print(f"Scenario batch parsing error: {str(e)}")
+            print("Raw response:", batch_text)
+            raise Exception("Failed to parse scenario batch")
+        
+        for topic, scenario in scenarios.items():
+            get_scenario_cache().set(scenario_cache_key(topic, business_profile), scenario)
+        
+        print(f"Successfully generated a batch of {len(scenarios)} scenarios")  # Debug print
+        return scenarios
+        
+    except Exception as e:
+        print(f"Error in batch API call: {str(e)}")
+        telemetry.record_fallback()
+        return {}
+
 def generate_random_scenario(topic):
     """Fallback function to generate a random scenario if API fails"""
     # Generate scenario description
@@ -372,8 +601,8 @@ def generate_random_scenario(topic):
     
     return scenario
 
-def generate_simulation_analysis(scenario_history, final_metrics, business_profile):
-    """Generate a brief analysis of the user's decisions and predict business outlook"""
+def build_simulation_analysis_prompt(scenario_history, final_metrics, business_profile):
+    """Build the prompt for the end-of-run analysis"""
     
     # Format the scenario history for the prompt
     decisions_text = ""
@@ -390,7 +619,7 @@ def generate_simulation_analysis(scenario_history, final_metrics, business_profi
     metrics_text += f"- Risk Level: {final_metrics['risk_level']}%\n"
     
     # Create the analysis prompt
-    analysis_prompt = f"""You are a franchise business analyst. Review the following decisions made by a franchise owner in a simulation and provide a detailed analysis.
+    return f"""You are a franchise business analyst. Review the following decisions made by a franchise owner in a simulation and provide a detailed analysis.
 
 Business Profile:
 {business_profile}
@@ -405,25 +634,63 @@ Please provide:
 
 Keep your response under 200 words and be direct and insightful. Focus on concrete examples and specific metrics. If the business is struggling, provide constructive feedback on how to improve. If it's doing well, suggest ways to maintain and build on the success."""
 
+def parse_simulation_analysis(analysis_text):
+    """Extract the analysis text from the analysis generation output"""
+    # Remove any markdown code block markers if present
+    analysis_text = analysis_text.replace('```text', '').replace('```', '').strip()
+    
+    # Try to parse as JSON first
     try:
-        # Prepare the API request
-        url = "https://api.protobots.ai/proto_bots/generate_v2"
-        
-        # Headers
+        analysis = json.loads(analysis_text)
+        if isinstance(analysis, str):
+            return analysis.strip()
+        elif isinstance(analysis, dict):
+            return analysis.get('analysis', '').strip()
+    except json.JSONDecodeError:
+        pass
+    
+    # If not JSON, use the text directly
+    return analysis_text.strip()
+
+def analysis_cache_key(scenario_history, final_metrics, business_profile):
+    """Cache key for the analysis of a completed run"""
+    decisions = [
+        [scenario['topic'], scenario['choice'], scenario['title'], scenario['consequences']]
+        for scenario in scenario_history
+    ]
+    return make_key("analysis", ANALYSIS_PROMPT_VERSION, decisions, final_metrics, normalize_text(business_profile))
+
+@telemetry.instrumented("analysis")
+@singleflight.coalesced("analysis", analysis_cache_key)
+def generate_simulation_analysis(scenario_history, final_metrics, business_profile):
+    """Generate a brief analysis of the user's decisions and predict business outlook"""
+    
+    # Reuse the analysis of an identical run
+    cache_key = analysis_cache_key(scenario_history, final_metrics, business_profile)
+    cached_analysis = get_analysis_cache().get(cache_key)
+    if cached_analysis is not None:
+        telemetry.record_cache_hit()
+        return cached_analysis
+    
+    # Create the analysis prompt
+    analysis_prompt = build_simulation_analysis_prompt(scenario_history, final_metrics, business_profile)
+
+    try:
+        # Prepare the API request headers
         headers = {
-            "Authorization": f"Bearer {st.secrets['PROTOBOTS_API_KEY']}"
+            "Authorization": f"Bearer {get_api_key()}"
         }
         
         # Form data
         data = {
             "_id": "64f9ec54981dcfe5b966e5a3",  # Replace with your actual bot ID
             "stream": "false",
-            "message.assistant.0": "I am a franchise business analyst. I will analyze your business decisions and provide detailed insights.",
+            "message.assistant.0": ANALYSIS_ASSISTANT_MESSAGE,
             "message.user.1": analysis_prompt
         }
         
-        # Make the API request
-        response = requests.post(url, headers=headers, data=data)
+        # Make the API request through the shared pooled client
+        response = get_client().post(data, headers=headers)
         
         # Check if request was successful
         if response.status_code == 200:
@@ -437,20 +704,14 @@ Keep your response under 200 words and be direct and insightful. Focus on concre
             if analysis_text:
                 try:
                     # Clean the response text
-                    # Remove any markdown code block markers if present
-                    analysis_text = analysis_text.replace('```text', '').replace('```', '').strip()
+                    analysis = parse_simulation_analysis(analysis_text)
                     
-                    # Try to parse as JSON first
-                    try:
-                        analysis = json.loads(analysis_text)
-                        if isinstance(analysis, str):
-                            return analysis.strip()
-                        elif isinstance(analysis, dict):
-                            return analysis.get('analysis', '').strip()
-                    except json.JSONDecodeError:
-                        # If not JSON, return the text directly
-                        return analysis_text.strip()
+                    # Only LLM analyses are cached, never the heuristic fallback
+                    if analysis:
+                        get_analysis_cache().set(cache_key, analysis)
+                    return analysis
                 except Exception as e:
+                    telemetry.record_parse_failure()
                     print(f"Error processing analysis text: {str(e)}")
                     print("Raw response:", analysis_text)
                     raise Exception("Failed to process analysis text")
@@ -466,63 +727,71 @@ Keep your response under 200 words and be direct and insightful. Focus on concre
     except Exception as e:
         print(f"Error in API call: {str(e)}")
         # Fallback to detailed analysis based on metrics and history
-        analysis = []
-        
-        # Analyze decision patterns
-        best_case_count = sum(1 for s in scenario_history if s['choice'] == "Best Case")
-        worst_case_count = sum(1 for s in scenario_history if s['choice'] == "Worst Case")
-        
-        if best_case_count > worst_case_count:
-            analysis.append(f"Your decision-making approach shows a preference for ambitious, growth-oriented strategies, choosing the best-case option in {best_case_count} out of {len(scenario_history)} scenarios.")
-        elif worst_case_count > best_case_count:
-            analysis.append(f"Your decision-making approach shows a preference for conservative, risk-averse strategies, choosing the worst-case option in {worst_case_count} out of {len(scenario_history)} scenarios.")
-        else:
-            analysis.append(f"Your decision-making approach shows a balanced strategy, choosing an equal mix of ambitious and conservative options across {len(scenario_history)} scenarios.")
-        
-        # Analyze current business state
-        if final_metrics['cash_flow'] < 50000:
-            analysis.append(f"Your current cash position of ${final_metrics['cash_flow']} indicates financial strain. This may limit your ability to invest in growth opportunities.")
-        elif final_metrics['cash_flow'] < 100000:
-            analysis.append(f"Your current cash position of ${final_metrics['cash_flow']} is moderate. While stable, you may want to build reserves for future opportunities.")
-        else:
-            analysis.append(f"Your strong cash position of ${final_metrics['cash_flow']} provides a solid foundation for growth and investment opportunities.")
-        
-        # Analyze customer satisfaction
-        if final_metrics['customer_satisfaction'] < 40:
-            analysis.append(f"Customer satisfaction at {final_metrics['customer_satisfaction']}% needs immediate attention. Focus on improving service quality and customer experience.")
-        elif final_metrics['customer_satisfaction'] < 60:
-            analysis.append(f"Customer satisfaction at {final_metrics['customer_satisfaction']}% has room for improvement. Consider enhancing customer service initiatives.")
-        else:
-            analysis.append(f"Strong customer satisfaction at {final_metrics['customer_satisfaction']}% indicates effective customer service. Look for ways to maintain and build on this success.")
-        
-        # Analyze growth potential
-        if final_metrics['growth_potential'] < 40:
-            analysis.append(f"Growth potential at {final_metrics['growth_potential']}% suggests limited expansion opportunities. Focus on stabilizing current operations before pursuing growth.")
-        elif final_metrics['growth_potential'] < 60:
-            analysis.append(f"Growth potential at {final_metrics['growth_potential']}% shows moderate expansion possibilities. Look for strategic opportunities to accelerate growth.")
-        else:
-            analysis.append(f"High growth potential at {final_metrics['growth_potential']}% indicates strong expansion opportunities. Consider developing a detailed growth strategy.")
-        
-        # Analyze risk level
-        if final_metrics['risk_level'] > 60:
-            analysis.append(f"High risk level at {final_metrics['risk_level']}% requires immediate attention. Focus on risk mitigation and stability measures.")
-        elif final_metrics['risk_level'] > 40:
-            analysis.append(f"Moderate risk level at {final_metrics['risk_level']}% suggests careful monitoring. Consider implementing additional risk management strategies.")
-        else:
-            analysis.append(f"Low risk level at {final_metrics['risk_level']}% indicates stable operations. Look for opportunities to optimize while maintaining this stability.")
-        
-        # Add specific recommendations
-        if final_metrics['cash_flow'] < 50000:
-            analysis.append("Recommendations: 1) Implement cost-cutting measures to improve cash flow. 2) Focus on high-margin products or services to boost profitability.")
-        elif final_metrics['customer_satisfaction'] < 40:
-            analysis.append("Recommendations: 1) Conduct customer surveys to identify specific pain points. 2) Invest in staff training to improve service quality.")
-        elif final_metrics['growth_potential'] < 40:
-            analysis.append("Recommendations: 1) Review and optimize current operations. 2) Research new market opportunities aligned with your strengths.")
-        else:
-            analysis.append("Recommendations: 1) Develop a detailed expansion strategy. 2) Consider investing in technology or staff to support growth.")
-        
-        return "\n".join(analysis)
+        telemetry.record_fallback()
+        return fallback_simulation_analysis(scenario_history, final_metrics)
+
+def fallback_simulation_analysis(scenario_history, final_metrics):
+    """Heuristic analysis based on metrics and history, used when the LLM is unavailable"""
+    analysis = []
+
+    # Analyze decision patterns
+    best_case_count = sum(1 for s in scenario_history if s['choice'] == "Best Case")
+    worst_case_count = sum(1 for s in scenario_history if s['choice'] == "Worst Case")
+
+    if best_case_count > worst_case_count:
+        analysis.append(f"Your decision-making approach shows a preference for ambitious, growth-oriented strategies, choosing the best-case option in {best_case_count} out of {len(scenario_history)} scenarios.")
+    elif worst_case_count > best_case_count:
+        analysis.append(f"Your decision-making approach shows a preference for conservative, risk-averse strategies, choosing the worst-case option in {worst_case_count} out of {len(scenario_history)} scenarios.")
+    else:
+        analysis.append(f"Your decision-making approach shows a balanced strategy, choosing an equal mix of ambitious and conservative options across {len(scenario_history)} scenarios.")
+
+    # Analyze current business state
+    if final_metrics['cash_flow'] < 50000:
+        analysis.append(f"Your current cash position of ${final_metrics['cash_flow']} indicates financial strain. This may limit your ability to invest in growth opportunities.")
+    elif final_metrics['cash_flow'] < 100000:
+        analysis.append(f"Your current cash position of ${final_metrics['cash_flow']} is moderate. While stable, you may want to build reserves for future opportunities.")
+    else:
+        analysis.append(f"Your strong cash position of ${final_metrics['cash_flow']} provides a solid foundation for growth and investment opportunities.")
+
+    # Analyze customer satisfaction
+    if final_metrics['customer_satisfaction'] < 40:
+        analysis.append(f"Customer satisfaction at {final_metrics['customer_satisfaction']}% needs immediate attention. Focus on improving service quality and customer experience.")
+    elif final_metrics['customer_satisfaction'] < 60:
+        analysis.append(f"Customer satisfaction at {final_metrics['customer_satisfaction']}% has room for improvement. Consider enhancing customer service initiatives.")
+    else:
+        analysis.append(f"Strong customer satisfaction at {final_metrics['customer_satisfaction']}% indicates effective customer service. Look for ways to maintain and build on this success.")
+
+    # Analyze growth potential
+    if final_metrics['growth_potential'] < 40:
+        analysis.append(f"Growth potential at {final_metrics['growth_potential']}% suggests limited expansion opportunities. Focus on stabilizing current operations before pursuing growth.")
+    elif final_metrics['growth_potential'] < 60:
+        analysis.append(f"Growth potential at {final_metrics['growth_potential']}% shows moderate expansion possibilities. Look for strategic opportunities to accelerate growth.")
+    else:
+        analysis.append(f"High growth potential at {final_metrics['growth_potential']}% indicates strong expansion opportunities. Consider developing a detailed growth strategy.")
+
+    # Analyze risk level
+    if final_metrics['risk_level'] > 60:
+        analysis.append(f"High risk level at {final_metrics['risk_level']}% requires immediate attention. Focus on risk mitigation and stability measures.")
+    elif final_metrics['risk_level'] > 40:
+        analysis.append(f"Moderate risk level at {final_metrics['risk_level']}% suggests careful monitoring. Consider implementing additional risk management strategies.")
+    else:
+        analysis.append(f"Low risk level at {final_metrics['risk_level']}% indicates stable operations. Look for opportunities to optimize while maintaining this stability.")
+
+    # Add specific recommendations
+    if final_metrics['cash_flow'] < 50000:
+        analysis.append("Recommendations: 1) Implement cost-cutting measures to improve cash flow. 2) Focus on high-margin products or services to boost profitability.")
+    elif final_metrics['customer_satisfaction'] < 40:
+        analysis.append("Recommendations: 1) Conduct customer surveys to identify specific pain points. 2) Invest in staff training to improve service quality.")
+    elif final_metrics['growth_potential'] < 40:
+        analysis.append("Recommendations: 1) Review and optimize current operations. 2) Research new market opportunities aligned with your strengths.")
+    else:
+        analysis.append("Recommendations: 1) Develop a detailed expansion strategy. 2) Consider investing in technology or staff to support growth.")
+
+    return "\n".join(analysis)
 
+@telemetry.instrumented("profile")
+# Concurrent clicks on "Generate Random Profile" share one generated profile
+@singleflight.coalesced("profile", lambda: "profile")
 def generate_random_business_profile():
     """Generate a random business profile using the LLM"""
     
@@ -549,12 +818,9 @@ def generate_random_business_profile():
     Make the profile realistic and specific, with concrete details that would be useful for generating business scenarios. Ensure the profile is unique and different from previous generations."""
 
     try:
-        # Prepare the API request
-        url = "https://api.protobots.ai/proto_bots/generate_v2"
-        
-        # Headers
+        # Prepare the API request headers
         headers = {
-            "Authorization": f"Bearer {st.secrets['PROTOBOTS_API_KEY']}"
+            "Authorization": f"Bearer {get_api_key()}"
         }
         
         # Form data
@@ -565,8 +831,8 @@ def generate_random_business_profile():
             "message.user.1": prompt
         }
         
-        # Make the API request
-        response = requests.post(url, headers=headers, data=data)
+        # Make the API request through the shared pooled client
+        response = get_client().post(data, headers=headers)
         
         # Check if request was successful
         if response.status_code == 200:
@@ -612,6 +878,7 @@ def generate_random_business_profile():
                     print("Successfully generated new business profile")  # Debug print
                     return formatted_profile
                 except json.JSONDecodeError as e:
+                    telemetry.record_parse_failure()
                     print(f"JSON parsing error: {str(e)}")
                     print("Raw response:", profile_text)
                     raise Exception("Failed to parse profile as JSON")
@@ -627,4 +894,201 @@ def generate_random_business_profile():
     except Exception as e:
         print(f"Error in API call: {str(e)}")
         # Instead of falling back to a hardcoded profile, raise the exception
-        raise Exception(f"Failed to generate business profile: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Failed to generate business profile: {str(e)}")
+
+# Streaming generation. These yield partial results while the response is
+# still arriving so the UI can render progressively instead of waiting for
+# the whole body.
+
+# Matches a complete "description" string value in partially streamed JSON
+DESCRIPTION_PATTERN = re.compile(r'"description"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Matches a partially streamed code block marker at the end of the text
+PARTIAL_MARKER_PATTERN = re.compile(r'`{1,3}(t(e(xt?)?)?)?$')
+
+def stream_generation(assistant_message, prompt):
+    """Stream the raw text of a generation from the protobots API"""
+    # Prepare the API request headers
+    headers = {
+        "Authorization": f"Bearer {get_api_key()}"
+    }
+    
+    # Form data
+    data = {
+        "_id": "64f9ec54981dcfe5b966e5a3",  # Replace with your actual bot ID
+        "stream": "true",
+        "message.assistant.0": assistant_message,
+        "message.user.1": prompt
+    }
+    
+    return get_client().stream(data, headers=headers)
+
+@telemetry.instrumented("topics_stream")
+def stream_scenario_topics(business_profile, uploaded_files=None, custom_topic=None, use_cache=True):
+    """
+    Yield scenario topics one at a time as each line of the generation arrives
+
+    A complete topic list is written to the shared topics cache. With
+    use_cache, a cached list is yielded instead of calling the LLM; pass
+    use_cache=False to regenerate the topics.
+    """
+    cache_key = topics_cache_key(business_profile, custom_topic)
+    if use_cache:
+        cached_topics = get_topics_cache().get(cache_key)
+        if cached_topics is not None:
+            telemetry.record_cache_hit()
+            yield from cached_topics
+            return
+    
+    prompt = build_scenario_topics_prompt(business_profile, custom_topic)
+    
+    topics = []
+    pending_line = ""
+    try:
+        for chunk in stream_generation(TOPICS_ASSISTANT_MESSAGE, prompt):
+            pending_line += chunk
+            *lines, pending_line = pending_line.split('\n')
+            for line in lines:
+                topic = clean_topic_line(line.replace('```text', '').replace('```', ''))
+                if topic:
+                    topics.append(topic)
+                    yield topic
+        
+        # The last line has no trailing newline
+        topic = clean_topic_line(pending_line.replace('```text', '').replace('```', ''))
+        if topic:
+            topics.append(topic)
+            yield topic
+    except Exception as e:
+        print(f"Error in streaming API call: {str(e)}")
+    else:
+        # Only complete topic lists are cached
+        if topics:
+            get_topics_cache().set(cache_key, topics)
+    
+    if not topics:
+        # Fallback to some generic topics
+        telemetry.record_fallback()
+        yield from FALLBACK_SCENARIO_TOPICS
+
+def extract_scenario_description(scenario_text):
+    """Return the scenario description from partially streamed JSON, or None if it is not complete yet"""
+    match = DESCRIPTION_PATTERN.search(scenario_text)
+    if match is None:
+        return None
+    
+    # The option descriptions are nested under best_case/worst_case
+    best_case_start = scenario_text.find('"best_case"')
+    if best_case_start != -1 and best_case_start < match.start():
+        return None
+    
+    try:
+        return json.loads(f'"{match.group(1)}"')
+    except json.JSONDecodeError:
+        return None
+
+@telemetry.instrumented("scenario_stream")
+def stream_scenario(topic, business_profile, use_cache=True):
+    """
+    Generate a scenario while streaming its parts
+
+    Yields ("description", text) as soon as the scenario description is
+    complete, then ("scenario", scenario) once the whole JSON has arrived and
+    been validated. Falls back to a random scenario like generate_scenario.
+    """
+    cache_key = scenario_cache_key(topic, business_profile)
+    if use_cache:
+        cached_scenario = get_scenario_cache().get(cache_key)
+        if cached_scenario is not None:
+            telemetry.record_cache_hit()
+            yield "description", cached_scenario["description"]
+            yield "scenario", cached_scenario
+            return
+    
+    prompt = build_scenario_prompt(topic, business_profile)
+    
+    scenario_text = ""
+    description_sent = False
+    try:
+        for chunk in stream_generation(SCENARIO_ASSISTANT_MESSAGE, prompt):
+            scenario_text += chunk
+            if not description_sent:
+                description = extract_scenario_description(scenario_text)
+                if description is not None:
+                    description_sent = True
+                    yield "description", description
+        
+        try:
+            scenario = parse_scenario(scenario_text)
+        except ValueError:
+            telemetry.record_parse_failure()
+            raise
+        get_scenario_cache().set(cache_key, scenario)
+    except Exception as e:
+        print(f"Error in streaming API call: {str(e)}")
+        print("Raw response:", scenario_text)
+        # Fallback to random generation if API fails
+        telemetry.record_fallback()
+        scenario = generate_random_scenario(topic)
+    
+    if not description_sent:
+        yield "description", scenario["description"]
+    yield "scenario", scenario
+
+# Yielded by stream_simulation_analysis when the stream broke off after some
+# text was already yielded; the chunks after it are the fallback analysis
+# and replace everything received before
+ANALYSIS_INTERRUPTED = object()
+
+@telemetry.instrumented("analysis_stream")
+def stream_simulation_analysis(scenario_history, final_metrics, business_profile):
+    """
+    Yield the analysis text in chunks as it is generated
+
+    Join the chunks and pass them through parse_simulation_analysis to get
+    the final analysis. Falls back to the heuristic analysis if the stream
+    fails; when that happens after text was already yielded,
+    ANALYSIS_INTERRUPTED is yielded first so the caller can discard the
+    partial text and avoid keeping the fallback as the final analysis.
+    """
+    cache_key = analysis_cache_key(scenario_history, final_metrics, business_profile)
+    cached_analysis = get_analysis_cache().get(cache_key)
+    if cached_analysis is not None:
+        telemetry.record_cache_hit()
+        yield cached_analysis
+        return
+    
+    prompt = build_simulation_analysis_prompt(scenario_history, final_metrics, business_profile)
+    
+    analysis_text = ""
+    emitted = 0
+    try:
+        for chunk in stream_generation(ANALYSIS_ASSISTANT_MESSAGE, prompt):
+            analysis_text += chunk
+            
+            # Hold back a code block marker that has only partially arrived
+            marker = PARTIAL_MARKER_PATTERN.search(analysis_text)
+            visible_end = marker.start() if marker else len(analysis_text)
+            visible = analysis_text[:visible_end].replace('```text', '').replace('```', '').lstrip()
+            if len(visible) > emitted:
+                yield visible[emitted:]
+                emitted = len(visible)
+        
+        visible = analysis_text.replace('```text', '').replace('```', '').lstrip()
+        if len(visible) > emitted:
+            yield visible[emitted:]
+            emitted = len(visible)
+        
+        # Only LLM analyses are cached, never the heuristic fallback
+        analysis = parse_simulation_analysis(analysis_text)
+        if analysis:
+            get_analysis_cache().set(cache_key, analysis)
+        return
+    except Exception as e:
+        print(f"Error in streaming API call: {str(e)}")
+    
+    # Fallback to detailed analysis based on metrics and history
+    telemetry.record_fallback()
+    if emitted:
+        yield ANALYSIS_INTERRUPTED
+    yield fallback_simulation_analysis(scenario_history, final_metrics)
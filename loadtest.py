@@ -0,0 +1,325 @@
+"""
+Multi-session load test for the Streamlit app
+
+Drives N simulated users through the full flow in one process with
+Streamlit's AppTest: intro, business profile, topic generation, five
+decisions with slider tweaks, and the summary. Every rerun is timed and the
+report gives p50/p95/p99 rerun latency per step, throughput and the
+process's memory use. Generation requests go to stub_server.py, started
+in-process unless --url points at an already running endpoint.
+
+Run with:
+    python loadtest.py --users 20 --latency lognormal:-1.0,0.5
+    python loadtest.py --users 50 --ramp-up 10 --error-rate 0.05 --output loadtest.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from urllib import parse
+
+import numpy as np
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.pages_manager import PagesManager
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Percentiles reported for every step
+PERCENTILES = (50, 95, 99)
+
+SLIDER_KEYS = ["cash_flow_slider", "customer_satisfaction_slider", "growth_potential_slider", "risk_level_slider"]
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is the peak, in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemorySampler:
+    """Sample the process RSS in a background thread"""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(current_rss())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.samples.append(current_rss())
+
+    def summary(self):
+        return {
+            'start_mb': self.samples[0] / 2 ** 20,
+            'peak_mb': max(self.samples) / 2 ** 20,
+            'end_mb': self.samples[-1] / 2 ** 20
+        }
+
+
+def install_shared_runtime(secrets):
+    """
+    Set up the process-wide state AppTest normally swaps in and out on every run
+
+    AppTest replaces the runtime singleton and st.secrets for the duration
+    of each run and then resets them, so reruns from several threads break
+    each other. Installing them once lets ConcurrentAppTest reruns overlap.
+    """
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    shared_secrets = Secrets()
+    shared_secrets._secrets = dict(secrets)
+    st.secrets = shared_secrets
+
+
+class ConcurrentAppTest(AppTest):
+    """AppTest whose reruns may run in several threads at once, see install_shared_runtime"""
+
+    def _run(self, widget_state=None, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+
+        script_runner = LocalScriptRunner(
+            self._script_path,
+            self.session_state,
+            PagesManager(self._script_path, setup_watcher=False),
+            args=self.args,
+            kwargs=self.kwargs
+        )
+        self._tree = script_runner.run(widget_state, self.query_params, timeout, self._page_hash)
+        self._tree._runner = self
+        # The last event is the shutdown, whose data includes the query string
+        self.query_params = parse.parse_qs(script_runner.event_data[-1]["client_state"].query_string)
+        return self
+
+
+class SimulatedUser:
+    """
+    One user walking through the whole app
+
+    Parameters:
+    - user_id: Number used in the business profile and for the random seed
+    - timeout: Seconds AppTest waits for a single rerun
+    - think_time: Maximum seconds to pause between interactions
+    """
+
+    def __init__(self, user_id, timeout=60, think_time=0.0):
+        self.user_id = user_id
+        self.timeout = timeout
+        self.think_time = think_time
+        self.rng = random.Random(user_id)
+        self.timings = []
+        self.empty_reruns = 0
+        self.error = None
+
+    def _rerun(self, step, action):
+        """Run one interaction, record how long the rerun took and fail on app exceptions"""
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, self.think_time))
+        started = time.perf_counter()
+        action()
+        # AppTest can hand back the tree of a run interrupted by st.rerun();
+        # fetch the finished page like a browser would
+        if not self.at.main.children:
+            self.empty_reruns += 1
+            self.at.run()
+        self.timings.append((step, time.perf_counter() - started))
+        if self.at.exception:
+            raise RuntimeError(f"{step}: {self.at.exception[0].value}")
+
+    def run(self):
+        try:
+            self.at = at = ConcurrentAppTest(APP_PATH, default_timeout=self.timeout)
+
+            self._rerun("intro", at.run)
+            self._rerun("start", lambda: at.button(key="start_sim_btn").click().run())
+
+            at.text_area[0].input(f"Load test franchise #{self.user_id}: a coffee shop chain with {self.rng.randint(1, 20)} locations")
+            generate = next(button for button in at.button if button.label == "Generate Scenarios")
+            self._rerun("profile", lambda: generate.click().run())
+            # Topics stream in on the rerun after the profile is submitted
+            if not any(button.key and button.key.startswith("select_") for button in at.button):
+                self._rerun("topics", at.run)
+
+            select = self.rng.choice([button for button in at.button if button.key and button.key.startswith("select_")])
+            self._rerun("select_topic", lambda: select.click().run())
+
+            # A decision that runs out of cash ends the run early
+            while not at.session_state["simulation"].finished:
+                for key in self.rng.sample(SLIDER_KEYS, self.rng.randint(1, 2)):
+                    value = round(self.rng.choice([0.5, 0.8, 1.2, 1.5, 2.0]), 1)
+                    self._rerun("slider", lambda key=key, value=value: at.slider(key=key).set_value(value).run())
+                option = "best_case_btn" if self.rng.random() < 0.5 else "worst_case_btn"
+                self._rerun("decision", lambda option=option: at.button(key=option).click().run())
+
+            # Game over shows the summary on the next rerun
+            if not any(element.value == "## Franchise Simulation Summary" for element in at.markdown):
+                self._rerun("summary", at.run)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            if os.environ.get("LOADTEST_TRACEBACKS"):
+                traceback.print_exc()
+        return self
+
+
+def percentiles(values):
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def build_report(users, elapsed, memory, concurrency):
+    """Summarize rerun latencies, throughput and memory into a plain dictionary"""
+    by_step = {}
+    for user in users:
+        for step, seconds in user.timings:
+            by_step.setdefault(step, []).append(seconds)
+    every_rerun = [seconds for values in by_step.values() for seconds in values]
+    completed = sum(1 for user in users if user.error is None)
+
+    return {
+        'users': len(users),
+        'concurrency': concurrency,
+        'completed': completed,
+        'errors': [f"user {user.user_id}: {user.error}" for user in users if user.error],
+        'elapsed_seconds': elapsed,
+        'reruns': len(every_rerun),
+        'empty_reruns': sum(user.empty_reruns for user in users),
+        'reruns_per_second': len(every_rerun) / elapsed if elapsed else 0.0,
+        'flows_per_minute': completed * 60 / elapsed if elapsed else 0.0,
+        'rerun_latency': dict(percentiles(every_rerun), mean=float(np.mean(every_rerun)) if every_rerun else None,
+                              max=max(every_rerun) if every_rerun else None),
+        'steps': {
+            step: dict(percentiles(values), count=len(values), mean=float(np.mean(values)))
+            for step, values in by_step.items()
+        },
+        'memory': dict(memory, per_user_mb=(memory['peak_mb'] - memory['start_mb']) / max(len(users), 1))
+    }
+
+def print_report(report):
+    latency = report['rerun_latency']
+    print(f"\nUsers: {report['users']} ({report['concurrency']} concurrent), completed: {report['completed']}, "
+          f"elapsed: {report['elapsed_seconds']:.1f}s")
+    print(f"Throughput: {report['reruns_per_second']:.1f} reruns/s, {report['flows_per_minute']:.1f} flows/min")
+    if latency['p50'] is not None:
+        print(f"Rerun latency: p50 {latency['p50'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms, "
+              f"p99 {latency['p99'] * 1000:.0f} ms, max {latency['max'] * 1000:.0f} ms")
+    print(f"\n{'step':14s} {'count':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for step, stats in report['steps'].items():
+        print(f"{step:14s} {stats['count']:6d} {stats['p50'] * 1000:9.0f} {stats['p95'] * 1000:9.0f} {stats['p99'] * 1000:9.0f}")
+    memory = report['memory']
+    print(f"\nMemory: start {memory['start_mb']:.0f} MB, peak {memory['peak_mb']:.0f} MB, "
+          f"end {memory['end_mb']:.0f} MB, ~{memory['per_user_mb']:.1f} MB per user")
+    deduplicated = {name: stats['deduplicated'] for name, stats in report.get('singleflight', {}).items() if stats['deduplicated']}
+    if deduplicated:
+        print("Coalesced generations: " + ", ".join(f"{name} {count}" for name, count in deduplicated.items()))
+    for error in report['errors'][:10]:
+        print(f"Error: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive simulated users through the app and report rerun latency")
+    parser.add_argument("--users", type=int, default=10, help="Total number of simulated users")
+    parser.add_argument("--concurrency", type=int, default=None, help="Users active at once (defaults to --users)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which user start times are spread")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Maximum pause in seconds between interactions")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for a single rerun")
+    parser.add_argument("--url", help="Use an already running endpoint instead of an in-process stub server")
+    parser.add_argument("--latency", default="lognormal:-1.5,0.5", help="Stub latency distribution, see stub_server.parse_latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub error rate")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Stub malformed payload rate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the stub server")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Settings must be in place before the app's modules are first imported
+    os.environ.setdefault("PROTOBOTS_API_KEY", "loadtest")
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ.setdefault("GENERATION_CACHE_PATH", os.path.join(scratch, "generated.sqlite3"))
+    os.environ.setdefault("SESSION_STORE_PATH", os.path.join(scratch, "sessions.sqlite3"))
+
+    server = None
+    if args.url:
+        os.environ["PROTOBOTS_URL"] = args.url
+    else:
+        from stub_server import StubServer
+        server = StubServer(port=0, latency=args.latency, error_rate=args.error_rate,
+                            malformed_rate=args.malformed_rate, seed=args.seed).start()
+        os.environ["PROTOBOTS_URL"] = server.url
+        print(f"Stub server listening on {server.url}")
+
+    concurrency = args.concurrency or args.users
+    users = [SimulatedUser(user_id, timeout=args.timeout, think_time=args.think_time) for user_id in range(args.users)]
+    delay = args.ramp_up / max(args.users - 1, 1)
+
+    install_shared_runtime({"PROTOBOTS_API_KEY": os.environ["PROTOBOTS_API_KEY"]})
+    st.config.set_option("global.appTest", True)
+
+    memory = MemorySampler().start()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest-user") as executor:
+            futures = []
+            for user in users:
+                futures.append(executor.submit(user.run))
+                if delay:
+                    time.sleep(delay)
+            for future in futures:
+                future.result()
+    finally:
+        elapsed = time.perf_counter() - started
+        memory.stop()
+        if server is not None:
+            server.stop()
+
+    report = build_report(users, elapsed, memory.summary(), concurrency)
+    if server is not None:
+        report['stub'] = server.stats()
+    import singleflight
+    report['singleflight'] = singleflight.flight_stats()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
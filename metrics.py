@@ -0,0 +1,168 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Fixed metric order used by MetricsVector and every metrics array
+METRICS = ['cash_flow', 'customer_satisfaction', 'growth_potential', 'risk_level']
+
+# Metrics clamped to 0-100 after every decision (everything except cash flow)
+CLAMPED_METRICS = METRICS[1:]
+
+_METRIC_SET = frozenset(METRICS)
+
+
+class MetricsVector(MutableMapping):
+    """
+    Compact fixed-order business metrics
+
+    Stores the four metrics in slots instead of a dictionary, so copying and
+    applying consequences avoid per-key hashing. It is a full mapping, so it
+    can be passed anywhere a metrics dictionary is expected (display
+    functions, prompts, apply_scenario_consequences); use as_dict() where a
+    real dict is required, e.g. for JSON.
+
+    Parameters:
+    - cash_flow, customer_satisfaction, growth_potential, risk_level: Metric values
+    """
+
+    __slots__ = tuple(METRICS)
+
+    def __init__(self, cash_flow=0, customer_satisfaction=0, growth_potential=0, risk_level=0):
+        self.cash_flow = cash_flow
+        self.customer_satisfaction = customer_satisfaction
+        self.growth_potential = growth_potential
+        self.risk_level = risk_level
+
+    @classmethod
+    def from_mapping(cls, metrics):
+        """Build a vector from a metrics dictionary (or another vector)"""
+        return cls(
+            metrics['cash_flow'],
+            metrics['customer_satisfaction'],
+            metrics['growth_potential'],
+            metrics['risk_level']
+        )
+
+    def __getitem__(self, metric):
+        if metric not in METRICS:
+            raise KeyError(metric)
+        return getattr(self, metric)
+
+    def __setitem__(self, metric, value):
+        if metric not in METRICS:
+            raise KeyError(metric)
+        setattr(self, metric, value)
+
+    def __delitem__(self, metric):
+        raise TypeError("Metrics cannot be removed from a MetricsVector")
+
+    def __iter__(self):
+        return iter(METRICS)
+
+    def __len__(self):
+        return len(METRICS)
+
+    def __repr__(self):
+        return f"MetricsVector({self.as_dict()!r})"
+
+    def __getstate__(self):
+        return self.as_tuple()
+
+    def __setstate__(self, state):
+        self.cash_flow, self.customer_satisfaction, self.growth_potential, self.risk_level = state
+
+    def as_tuple(self):
+        """Metric values in METRICS order"""
+        return (self.cash_flow, self.customer_satisfaction, self.growth_potential, self.risk_level)
+
+    def as_dict(self):
+        """Plain dictionary of the metrics"""
+        return {
+            'cash_flow': self.cash_flow,
+            'customer_satisfaction': self.customer_satisfaction,
+            'growth_potential': self.growth_potential,
+            'risk_level': self.risk_level
+        }
+
+    def copy(self):
+        return MetricsVector(self.cash_flow, self.customer_satisfaction, self.growth_potential, self.risk_level)
+
+    def apply(self, consequences):
+        """
+        Return new metrics with consequences applied
+
+        Same result as apply_scenario_consequences: values are added and every
+        metric except cash flow is clamped to 0-100. Raises KeyError for an
+        unknown metric.
+        """
+        unknown = consequences.keys() - _METRIC_SET
+        if unknown:
+            raise KeyError(unknown.pop())
+
+        cash_flow = self.cash_flow
+        customer_satisfaction = self.customer_satisfaction
+        growth_potential = self.growth_potential
+        risk_level = self.risk_level
+        if 'cash_flow' in consequences:
+            cash_flow += consequences['cash_flow']
+        if 'customer_satisfaction' in consequences:
+            customer_satisfaction = max(0, min(100, customer_satisfaction + consequences['customer_satisfaction']))
+        if 'growth_potential' in consequences:
+            growth_potential = max(0, min(100, growth_potential + consequences['growth_potential']))
+        if 'risk_level' in consequences:
+            risk_level = max(0, min(100, risk_level + consequences['risk_level']))
+        return MetricsVector(cash_flow, customer_satisfaction, growth_potential, risk_level)
+
+    def health(self):
+        """Overall business health score, identical to calculate_business_health"""
+        health_score = (
+            (0.4 * min(self.cash_flow / 100000, 1)) +
+            (0.3 * (self.customer_satisfaction / 100)) +
+            (0.2 * (self.growth_potential / 100)) -
+            (0.1 * (self.risk_level / 100))
+        )
+        return round(max(0, min(1, health_score)) * 100)
+
+
+def to_array(states):
+    """Stack metrics dictionaries or vectors into an (N, 4) array in METRICS order"""
+    return np.array([[state[metric] for metric in METRICS] for state in states]).reshape(-1, len(METRICS))
+
+def from_array(row):
+    """Convert one row of a metrics array back into a MetricsVector"""
+    return MetricsVector(*row.tolist())
+
+def consequences_array(consequences):
+    """Convert a consequences dictionary into a row in METRICS order (missing metrics are 0)"""
+    return np.array([consequences.get(metric, 0) for metric in METRICS])
+
+def clamp_batch(metrics, out=None):
+    """Clamp every metric except cash flow to 0-100 over an (N, 4) array"""
+    if out is None:
+        out = np.array(metrics, copy=True)
+    elif out is not metrics:
+        out[...] = metrics
+    np.clip(out[..., 1:], 0, 100, out=out[..., 1:])
+    return out
+
+def apply_batch(metrics, deltas, out=None):
+    """
+    Apply consequences to N states at once
+
+    deltas is an (N, 4) array or a single (4,) row applied to every state.
+    Same result row by row as apply_scenario_consequences for states that
+    start within bounds. Pass out=metrics to update in place.
+    """
+    out = np.add(metrics, deltas, out=out)
+    return clamp_batch(out, out=out)
+
+def health_batch(metrics):
+    """Vectorized calculate_business_health over an (N, 4) metrics array"""
+    metrics = np.asarray(metrics)
+    health_score = (
+        (0.4 * np.minimum(metrics[..., 0] / 100000, 1)) +
+        (0.3 * (metrics[..., 1] / 100)) +
+        (0.2 * (metrics[..., 2] / 100)) -
+        (0.1 * (metrics[..., 3] / 100))
+    )
+    return np.round(np.clip(health_score, 0, 1) * 100).astype(np.int64)
@@ -0,0 +1,150 @@
+import numpy as np
+
+from scenarios import SCENARIO_DATABASE
+from utils import INITIAL_METRICS
+from engine import MAX_DECISIONS, DEFAULT_IMPACT_MULTIPLIERS
+from metrics import METRICS, apply_batch, health_batch
+from scenario_index import get_index
+
+# Percentiles reported by MonteCarloResult.summary()
+DEFAULT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Paths simulated per batch; bounds peak memory for very large runs
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class MonteCarloResult:
+    """
+    Final state of every simulated path
+
+    Parameters:
+    - final_metrics: int64 array of shape (paths, 4) in METRICS order
+    - health: int64 array of final business health scores
+    - game_over: Boolean array, True where cash flow ran out
+    - decisions: Number of decisions made on each path
+    """
+
+    def __init__(self, final_metrics, health, game_over, decisions):
+        self.final_metrics = final_metrics
+        self.health = health
+        self.game_over = game_over
+        self.decisions = decisions
+
+    def __len__(self):
+        return len(self.health)
+
+    @property
+    def game_over_probability(self):
+        """Fraction of paths that ended with cash flow at or below zero"""
+        return float(self.game_over.mean()) if len(self) else 0.0
+
+    def values(self, name):
+        """Final values for a metric name or 'health'"""
+        if name == 'health':
+            return self.health
+        return self.final_metrics[:, METRICS.index(name)]
+
+    def percentiles(self, name, percentiles=DEFAULT_PERCENTILES):
+        """Dictionary mapping each percentile to its value for a metric or 'health'"""
+        values = np.percentile(self.values(name), percentiles)
+        return {p: float(v) for p, v in zip(percentiles, values)}
+
+    def histogram(self, name, bins=None):
+        """
+        Histogram of final values for a metric or 'health'
+
+        Health and the clamped metrics default to one bin per integer from 0
+        to 100; cash flow defaults to 50 equal-width bins. Returns a
+        (counts, bin_edges) tuple like numpy.histogram.
+        """
+        if bins is None:
+            bins = 50 if name == 'cash_flow' else np.arange(102)
+        return np.histogram(self.values(name), bins=bins)
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        """Plain dictionary of path count, game-over probability and percentiles"""
+        return {
+            'paths': len(self),
+            'game_over_probability': self.game_over_probability,
+            'mean_health': float(self.health.mean()) if len(self) else 0.0,
+            'percentiles': {
+                name: self.percentiles(name, percentiles)
+                for name in ['health'] + METRICS
+            }
+        }
+
+
+def simulate(n_paths, start_topic=None, policy=None, best_case_probability=0.5, multipliers=None,
+             max_decisions=MAX_DECISIONS, initial_metrics=None, database=SCENARIO_DATABASE,
+             seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Simulate many decision paths through the scenario graph at once
+
+    Follows the same rules as the app: multiplied consequences are truncated
+    to integers, every metric except cash flow is clamped to 0-100, the next
+    topic is sampled from the chosen option's next_scenarios, and a
+    path stops early once cash flow drops to zero or below.
+
+    Parameters:
+    - n_paths: Number of paths to simulate
+    - start_topic: Topic every path starts from (random topic per path if None)
+    - policy: None for random choices, or an integer array of option indexes
+      (0 best case, 1 worst case) of shape (topics,) or (max_decisions, topics)
+    - best_case_probability: Chance of the best case when choosing randomly
+    - multipliers: Impact multipliers per metric (defaults to 1.0 for all)
+    - max_decisions: Number of decisions per path
+    - initial_metrics: Starting metrics (defaults to INITIAL_METRICS)
+    - database: Scenario database to simulate
+    - seed: Seed for the random generator
+    - chunk_size: Paths simulated per batch
+
+    Returns a MonteCarloResult.
+    """
+    index = get_index(database)
+    multipliers = dict(DEFAULT_IMPACT_MULTIPLIERS, **(multipliers or {}))
+    initial_metrics = initial_metrics if initial_metrics is not None else INITIAL_METRICS
+    rng = np.random.default_rng(seed)
+
+    # Multiply once per (topic, option)
+    scaled = index.scaled_consequences(multipliers)
+
+    if policy is not None:
+        policy = np.asarray(policy, dtype=np.int64)
+        if policy.ndim == 1:
+            policy = np.broadcast_to(policy, (max_decisions, len(index)))
+
+    start = np.array([initial_metrics[metric] for metric in METRICS], dtype=np.int64)
+    results = []
+    for offset in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - offset)
+        metrics = np.tile(start, (size, 1))
+        decisions = np.zeros(size, dtype=np.int64)
+        active = np.ones(size, dtype=bool)
+        if start_topic is None:
+            topic = rng.integers(0, len(index), size)
+        else:
+            topic = np.full(size, index.topic_ids[start_topic], dtype=np.int64)
+
+        for step in range(max_decisions):
+            if policy is None:
+                option = (rng.random(size) >= best_case_probability).astype(np.int64)
+            else:
+                option = policy[step, topic]
+
+            delta = scaled[topic, option]
+            delta[~active] = 0
+            apply_batch(metrics, delta, out=metrics)
+            decisions += active
+
+            # Paths that ran out of cash make no further decisions
+            active &= metrics[:, 0] > 0
+            if step + 1 == max_decisions or not active.any():
+                break
+
+            topic = index.sample_next_batch(topic, option, rng)
+
+        results.append((metrics, decisions))
+
+    final_metrics = np.concatenate([metrics for metrics, _ in results]) if results else np.zeros((0, len(METRICS)), dtype=np.int64)
+    decisions = np.concatenate([decisions for _, decisions in results]) if results else np.zeros(0, dtype=np.int64)
+    return MonteCarloResult(final_metrics, health_batch(final_metrics), final_metrics[:, 0] <= 0, decisions)
@@ -0,0 +1,171 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import product
+from operator import itemgetter
+
+import numpy as np
+
+from metrics import METRICS
+
+# Impact narratives per metric. A consequence falls into one of seven bands
+# around the two thresholds (t1, t2):
+#   <= -t2, <= -t1, < 0, == 0, > 0, >= t1, >= t2
+# and each band has its own phrase, listed in that order.
+NARRATIVE_TABLE = {
+    'cash_flow': {
+        'thresholds': (10000, 30000),
+        'phrases': (
+            "caused a major financial setback",
+            "created a notable financial strain",
+            "required a small financial investment",
+            "had no financial impact",
+            "slightly increased available funds",
+            "improved your cash position",
+            "significantly boosted your finances"
+        )
+    },
+    'customer_satisfaction': {
+        'thresholds': (5, 15),
+        'phrases': (
+            "seriously disappointed customers",
+            "created some customer dissatisfaction",
+            "slightly upset some customers",
+            "kept customers at their current satisfaction level",
+            "slightly improved the customer experience",
+            "made customers noticeably happier",
+            "delighted your customers"
+        )
+    },
+    'growth_potential': {
+        'thresholds': (5, 15),
+        'phrases': (
+            "severely limited growth opportunities",
+            "constrained some growth options",
+            "slightly narrowed future possibilities",
+            "maintained current growth trajectory",
+            "slightly improved future prospects",
+            "opened up new growth avenues",
+            "created significant new growth opportunities"
+        )
+    },
+    'risk_level': {
+        'thresholds': (5, 15),
+        'phrases': (
+            "dramatically improved business security",
+            "improved business stability",
+            "slightly reduced business vulnerability",
+            "kept risk levels steady",
+            "slightly raised exposure to risk",
+            "introduced new risk elements",
+            "substantially increased business vulnerability"
+        )
+    }
+}
+
+# Sentence combining the phrases of the four metrics in METRICS order
+NARRATIVE_TEMPLATE = "This decision {}. It {}, {}, and {}."
+
+# Band of a zero consequence
+ZERO_BAND = 3
+
+_THRESHOLDS = [NARRATIVE_TABLE[metric]['thresholds'] for metric in METRICS]
+_NEGATIVE_THRESHOLDS = [(-t2, -t1) for t1, t2 in _THRESHOLDS]
+_PHRASES = [NARRATIVE_TABLE[metric]['phrases'] for metric in METRICS]
+_consequence_values = itemgetter(*METRICS)
+
+
+def impact_band(metric_index, value):
+    """Band (0-6) of a consequence for the metric at metric_index in METRICS"""
+    if value > 0:
+        # Positive bands include their threshold: >= t1, >= t2
+        return ZERO_BAND + 1 + bisect_right(_THRESHOLDS[metric_index], value)
+    if value < 0:
+        # Negative bands include their threshold: <= -t2, <= -t1
+        return bisect_left(_NEGATIVE_THRESHOLDS[metric_index], value)
+    return ZERO_BAND
+
+def describe_impact(metric, value):
+    """Phrase describing the impact of one consequence, e.g. "improved your cash position" """
+    metric_index = METRICS.index(metric)
+    return _PHRASES[metric_index][impact_band(metric_index, value)]
+
+@lru_cache(maxsize=4096)
+def _narrate_bands(bands):
+    return NARRATIVE_TEMPLATE.format(*(phrases[band] for phrases, band in zip(_PHRASES, bands)))
+
+@lru_cache(maxsize=4096)
+def _narrate_values(values):
+    return _narrate_bands(tuple(impact_band(i, value) for i, value in enumerate(values)))
+
+def narrate(consequences):
+    """
+    Natural-sounding summary of how a decision's consequences affected the business
+
+    Narratives are cached per consequence tuple, so rerendering the same
+    decisions costs a dictionary lookup.
+    """
+    return _narrate_values(tuple(consequences[metric] for metric in METRICS))
+
+def impact_bands_batch(consequences):
+    """Bands of an (N, 4) consequences array in METRICS order, as an (N, 4) integer array"""
+    consequences = np.asarray(consequences)
+    bands = np.full(consequences.shape, ZERO_BAND, dtype=np.int8)
+    for i, ((t1, t2), negative) in enumerate(zip(_THRESHOLDS, _NEGATIVE_THRESHOLDS)):
+        column = consequences[:, i]
+        positive_bands = ZERO_BAND + 1 + np.searchsorted((t1, t2), column, side='right')
+        negative_bands = np.searchsorted(negative, column, side='left')
+        bands[:, i] = np.where(column > 0, positive_bands, np.where(column < 0, negative_bands, ZERO_BAND))
+    return bands
+
+@lru_cache(maxsize=None)
+def _sentence_table():
+    """Narrative of every band combination, indexed by its base-7 code"""
+    return [_narrate_bands(bands) for bands in product(range(2 * ZERO_BAND + 1), repeat=len(METRICS))]
+
+def narrate_batch(consequences):
+    """
+    Narrate many decisions at once
+
+    Parameters:
+    - consequences: Iterable of consequence dictionaries, or an (N, 4) array in METRICS order
+
+    Bands are computed with NumPy for the whole batch and looked up in a
+    table holding the narrative of every band combination.
+    """
+    if not isinstance(consequences, np.ndarray):
+        consequences = list(consequences)
+        consequences = np.fromiter(
+            map(_consequence_values, consequences), dtype=(np.float64, len(METRICS)), count=len(consequences)
+        )
+    if not len(consequences):
+        return []
+    bands = impact_bands_batch(consequences).astype(np.int64)
+    codes = bands @ (2 * ZERO_BAND + 1) ** np.arange(len(METRICS) - 1, -1, -1)
+    table = _sentence_table()
+    return [table[code] for code in codes.tolist()]
+
+def narrate_runs(runs):
+    """
+    Narrate every decision of many stored runs
+
+    Parameters:
+    - runs: Iterable of decision histories, each a list of decisions with a consequences dictionary
+
+    Returns a list with one list of narratives per run.
+    """
+    runs = [list(run) for run in runs]
+    narratives = narrate_batch([decision['consequences'] for run in runs for decision in run])
+    result, start = [], 0
+    for run in runs:
+        result.append(narratives[start:start + len(run)])
+        start += len(run)
+    return result
+
+@lru_cache(maxsize=4096)
+def impact_label(metric, value):
+    """Markdown label for one consequence, e.g. "**Cash Flow**: ↑ $20000" """
+    metric_name = metric.replace("_", " ").title()
+    prefix = "$" if metric == "cash_flow" else ""
+    suffix = "%" if metric != "cash_flow" else ""
+    arrow = "↑" if value > 0 else "↓" if value < 0 else "→"
+    return f"**{metric_name}**: {arrow} {prefix}{abs(value)}{suffix}"
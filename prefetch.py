@@ -0,0 +1,76 @@
+import threading
+
+from concurrent_generator import submit_scenario
+
+
+class ScenarioPrefetcher:
+    """
+    Speculatively generate the scenarios a user can reach next
+
+    While a scenario is on screen, every topic listed in its options'
+    next_scenarios is generated in the background. Once the user has chosen,
+    branches that can no longer be reached are cancelled and the chosen topic
+    resolves from the already-running (or finished) generation.
+
+    Parameters:
+    - submit: Function taking (topic, business_profile) and returning a Future
+    """
+
+    def __init__(self, submit=submit_scenario):
+        self._submit = submit
+        self._futures = {}
+        self._business_profile = None
+        self._lock = threading.Lock()
+
+    def prefetch(self, topics, business_profile):
+        """Start generating each topic that is not already in flight"""
+        with self._lock:
+            # Generations for another profile are useless, so start over
+            if business_profile != self._business_profile:
+                self._cancel(list(self._futures))
+                self._business_profile = business_profile
+
+            for topic in topics:
+                if topic and topic not in self._futures:
+                    self._futures[topic] = self._submit(topic, business_profile)
+
+    def retain(self, topics):
+        """Cancel the prefetches for every topic not in topics"""
+        with self._lock:
+            self._cancel([topic for topic in self._futures if topic not in topics])
+
+    def clear(self):
+        """Cancel all prefetches"""
+        self.retain(())
+
+    def pop(self, topic, business_profile, timeout=None):
+        """
+        Take the prefetched scenario for a topic
+
+        Waits for the generation if it is still running. Returns None if the
+        topic was never prefetched (or was prefetched for another profile),
+        or if the prefetch failed, timed out or was cancelled.
+        """
+        with self._lock:
+            if business_profile != self._business_profile:
+                return None
+            future = self._futures.pop(topic, None)
+
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Prefetch for {topic} failed: {str(e)}")
+            return None
+
+    def pending(self):
+        """Return the topics that are currently prefetched or in flight"""
+        with self._lock:
+            return list(self._futures)
+
+    def _cancel(self, topics):
+        # Futures that are already running cannot be interrupted; their
+        # results are simply dropped once they finish
+        for topic in topics:
+            self._futures.pop(topic).cancel()
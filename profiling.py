@@ -0,0 +1,155 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+
+import streamlit as st
+
+import telemetry
+
+# Number of past reruns kept per session for the averages in the debug panel
+HISTORY_SIZE = 50
+
+# Number of functions listed in the profiler report
+REPORT_LIMIT = 40
+
+
+class RerunTimer:
+    """
+    Wall-clock breakdown of a single rerun of app.py
+
+    Sections are recorded as laps: lap(name) attributes the time since the
+    previous lap (or the start of the rerun) to name, so the sections of a
+    rerun always add up to its total.
+
+    Parameters:
+    - profile: Also capture a cProfile profile of the rerun
+    """
+
+    def __init__(self, profile=False):
+        self.started = time.perf_counter()
+        self.last_lap = self.started
+        self.sections = []
+        self.finished = False
+        self.interrupted = False
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def lap(self, name):
+        """Record the time since the previous lap as section name"""
+        now = time.perf_counter()
+        self.sections.append((name, now - self.last_lap))
+        self.last_lap = now
+
+    @property
+    def total(self):
+        return self.last_lap - self.started
+
+    def finish(self, interrupted=False):
+        """Stop timing and profiling; the rerun ends at the last lap"""
+        if self.finished:
+            return
+        self.finished = True
+        self.interrupted = interrupted
+        if self.profiler is not None:
+            self.profiler.disable()
+        for name, seconds in self.sections:
+            telemetry.APP_RERUN_SECTION_DURATION.observe(seconds, section=name)
+        telemetry.APP_RERUN_SECTION_DURATION.observe(self.total, section="total")
+
+    def record(self):
+        """Summary stored in the rerun history"""
+        return {'sections': list(self.sections), 'total': self.total, 'interrupted': self.interrupted}
+
+    def profile_report(self, sort="cumulative", limit=REPORT_LIMIT):
+        """Text report of the captured profile, or None without one"""
+        if self.profiler is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def profile_dump(self):
+        """Captured profile in the binary format read by pstats and snakeviz, or None without one"""
+        if self.profiler is None:
+            return None
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+
+def _query_flag(name):
+    return st.query_params.get(name, "0").lower() not in ("", "0", "false", "no")
+
+def start_rerun():
+    """
+    Start timing this rerun and return its RerunTimer
+
+    The previous rerun of the session is finished here if it never reached
+    end_rerun, which happens when st.rerun() interrupts the script. Adding
+    ?profile=1 to the URL captures a cProfile profile of every rerun.
+    """
+    previous = st.session_state.get('_rerun_timer')
+    if previous is not None and not previous.finished:
+        previous.finish(interrupted=True)
+        _remember(previous)
+
+    timer = RerunTimer(profile=_query_flag("profile"))
+    st.session_state['_rerun_timer'] = timer
+    return timer
+
+def _remember(timer):
+    history = st.session_state.setdefault('_rerun_history', [])
+    history.append(timer.record())
+    del history[:-HISTORY_SIZE]
+    if timer.profiler is not None:
+        st.session_state['_rerun_profile'] = (timer.profile_report(), timer.profile_dump())
+
+def end_rerun(timer):
+    """
+    Finish timing this rerun and show the debug panel when it is enabled
+
+    Call this at the end of the script and before every st.stop().
+    """
+    timer.finish()
+    _remember(timer)
+    if _query_flag("debug") or timer.profiler is not None:
+        display_debug_panel(timer)
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:.1f}"
+
+def display_debug_panel(timer):
+    """Show the section breakdown of this rerun, averages of recent reruns and the profiler report"""
+    history = st.session_state.get('_rerun_history', [])
+
+    with st.sidebar.expander("Rerun timing", expanded=True):
+        rows = ["| Section | ms | % |", "|---|---:|---:|"]
+        for name, seconds in timer.sections:
+            share = 100 * seconds / timer.total if timer.total else 0
+            rows.append(f"| {name} | {_format_ms(seconds)} | {share:.0f} |")
+        rows.append(f"| **total** | **{_format_ms(timer.total)}** | |")
+        st.markdown("\n".join(rows))
+
+        if len(history) > 1:
+            totals = {}
+            for record in history:
+                for name, seconds in record['sections']:
+                    totals.setdefault(name, []).append(seconds)
+            st.caption(f"Last {len(history)} reruns ({sum(record['interrupted'] for record in history)} interrupted by st.rerun)")
+            rows = ["| Section | mean ms | max ms | runs |", "|---|---:|---:|---:|"]
+            for name, values in sorted(totals.items(), key=lambda item: -sum(item[1])):
+                rows.append(f"| {name} | {_format_ms(sum(values) / len(values))} | {_format_ms(max(values))} | {len(values)} |")
+            st.markdown("\n".join(rows))
+
+    profile = st.session_state.get('_rerun_profile')
+    if profile is not None:
+        report, dump = profile
+        with st.sidebar.expander("Profiler", expanded=False):
+            st.caption("Profile of the last rerun captured with ?profile=1")
+            st.download_button("Download report", report, file_name="rerun-profile.txt", mime="text/plain", key="_profile_report_download")
+            st.download_button("Download .prof", dump, file_name="rerun-profile.prof", mime="application/octet-stream", key="_profile_dump_download")
+            st.code(report, language=None)
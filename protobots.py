@@ -0,0 +1,247 @@
+import codecs
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import telemetry
+
+# Protobots generation endpoint; point PROTOBOTS_URL at stub_server.py to test offline
+PROTOBOTS_URL = os.environ.get("PROTOBOTS_URL", "https://api.protobots.ai/proto_bots/generate_v2")
+
+# Default settings for the protobots API client. Each one can be overridden
+# with an environment variable of the same name.
+DEFAULT_SETTINGS = {
+    "PROTOBOTS_CONNECT_TIMEOUT": 5.0,
+    "PROTOBOTS_READ_TIMEOUT": 60.0,
+    "PROTOBOTS_MAX_RETRIES": 2,
+    "PROTOBOTS_BACKOFF_BASE": 0.5,
+    "PROTOBOTS_BACKOFF_MAX": 8.0,
+    "PROTOBOTS_POOL_CONNECTIONS": 4,
+    "PROTOBOTS_POOL_MAXSIZE": 16,
+}
+
+# Status codes that are worth retrying; everything else is returned as-is
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Start of a streamed body that is the {"object": ...} envelope of post()
+# rather than the generated text itself
+ENVELOPE_PATTERN = re.compile(r'\s*\{\s*"object"\s*:')
+
+# Characters of a streamed body held back to tell an envelope from raw text
+ENVELOPE_SNIFF_CHARS = 32
+
+# Charset parameter of a Content-Type header
+CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def _setting(name):
+    """Read a client setting from the environment, falling back to the default"""
+    default = DEFAULT_SETTINGS[name]
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return type(default)(value)
+
+def _response_charset(response):
+    """
+    Charset named by the response's Content-Type header, or UTF-8 if it names none
+
+    requests falls back to ISO-8859-1 for any text/* type without a charset,
+    which would garble the generated text, so its encoding is not used.
+    """
+    match = CHARSET_PATTERN.search(response.headers.get("Content-Type", ""))
+    if match is None:
+        return "utf-8"
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        print(f"Unknown response charset {match.group(1)}; decoding as UTF-8")
+        return "utf-8"
+
+
+class ProtobotsClient:
+    """
+    Pooled HTTP client for the protobots generate endpoint
+
+    A single requests.Session is shared by every caller so connections are
+    kept alive and reused instead of paying a TCP+TLS handshake per call.
+
+    Parameters:
+    - url: Endpoint to post generation requests to
+    - connect_timeout: Seconds to wait for a connection to be established
+    - read_timeout: Seconds to wait for the response after connecting
+    - max_retries: Number of retries after the first attempt
+    - backoff_base: Base delay in seconds for exponential backoff
+    - backoff_max: Upper bound in seconds for a single backoff delay
+    - pool_connections: Number of connection pools to cache
+    - pool_maxsize: Maximum number of connections kept per pool
+    """
+
+    def __init__(self, url=None, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, pool_connections=None, pool_maxsize=None):
+        self.url = url or PROTOBOTS_URL
+        self.connect_timeout = connect_timeout if connect_timeout is not None else _setting("PROTOBOTS_CONNECT_TIMEOUT")
+        self.read_timeout = read_timeout if read_timeout is not None else _setting("PROTOBOTS_READ_TIMEOUT")
+        self.max_retries = max_retries if max_retries is not None else _setting("PROTOBOTS_MAX_RETRIES")
+        self.backoff_base = backoff_base if backoff_base is not None else _setting("PROTOBOTS_BACKOFF_BASE")
+        self.backoff_max = backoff_max if backoff_max is not None else _setting("PROTOBOTS_BACKOFF_MAX")
+
+        # Retries are handled in post() so the adapter never retries on its own
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections if pool_connections is not None else _setting("PROTOBOTS_POOL_CONNECTIONS"),
+            pool_maxsize=pool_maxsize if pool_maxsize is not None else _setting("PROTOBOTS_POOL_MAXSIZE"),
+            max_retries=0,
+            pool_block=True
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for the given retry attempt"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def post(self, data, headers=None, stream=False):
+        """
+        Post form data to the endpoint, retrying transient failures
+
+        Connection errors, timeouts and retryable status codes are retried up
+        to max_retries times. The last response is returned once retries are
+        exhausted, and the last exception is re-raised if no response was
+        ever received. With stream, the body is left unread so it can be
+        consumed incrementally.
+
+        Every attempt is recorded in the protobots_* metrics under the
+        generator operation running on this thread.
+        """
+        operation = telemetry.current_operation()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                telemetry.PROTOBOTS_RETRIES.inc(operation=operation)
+                time.sleep(self._backoff(attempt - 1))
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.url,
+                    headers=headers,
+                    data=data,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                    stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                status = "timeout" if isinstance(e, requests.Timeout) else "connection_error"
+                telemetry.PROTOBOTS_REQUESTS.inc(operation=operation, status=status)
+                telemetry.PROTOBOTS_DURATION.observe(time.perf_counter() - started, operation=operation)
+                print(f"Protobots request attempt {attempt + 1} failed: {str(e)}")
+                last_error = e
+                continue
+
+            telemetry.PROTOBOTS_REQUESTS.inc(operation=operation, status=response.status_code)
+            telemetry.PROTOBOTS_DURATION.observe(time.perf_counter() - started, operation=operation)
+            if not stream:
+                telemetry.PROTOBOTS_RESPONSE_BYTES.observe(len(response.content), operation=operation)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                print(f"Protobots request attempt {attempt + 1} returned status code {response.status_code}")
+                response.close()
+                continue
+            return response
+
+        raise last_error
+
+    def stream(self, data, headers=None):
+        """
+        Post form data with streaming enabled and yield text chunks as they arrive
+
+        The streaming endpoint returns the generated text itself as a chunked
+        body. If it answers with the {"object": ...} envelope of post()
+        instead (a JSON content type, or a body starting with {"object":),
+        the envelope is read completely and its text yielded as one chunk.
+        Retries only cover establishing the response; once the first chunk
+        has been yielded a failure is raised to the caller. Raises an
+        exception if the endpoint responds with an error status.
+        """
+        operation = telemetry.current_operation()
+        started = time.perf_counter()
+        data = dict(data, stream="true")
+        response = self.post(data, headers=headers, stream=True)
+        chunks = self._iter_text(response, operation, started)
+        try:
+            if response.status_code != 200:
+                raise Exception(f"API request failed with status code {response.status_code}")
+
+            if response.headers.get("Content-Type", "").startswith("application/json"):
+                yield self._unwrap("".join(chunks))
+                return
+
+            # Hold back the start of the body until it can be told apart from an envelope
+            head = ""
+            for text in chunks:
+                head += text
+                if len(head.lstrip()) >= ENVELOPE_SNIFF_CHARS:
+                    break
+            if ENVELOPE_PATTERN.match(head):
+                yield self._unwrap(head + "".join(chunks))
+                return
+            if head:
+                yield head
+            yield from chunks
+        finally:
+            chunks.close()
+            response.close()
+
+    def _iter_text(self, response, operation, started):
+        """Decoded text chunks of a streamed response, recording its first-chunk latency and size"""
+        received = 0
+        try:
+            # Decode here rather than in requests so the raw body size can be counted
+            decoder = codecs.getincrementaldecoder(_response_charset(response))(errors="replace")
+            for chunk in response.iter_content(chunk_size=None):
+                if not chunk:
+                    continue
+                if not received:
+                    telemetry.PROTOBOTS_FIRST_CHUNK.observe(time.perf_counter() - started, operation=operation)
+                received += len(chunk)
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield text
+        finally:
+            if received:
+                telemetry.PROTOBOTS_RESPONSE_BYTES.observe(received, operation=operation)
+
+    @staticmethod
+    def _unwrap(body):
+        """Generated text of an {"object": ...} envelope"""
+        try:
+            return json.loads(body)['object']
+        except (ValueError, KeyError, TypeError) as e:
+            raise Exception(f"Malformed response envelope: {str(e)}")
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide protobots client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ProtobotsClient()
+    return _client
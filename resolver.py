@@ -0,0 +1,124 @@
+import copy
+import threading
+from collections import Counter
+
+from scenarios import SCENARIO_DATABASE
+from cache import get_scenario_cache
+from scenario_index import get_index
+from generator import generate_scenario, scenario_cache_key
+
+# Lookup tiers, cheapest first
+TIERS = ("static", "session", "shared", "llm")
+
+
+class ScenarioResolver:
+    """
+    Resolve a scenario through progressively more expensive tiers
+
+    1. static: the predefined SCENARIO_DATABASE
+    2. session: scenarios already generated in this session
+    3. shared: the cross-session persistent cache
+    4. llm: a fresh generation
+
+    Every answer is tagged with the tier that produced it and per-tier hit
+    counters are kept for the whole process. Returned scenarios are always
+    copies, so callers can adjust consequences without touching the
+    database or the caches.
+
+    Parameters:
+    - database: Dictionary of predefined scenarios keyed by topic
+    - shared_cache: Cross-session cache (defaults to the scenario cache)
+    """
+
+    def __init__(self, database=SCENARIO_DATABASE, shared_cache=None):
+        self.database = database
+        self.index = get_index(database)
+        self.shared_cache = shared_cache
+        self._hits = Counter({tier: 0 for tier in TIERS})
+        self._lock = threading.Lock()
+
+    def _shared_cache(self):
+        return self.shared_cache if self.shared_cache is not None else get_scenario_cache()
+
+    def _record(self, tier):
+        with self._lock:
+            self._hits[tier] += 1
+
+    def is_local(self, topic, session_cache=None):
+        """Whether the topic resolves from the static or session tier without any I/O"""
+        return topic in self.index or (session_cache is not None and topic in session_cache)
+
+    def lookup(self, topic, business_profile, session_cache=None):
+        """
+        Try every tier except the LLM
+
+        Returns a (scenario, tier) tuple, or (None, None) on a miss. Shared
+        cache hits are copied into session_cache when one is given.
+        """
+        if topic in self.index:
+            self._record("static")
+            return copy.deepcopy(self.database[topic]), "static"
+
+        if session_cache is not None and topic in session_cache:
+            self._record("session")
+            return copy.deepcopy(session_cache[topic]), "session"
+
+        scenario = self._shared_cache().get(scenario_cache_key(topic, business_profile))
+        if scenario is not None:
+            self._record("shared")
+            if session_cache is not None:
+                session_cache[topic] = copy.deepcopy(scenario)
+            return scenario, "shared"
+
+        return None, None
+
+    def resolve(self, topic, business_profile, session_cache=None, generate=None):
+        """
+        Resolve a scenario, generating it only when every cache tier misses
+
+        Parameters:
+        - topic: Scenario topic
+        - business_profile: Business profile used for generation
+        - session_cache: Per-session dictionary of generated scenarios (optional)
+        - generate: Function taking (topic, business_profile) used on a miss
+          (defaults to generate_scenario without its own cache lookup)
+
+        Returns a (scenario, tier) tuple.
+        """
+        scenario, tier = self.lookup(topic, business_profile, session_cache)
+        if scenario is not None:
+            return scenario, tier
+
+        if generate is None:
+            scenario = generate_scenario(topic, business_profile, use_cache=False)
+        else:
+            scenario = generate(topic, business_profile)
+
+        self._record("llm")
+        if session_cache is not None:
+            session_cache[topic] = copy.deepcopy(scenario)
+        return scenario, "llm"
+
+    def stats(self):
+        """Return the number of hits per tier"""
+        with self._lock:
+            return dict(self._hits)
+
+    def reset_stats(self):
+        """Reset all hit counters to zero"""
+        with self._lock:
+            self._hits = Counter({tier: 0 for tier in TIERS})
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """Return the process-wide scenario resolver, creating it on first use"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = ScenarioResolver()
+    return _resolver
@@ -0,0 +1,200 @@
+"""
+Local stand-in for a Redis server
+
+Speaks enough of the Redis protocol (RESP) for the generation cache's
+RedisBackend: PING, AUTH, SELECT, GET, SET with EX/PX/NX/XX, DEL, EXISTS,
+SCAN, DBSIZE and FLUSHDB, with keys expiring like in Redis. Everything is
+kept in memory, so the redis cache backend can be tested offline and shared
+by several local app processes.
+
+Run it and point the app at it:
+    python resp_server.py --port 6380
+    GENERATION_CACHE_BACKEND=redis GENERATION_CACHE_URL=redis://127.0.0.1:6380/0 streamlit run app.py
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class RespError(Exception):
+    """Error answered to the client as a RESP error reply"""
+
+
+def _encode(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, RespError):
+        return f"-ERR {reply}\r\n".encode("utf-8")
+    if isinstance(reply, bool):
+        return b"+OK\r\n" if reply else b"$-1\r\n"
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode("utf-8")
+    if isinstance(reply, bytes):
+        return f"${len(reply)}\r\n".encode() + reply + b"\r\n"
+    return f"*{len(reply)}\r\n".encode() + b"".join(_encode(item) for item in reply)
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, as sent by telnet or redis-cli --pipe
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            try:
+                reply = self.server.execute(args[0].decode("utf-8").upper(), args[1:])
+            except RespError as e:
+                reply = e
+            except (ValueError, IndexError):
+                reply = RespError("syntax error")
+            try:
+                self.wfile.write(_encode(reply))
+                self.wfile.flush()
+            except ConnectionError:
+                return
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded in-memory server speaking the Redis protocol
+
+    Parameters:
+    - host, port: Address to listen on (port 0 picks a free port)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=6380):
+        super().__init__((host, port), RespHandler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.counts = {"commands": 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL of the server, suitable for GENERATION_CACHE_URL"""
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, keys=len(self.data))
+
+    def _live(self, key, now):
+        # Called with the lock held
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command, args):
+        """Run one command and return its reply"""
+        now = time.time()
+        with self.lock:
+            self.counts["commands"] += 1
+            self.counts[command] = self.counts.get(command, 0) + 1
+
+            if command == "PING":
+                return args[0] if args else "PONG"
+            if command in ("AUTH", "SELECT"):
+                return "OK"
+            if command == "GET":
+                entry = self._live(args[0], now)
+                return entry[0] if entry is not None else None
+            if command == "SET":
+                key, value = args[0], args[1]
+                options = [arg.decode("utf-8").upper() for arg in args[2:]]
+                expires_at = None
+                if "EX" in options:
+                    expires_at = now + int(options[options.index("EX") + 1])
+                if "PX" in options:
+                    expires_at = now + int(options[options.index("PX") + 1]) / 1000
+                exists = self._live(key, now) is not None
+                if ("NX" in options and exists) or ("XX" in options and not exists):
+                    return None
+                self.data[key] = (value, expires_at)
+                return True
+            if command == "DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if command == "EXISTS":
+                return sum(self._live(key, now) is not None for key in args)
+            if command == "SCAN":
+                # The cursor is an offset into the sorted key space
+                cursor = int(args[0])
+                options = [arg.decode("utf-8") for arg in args[1:]]
+                pattern = options[options.index("MATCH") + 1] if "MATCH" in options else "*"
+                count = int(options[options.index("COUNT") + 1]) if "COUNT" in options else 10
+                keys = sorted(key for key in list(self.data) if self._live(key, now) is not None)
+                page = keys[cursor:cursor + count]
+                next_cursor = cursor + count if cursor + count < len(keys) else 0
+                return [str(next_cursor).encode(), [key for key in page if fnmatch.fnmatchcase(key.decode("utf-8"), pattern)]]
+            if command == "DBSIZE":
+                return sum(self._live(key, now) is not None for key in list(self.data))
+            if command == "FLUSHDB":
+                self.data.clear()
+                return "OK"
+        raise RespError(f"unknown command '{command}'")
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for a Redis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args(argv)
+
+    server = RespServer(args.host, args.port)
+    print(f"Stand-in Redis server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import numpy as np
+
+from scenarios import SCENARIO_DATABASE
+from metrics import METRICS
+
+# Option order used by every array in the index
+OPTIONS = ['best_case', 'worst_case']
+
+
+def build_alias_table(weights):
+    """
+    Build a Walker/Vose alias table for sampling from a discrete distribution
+
+    Returns (probabilities, aliases). To sample, pick k uniformly from
+    range(len(weights)), then keep k with probability probabilities[k] and
+    take aliases[k] otherwise.
+    """
+    count = len(weights)
+    total = float(sum(weights))
+    scaled = [weight * count / total for weight in weights]
+    probabilities = [1.0] * count
+    aliases = list(range(count))
+
+    small = [k for k, value in enumerate(scaled) if value < 1.0]
+    large = [k for k, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probabilities[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] = (scaled[more] + scaled[less]) - 1.0
+        (small if scaled[more] < 1.0 else large).append(more)
+
+    # Whatever is left is 1.0 up to rounding error
+    return probabilities, aliases
+
+
+class ScenarioIndex:
+    """
+    Compiled, validated form of a scenario database
+
+    Topics get integer IDs in database order and options use OPTIONS order.
+    Rows of the next-topic graph are numbered topic_id * 2 + option_id.
+
+    - consequences: int64 array of shape (topics, options, metrics) in METRICS order
+    - offsets, targets: CSR adjacency; the next topics of a row are
+      targets[offsets[row]:offsets[row + 1]]
+    - alias_probabilities, alias_indexes: alias tables aligned with targets,
+      for O(1) weighted next-topic sampling
+
+    Options may carry a next_weights list next to next_scenarios; without
+    one every next topic is equally likely. An option without next_scenarios
+    continues with any topic. Raises ValueError if a next_scenarios entry is
+    not in the database or the weights are invalid.
+
+    Parameters:
+    - database: Dictionary of scenarios keyed by topic
+    """
+
+    def __init__(self, database=SCENARIO_DATABASE):
+        self.database = database
+        self.topics = list(database)
+        self.topic_ids = {topic: i for i, topic in enumerate(self.topics)}
+
+        consequences = np.zeros((len(self.topics), len(OPTIONS), len(METRICS)), dtype=np.int64)
+        offsets = [0]
+        targets = []
+        alias_probabilities = []
+        alias_indexes = []
+        self._rows = []
+
+        for t, topic in enumerate(self.topics):
+            for o, option in enumerate(OPTIONS):
+                chosen = database[topic][option]
+                consequences[t, o] = [chosen['consequences'][metric] for metric in METRICS]
+
+                row_targets = []
+                for next_topic in chosen['next_scenarios']:
+                    if next_topic not in self.topic_ids:
+                        raise ValueError(f"{topic} ({option}) references unknown scenario {next_topic}")
+                    row_targets.append(self.topic_ids[next_topic])
+
+                weights = chosen.get('next_weights') or [1] * len(row_targets)
+                if len(weights) != len(row_targets) or any(weight < 0 for weight in weights) or (row_targets and not sum(weights)):
+                    raise ValueError(f"{topic} ({option}) has invalid next_weights")
+                probabilities, aliases = build_alias_table(weights) if row_targets else ([], [])
+
+                targets.extend(row_targets)
+                alias_probabilities.extend(probabilities)
+                alias_indexes.extend(aliases)
+                offsets.append(len(targets))
+                # Plain tuples for scalar sampling without NumPy overhead
+                self._rows.append((tuple(row_targets), tuple(probabilities), tuple(aliases)))
+
+        self.consequences = consequences
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.targets = np.array(targets, dtype=np.int64)
+        self.counts = np.diff(self.offsets)
+        self.alias_probabilities = np.array(alias_probabilities, dtype=np.float64)
+        self.alias_indexes = np.array(alias_indexes, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.topics)
+
+    def __contains__(self, topic):
+        return topic in self.topic_ids
+
+    def row(self, topic_id, option_id):
+        """Row of the next-topic graph for a topic and option"""
+        return topic_id * len(OPTIONS) + option_id
+
+    def next_ids(self, topic_id, option_id):
+        """Tuple of next topic IDs for a topic and option (empty means any topic)"""
+        return self._rows[self.row(topic_id, option_id)][0]
+
+    def scaled_consequences(self, multipliers):
+        """Consequences multiplied per metric and truncated toward zero like int()"""
+        factors = np.array([multipliers[metric] for metric in METRICS])
+        return np.trunc(self.consequences * factors).astype(np.int64)
+
+    def sample_next(self, topic_id, option_id, rng):
+        """Sample a next topic ID in O(1) using a random.Random-like rng"""
+        row_targets, probabilities, aliases = self._rows[self.row(topic_id, option_id)]
+        if not row_targets:
+            return rng.randrange(len(self.topics))
+        k = rng.randrange(len(row_targets))
+        return row_targets[k if rng.random() < probabilities[k] else aliases[k]]
+
+    def sample_next_topic(self, topic, option, rng):
+        """Sample the name of the next topic after choosing option on topic"""
+        return self.topics[self.sample_next(self.topic_ids[topic], OPTIONS.index(option), rng)]
+
+    def sample_next_batch(self, topic_ids, option_ids, rng):
+        """
+        Sample next topic IDs for many (topic, option) pairs at once
+
+        Parameters:
+        - topic_ids, option_ids: Integer arrays of the same shape
+        - rng: numpy.random.Generator
+        """
+        rows = np.asarray(topic_ids) * len(OPTIONS) + np.asarray(option_ids)
+        counts = self.counts[rows]
+        # Rows without next topics continue with any topic
+        any_topic = rng.integers(0, len(self.topics), rows.shape)
+        if not len(self.targets):
+            return any_topic
+
+        positions = self.offsets[rows] + (rng.random(rows.shape) * counts).astype(np.int64)
+        positions = np.minimum(positions, len(self.targets) - 1)
+        keep = rng.random(rows.shape) < self.alias_probabilities[positions]
+        positions = np.where(keep, positions, self.offsets[rows] + self.alias_indexes[positions])
+        return np.where(counts > 0, self.targets[np.minimum(positions, len(self.targets) - 1)], any_topic)
+
+
+def get_index(database=SCENARIO_DATABASE):
+    """Return the shared index for the shipped database, or compile a new one"""
+    if database is SCENARIO_DATABASE:
+        return SCENARIO_INDEX
+    return ScenarioIndex(database)
+
+
+# Compiled once at import so a broken next_scenarios reference fails at startup
+SCENARIO_INDEX = ScenarioIndex(SCENARIO_DATABASE)
@@ -0,0 +1,468 @@
+"""
+Durable session state, so a simulation survives restarts and can be resumed by any replica
+
+Each browser session gets an id kept in the ?sid= query parameter. At the end
+of every rerun the persistent part of st.session_state is serialized into a
+compact snapshot and queued in a write-behind SessionStore, which writes the
+latest snapshot of every changed session to its backend in batches. When a
+new Streamlit session starts with a known ?sid= (after a reload, a deploy or
+on another replica), its snapshot is loaded and rehydrated on that first
+rerun.
+
+Backends implement load(session_id), save_many(snapshots) and
+delete(session_id) on opaque bytes: SQLiteSessionBackend, FileSessionBackend
+and MemorySessionBackend, an in-process stand-in for a Redis backend.
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from engine import Simulation
+from scenarios import SCENARIO_DATABASE
+
+# Query parameter holding the session id
+SESSION_ID_PARAM = "sid"
+
+# Session ids are uuid4 hex strings; anything else in the URL is ignored
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}$")
+
+# Snapshot format: this version byte followed by zlib-compressed compact JSON
+SNAPSHOT_VERSION = 1
+
+# Session state keys that are persisted. The prefetcher, the rerun timer and
+# widget values are rebuilt by the app instead.
+PERSISTED_KEYS = (
+    'step',
+    'show_intro',
+    'business_profile',
+    'scenario_topics',
+    'topics_pending',
+    'topics_refresh',
+    'profile_custom_topic',
+    'selected_topic',
+    'custom_scenarios',
+    'current_scenario_data',
+    'current_scenario_data_key',
+    'current_scenario_tier',
+    'analysis_cache'
+)
+
+# Default backend settings, each overridable with an environment variable of the same name
+DEFAULT_SETTINGS = {
+    "SESSION_STORE": "sqlite",
+    "SESSION_STORE_PATH": os.path.join(".cache", "sessions.sqlite3"),
+    "SESSION_TTL": 7 * 24 * 60 * 60,
+    "SESSION_FLUSH_INTERVAL": 1.0,
+}
+
+# Run expiry of stale sessions after this many batches instead of on every write
+PURGE_EVERY = 32
+
+
+def _setting(name):
+    default = DEFAULT_SETTINGS[name]
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return type(default)(value)
+
+def _compact_scenario(topic, scenario):
+    # Predefined scenarios are stored as a reference to the database entry
+    if scenario is not None and SCENARIO_DATABASE.get(topic) == scenario:
+        return {'$db': topic}
+    return scenario
+
+def _expand_scenario(scenario):
+    if isinstance(scenario, dict) and set(scenario) == {'$db'}:
+        return SCENARIO_DATABASE.get(scenario['$db'])
+    return scenario
+
+def encode_snapshot(state):
+    """
+    Serialize the persisted session state into snapshot bytes
+
+    Parameters:
+    - state: Mapping with the simulation and any of PERSISTED_KEYS
+    """
+    snapshot = {key: state[key] for key in PERSISTED_KEYS if key in state}
+    snapshot['simulation'] = state['simulation'].to_dict()
+    if 'custom_scenarios' in snapshot:
+        snapshot['custom_scenarios'] = {
+            topic: _compact_scenario(topic, scenario) for topic, scenario in snapshot['custom_scenarios'].items()
+        }
+    if 'current_scenario_data' in snapshot:
+        snapshot['current_scenario_data'] = _compact_scenario(
+            snapshot.get('current_scenario_data_key'), snapshot['current_scenario_data']
+        )
+    payload = json.dumps(snapshot, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return bytes([SNAPSHOT_VERSION]) + zlib.compress(payload, 6)
+
+def decode_snapshot(data):
+    """Deserialize snapshot bytes into a dict of session state, with the simulation rebuilt"""
+    if not data or data[0] != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported session snapshot version")
+    state = json.loads(zlib.decompress(data[1:]).decode("utf-8"))
+    state['simulation'] = Simulation.from_dict(state['simulation'])
+    if 'custom_scenarios' in state:
+        state['custom_scenarios'] = {
+            topic: _expand_scenario(scenario) for topic, scenario in state['custom_scenarios'].items()
+        }
+    if 'current_scenario_data' in state:
+        state['current_scenario_data'] = _expand_scenario(state['current_scenario_data'])
+    return state
+
+
+class MemorySessionBackend:
+    """
+    In-process session backend with TTL expiry
+
+    Stands in for a Redis backend and follows the same semantics: load() is
+    GET, save_many() is a pipeline of SET key value EX ttl and delete() is
+    DEL. It only shares sessions within one process, so it suits tests and
+    single-process runs.
+
+    Parameters:
+    - ttl: Seconds a session is kept after its last write (None keeps sessions forever)
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[session_id]
+                return None
+            return data
+
+    def save_many(self, snapshots):
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            for session_id, data in snapshots.items():
+                self._entries[session_id] = (data, expires_at)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+class SQLiteSessionBackend:
+    """
+    Session backend storing snapshots in a SQLite database
+
+    Every process and replica pointed at the same file shares the sessions.
+    Like the generation cache's SQLiteBackend, each thread uses its own
+    connection and the database runs in WAL mode; a batch is written in a
+    single transaction.
+
+    Parameters:
+    - path: Path of the SQLite database file
+    - ttl: Seconds a session is kept after its last write (None keeps sessions forever)
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._batches = 0
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+            self._local.connection = connection
+        return connection
+
+    def load(self, session_id):
+        row = self._connection().execute(
+            "SELECT data, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, updated_at = row
+        if self.ttl is not None and updated_at + self.ttl < time.time():
+            return None
+        return bytes(data)
+
+    def save_many(self, snapshots):
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                [(session_id, data, now) for session_id, data in snapshots.items()]
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+        self._batches += 1
+        if self.ttl is not None and self._batches % PURGE_EVERY == 0:
+            connection.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+
+    def delete(self, session_id):
+        self._connection().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+class FileSessionBackend:
+    """
+    Session backend storing one file per session in a directory
+
+    Files are replaced atomically, so a directory on a shared volume can be
+    used by several replicas. Expiry uses the file modification time.
+
+    Parameters:
+    - directory: Directory holding the <session id>.session files
+    - ttl: Seconds a session is kept after its last write (None keeps sessions forever)
+    """
+
+    def __init__(self, directory, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, session_id):
+        # The id becomes a file name, so only well-formed ids are accepted
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.session")
+
+    def load(self, session_id):
+        path = self._path(session_id)
+        try:
+            if self.ttl is not None and os.path.getmtime(path) + self.ttl < time.time():
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save_many(self, snapshots):
+        os.makedirs(self.directory, exist_ok=True)
+        for session_id, data in snapshots.items():
+            path = self._path(session_id)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+
+class SessionStore:
+    """
+    Write-behind store of session snapshots in front of a backend
+
+    save() only queues the snapshot; a background thread writes every queued
+    session to the backend each flush_interval seconds, or as soon as
+    batch_size sessions are waiting. Only the latest snapshot of a session
+    is written, and snapshots identical to the last one written are skipped,
+    so reruns that change nothing cost no I/O. Backend failures are logged
+    and the batch is retried on the next flush; queued snapshots are flushed
+    when the process exits.
+
+    Parameters:
+    - backend: Backend implementing load, save_many and delete
+    - flush_interval: Seconds between background flushes
+    - batch_size: Number of queued sessions that triggers an early flush
+    """
+
+    def __init__(self, backend, flush_interval=1.0, batch_size=64):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = {}
+        self._written = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def _start(self):
+        # Called with the condition held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="session-store-flusher", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._pending) >= self.batch_size, timeout=self.flush_interval)
+            self.flush()
+
+    def save(self, session_id, data):
+        """Queue the snapshot of a session; returns False if it is unchanged since the last write"""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._condition:
+            if session_id not in self._pending and self._written.get(session_id) == digest:
+                return False
+            self._pending[session_id] = (data, digest)
+            self._start()
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def load(self, session_id):
+        """Latest snapshot of a session, queued or stored, or None if there is none"""
+        with self._condition:
+            pending = self._pending.get(session_id)
+        if pending is not None:
+            return pending[0]
+        try:
+            return self.backend.load(session_id)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"Session load failed: {str(e)}")
+            return None
+
+    def delete(self, session_id):
+        """Forget a session, queued or stored"""
+        with self._condition:
+            self._pending.pop(session_id, None)
+            self._written.pop(session_id, None)
+        try:
+            self.backend.delete(session_id)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"Session delete failed: {str(e)}")
+
+    def flush(self):
+        """Write every queued snapshot to the backend in one batch"""
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                self.backend.save_many({session_id: data for session_id, (data, _) in batch.items()})
+            except (OSError, sqlite3.Error, ValueError) as e:
+                print(f"Session flush failed: {str(e)}")
+                # Requeue the batch unless a newer snapshot arrived meanwhile
+                with self._condition:
+                    for session_id, entry in batch.items():
+                        self._pending.setdefault(session_id, entry)
+                return
+            with self._condition:
+                for session_id, (_, digest) in batch.items():
+                    self._written[session_id] = digest
+
+
+def create_backend(kind=None, path=None, ttl=None):
+    """
+    Create the session backend selected by SESSION_STORE, or None when persistence is off
+
+    Parameters:
+    - kind: "sqlite", "file", "memory" or "none" (defaults to SESSION_STORE)
+    - path: Database file or directory (defaults to SESSION_STORE_PATH)
+    - ttl: Seconds a session is kept (defaults to SESSION_TTL)
+    """
+    kind = (kind or _setting("SESSION_STORE")).lower()
+    path = path or _setting("SESSION_STORE_PATH")
+    ttl = ttl if ttl is not None else _setting("SESSION_TTL")
+    if kind == "none":
+        return None
+    if kind == "sqlite":
+        return SQLiteSessionBackend(path, ttl=ttl)
+    if kind == "file":
+        return FileSessionBackend(path, ttl=ttl)
+    if kind == "memory":
+        return MemorySessionBackend(ttl=ttl)
+    raise ValueError(f"Unknown session store: {kind}")
+
+
+_store = None
+_store_created = False
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide session store, or None when persistence is off"""
+    global _store, _store_created
+    if not _store_created:
+        with _store_lock:
+            if not _store_created:
+                backend = create_backend()
+                if backend is not None:
+                    _store = SessionStore(backend, flush_interval=_setting("SESSION_FLUSH_INTERVAL"))
+                _store_created = True
+    return _store
+
+
+def restore_session():
+    """
+    Bind this Streamlit session to a session id and rehydrate its saved state
+
+    Runs its work on the first rerun of a Streamlit session only. With a
+    known ?sid= in the URL the saved state is loaded into st.session_state;
+    otherwise a new id is put in the URL. Returns True if state was restored.
+    Call it before the session state defaults are set.
+    """
+    import streamlit as st
+
+    store = get_store()
+    if store is None or '_session_id' in st.session_state:
+        return False
+
+    session_id = st.query_params.get(SESSION_ID_PARAM, "")
+    restored = False
+    if SESSION_ID_PATTERN.match(session_id):
+        data = store.load(session_id)
+        if data is not None:
+            try:
+                state = decode_snapshot(data)
+            except (KeyError, TypeError, ValueError, zlib.error) as e:
+                print(f"Session restore failed: {str(e)}")
+            else:
+                for key, value in state.items():
+                    st.session_state[key] = value
+                restored = True
+    else:
+        session_id = uuid.uuid4().hex
+        st.query_params[SESSION_ID_PARAM] = session_id
+
+    st.session_state['_session_id'] = session_id
+    return restored
+
+def persist_session():
+    """Queue a snapshot of this Streamlit session's state for writing"""
+    import streamlit as st
+
+    store = get_store()
+    session_id = st.session_state.get('_session_id')
+    if store is None or session_id is None:
+        return
+    try:
+        data = encode_snapshot(st.session_state)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Session snapshot failed: {str(e)}")
+        return
+    store.save(session_id, data)
@@ -0,0 +1,240 @@
+"""
+Single-flight coalescing of identical concurrent generations
+
+When several sessions ask for the same generation at once, the first call
+(the leader) runs it and every identical call arriving while it is in
+flight (a follower) waits for the leader and gets its result, or has its
+exception raised. Calls are identified by a key, e.g. the scenario cache key.
+
+With SINGLEFLIGHT_SHARED set, leaders also coordinate across processes and
+replicas through the shared generation cache: a leader takes a lock entry
+with Cache.add (SET NX on Redis), publishes its outcome when done, and the
+leaders of other processes wait for that outcome instead of generating
+again. Dedupe counts are available from flight_stats() and in the
+generation_singleflight_calls metric.
+"""
+import copy
+import functools
+import os
+import threading
+import time
+import uuid
+
+import telemetry
+from cache import get_cache
+
+# Default settings, each overridable with an environment variable of the same name
+DEFAULT_SETTINGS = {
+    "SINGLEFLIGHT_SHARED": False,
+    "SINGLEFLIGHT_LOCK_TTL": 90.0,
+    "SINGLEFLIGHT_POLL_INTERVAL": 0.1,
+}
+
+# Seconds a published outcome stays readable by waiting processes
+OUTCOME_TTL = 30
+
+# Accepted spellings of boolean settings
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("0", "false", "no", "off", "")
+
+
+def _setting(name):
+    default = DEFAULT_SETTINGS[name]
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        print(f"Ignoring invalid {name}={value!r}; expected one of {', '.join(TRUE_VALUES + FALSE_VALUES[:-1])}")
+        return default
+    return type(default)(value)
+
+
+class FlightError(Exception):
+    """The leader of a flight in another process failed; carries its error message"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one
+
+    Followers in the same process get a deep copy of the leader's result,
+    so callers remain free to mutate what they get back. Across processes
+    results travel through the shared cache as JSON, and a failed remote
+    leader is raised as FlightError.
+
+    Parameters:
+    - name: Name of the flight, used in keys and metrics
+    - shared: Also coalesce across processes through the shared cache
+    - lock_ttl: Seconds a cross-process lock is held at most, which is also
+      the longest another process waits before generating itself
+    - poll_interval: Seconds between checks for a remote leader's outcome
+    """
+
+    def __init__(self, name, shared=False, lock_ttl=90.0, poll_interval=0.1):
+        self.name = name
+        self.shared = shared
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'followers': 0, 'remote_followers': 0}
+
+    def _count(self, role):
+        with self._lock:
+            self._stats[f"{role}s"] += 1
+        telemetry.SINGLEFLIGHT_CALLS.inc(flight=self.name, role=role)
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) unless an identical call with this key is in flight, then share its outcome"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            self._count("follower")
+            telemetry.record_coalesced()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = self._lead(key, func, args, kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                followers = call.followers
+            # Followers copy from a snapshot, since the leader's caller may mutate the result meanwhile
+            if call.error is None and followers:
+                call.result = copy.deepcopy(result)
+            call.done.set()
+        return result
+
+    def _lead(self, key, func, args, kwargs):
+        if not self.shared:
+            self._count("leader")
+            return func(*args, **kwargs)
+
+        cache = get_cache("singleflight", ttl=OUTCOME_TTL)
+        lock_key = f"lock:{self.name}:{key}"
+        deadline = time.monotonic() + self.lock_ttl
+        for _ in range(2):
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, token, ttl=self.lock_ttl):
+                return self._lead_shared(cache, lock_key, token, func, args, kwargs)
+
+            owner = cache.get(lock_key)
+            if owner is None:
+                # The lock was just released, or the cache is unavailable
+                continue
+            outcome = self._follow(cache, lock_key, owner, deadline)
+            if outcome is not None:
+                self._count("remote_follower")
+                telemetry.record_coalesced()
+                if 'error' in outcome:
+                    raise FlightError(outcome['error'])
+                return outcome['result']
+
+        # The lock could not be taken and no outcome arrived in time
+        self._count("leader")
+        return func(*args, **kwargs)
+
+    def _lead_shared(self, cache, lock_key, token, func, args, kwargs):
+        self._count("leader")
+        outcome_key = f"outcome:{self.name}:{token}"
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            cache.set(outcome_key, {'error': f"{type(e).__name__}: {str(e)}"})
+            raise
+        else:
+            cache.set(outcome_key, {'result': result})
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    def _follow(self, cache, lock_key, owner, deadline):
+        """Wait for the outcome of the remote flight holding the lock, or None if none arrives"""
+        outcome_key = f"outcome:{self.name}:{owner}"
+        while time.monotonic() < deadline:
+            outcome = cache.get(outcome_key)
+            if outcome is not None:
+                return outcome
+            if cache.get(lock_key) != owner:
+                # Released or expired; the outcome may have been published just before
+                return cache.get(outcome_key)
+            time.sleep(self.poll_interval)
+        return None
+
+    def in_flight(self):
+        """Number of keys with a call in flight in this process"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Leader, follower and remote follower counts of this process, with the number of deduplicated calls"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['deduplicated'] = stats['followers'] + stats['remote_followers']
+        return stats
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name):
+    """Return the process-wide SingleFlight of a name, configured from the environment"""
+    flight = _flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = _flights.get(name)
+            if flight is None:
+                flight = _flights[name] = SingleFlight(
+                    name,
+                    shared=_setting("SINGLEFLIGHT_SHARED"),
+                    lock_ttl=_setting("SINGLEFLIGHT_LOCK_TTL"),
+                    poll_interval=_setting("SINGLEFLIGHT_POLL_INTERVAL")
+                )
+    return flight
+
+def coalesced(name, key):
+    """
+    Decorator coalescing concurrent calls of a function that share a key
+
+    Parameters:
+    - name: Name of the flight
+    - key: Function taking the same arguments as the decorated function and returning the call's key
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_flight(name).do(key(*args, **kwargs), func, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def flight_stats():
+    """stats() of every flight created in this process, by name"""
+    with _flights_lock:
+        flights = dict(_flights)
+    return {name: flight.stats() for name, flight in sorted(flights.items())}
@@ -0,0 +1,170 @@
+import sys
+
+from scenarios import SCENARIO_DATABASE
+from utils import INITIAL_METRICS
+from engine import MAX_DECISIONS, DEFAULT_IMPACT_MULTIPLIERS
+from metrics import MetricsVector
+from scenario_index import OPTIONS, get_index
+
+
+class ScenarioSolver:
+    """
+    Exact optimal policy for the scenario graph by memoized dynamic programming
+
+    A state is (topic, decisions made, metrics). From each state the solver
+    picks the option that maximizes the expected final
+    MetricsVector.health, where the expectation is over the random next
+    topic (weighted by next_weights when an option has them). Runs end
+    after max_decisions decisions or as soon as cash flow drops to zero or
+    below, exactly like the app.
+
+    Shared subproblems are memoized. Cash flow above the level where neither
+    the health score nor the game-over check can change any more is
+    collapsed into one state, which keeps the state space small without
+    changing any value. Coarser grids for the clamped 0-100 metrics and for
+    cash flow trade exactness for speed on very large scenario packs.
+
+    Parameters:
+    - database: Scenario database to solve
+    - max_decisions: Number of decisions per run
+    - multipliers: Impact multipliers per metric (defaults to 1.0 for all)
+    - metric_resolution: Grid step for the clamped metrics (1 is exact)
+    - cash_resolution: Grid step for cash flow (1 is exact)
+    """
+
+    def __init__(self, database=SCENARIO_DATABASE, max_decisions=MAX_DECISIONS, multipliers=None,
+                 metric_resolution=1, cash_resolution=1):
+        self.max_decisions = max_decisions
+        self.metric_resolution = metric_resolution
+        self.cash_resolution = cash_resolution
+        self._exact = metric_resolution == 1 and cash_resolution == 1
+        multipliers = dict(DEFAULT_IMPACT_MULTIPLIERS, **(multipliers or {}))
+
+        index = get_index(database)
+        self.topics = index.topics
+        self.topic_ids = index.topic_ids
+        every_topic = tuple(range(len(self.topics)))
+
+        # Plain tuples are much faster than array indexing for scalar lookups
+        scaled = index.scaled_consequences(multipliers).tolist()
+        self._deltas = [[tuple(deltas) for deltas in topic_deltas] for topic_deltas in scaled]
+        self._next = [
+            [index.next_ids(t, o) or every_topic for o in range(len(OPTIONS))]
+            for t in range(len(self.topics))
+        ]
+        # Expectations are weighted like the index samples next topics
+        self._weights = [
+            [self._next_weights(database[topic][option]) for o, option in enumerate(OPTIONS)]
+            for t, topic in enumerate(self.topics)
+        ]
+
+        # Above 100000 plus the largest possible remaining loss, cash flow can
+        # neither change the health score nor trigger a game over
+        largest_loss = max([-deltas[0] for topic_deltas in self._deltas for deltas in topic_deltas] + [0])
+        self._cash_caps = [100000 + remaining * largest_loss for remaining in range(max_decisions + 1)]
+
+        self._memo = {}
+
+    def _next_weights(self, chosen):
+        """Normalized next_weights for an option, or None when next topics are equally likely"""
+        weights = chosen.get('next_weights')
+        if not weights or not chosen['next_scenarios']:
+            return None
+        total = float(sum(weights))
+        return tuple(weight / total for weight in weights)
+
+    def __len__(self):
+        """Number of memoized states"""
+        return len(self._memo)
+
+    def _snap(self, value, resolution):
+        return value if resolution == 1 else resolution * round(value / resolution)
+
+    def _state(self, metrics):
+        return (
+            self._snap(metrics['cash_flow'], self.cash_resolution),
+            self._snap(metrics['customer_satisfaction'], self.metric_resolution),
+            self._snap(metrics['growth_potential'], self.metric_resolution),
+            self._snap(metrics['risk_level'], self.metric_resolution)
+        )
+
+    def _solve(self, topic, made, cash, satisfaction, growth, risk):
+        """Return (expected final health, best option index) for a state"""
+        remaining = self.max_decisions - made
+        key = (topic, made, min(cash, self._cash_caps[remaining]), satisfaction, growth, risk)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        best = None
+        for option, (cash_delta, satisfaction_delta, growth_delta, risk_delta) in enumerate(self._deltas[topic]):
+            # Apply consequences with the same clamping as apply_scenario_consequences
+            next_cash = cash + cash_delta
+            next_satisfaction = satisfaction + satisfaction_delta
+            next_satisfaction = 0 if next_satisfaction < 0 else 100 if next_satisfaction > 100 else next_satisfaction
+            next_growth = growth + growth_delta
+            next_growth = 0 if next_growth < 0 else 100 if next_growth > 100 else next_growth
+            next_risk = risk + risk_delta
+            next_risk = 0 if next_risk < 0 else 100 if next_risk > 100 else next_risk
+            if not self._exact:
+                next_cash = self._snap(next_cash, self.cash_resolution)
+                next_satisfaction = self._snap(next_satisfaction, self.metric_resolution)
+                next_growth = self._snap(next_growth, self.metric_resolution)
+                next_risk = self._snap(next_risk, self.metric_resolution)
+
+            if remaining == 1 or next_cash <= 0:
+                value = MetricsVector(next_cash, next_satisfaction, next_growth, next_risk).health()
+            else:
+                next_topics = self._next[topic][option]
+                weights = self._weights[topic][option]
+                if weights is None:
+                    value = sum(
+                        self._solve(next_topic, made + 1, next_cash, next_satisfaction, next_growth, next_risk)[0]
+                        for next_topic in next_topics
+                    ) / len(next_topics)
+                else:
+                    value = sum(
+                        weight * self._solve(next_topic, made + 1, next_cash, next_satisfaction, next_growth, next_risk)[0]
+                        for next_topic, weight in zip(next_topics, weights)
+                    )
+
+            if best is None or value > best[0]:
+                best = (value, option)
+
+        self._memo[key] = best
+        return best
+
+    def value(self, topic, metrics=None, made=0):
+        """
+        Expected final health under the optimal policy
+
+        Parameters:
+        - topic: Topic of the scenario currently being decided
+        - metrics: Current metrics (defaults to INITIAL_METRICS)
+        - made: Number of decisions already made
+        """
+        if made >= self.max_decisions:
+            raise ValueError("No decisions left to make")
+        return self._solve(self.topic_ids[topic], made, *self._state(metrics or INITIAL_METRICS))[0]
+
+    def best_option(self, topic, metrics=None, made=0):
+        """Optimal option ('best_case' or 'worst_case') for the current scenario"""
+        if made >= self.max_decisions:
+            raise ValueError("No decisions left to make")
+        return OPTIONS[self._solve(self.topic_ids[topic], made, *self._state(metrics or INITIAL_METRICS))[1]]
+
+    def solve(self, metrics=None):
+        """Expected final health under the optimal policy for every starting topic"""
+        return {topic: self.value(topic, metrics) for topic in self.topics}
+
+    def policy(self, simulation, scenario):
+        """Policy for engine.Simulation.step_with that always makes the optimal choice"""
+        return self.best_option(simulation.current_topic, simulation.metrics, len(simulation.history))
+
+
+def solve(database=SCENARIO_DATABASE, metrics=None, **kwargs):
+    """Solve a scenario database and return (solver, expected health per starting topic)"""
+    solver = ScenarioSolver(database, **kwargs)
+    # Recursion depth grows with max_decisions, not with the number of topics
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100 + 2 * solver.max_decisions))
+    return solver, solver.solve(metrics)
@@ -0,0 +1,191 @@
+"""
+Build-once static assets: the app stylesheet, the logo and the intro HTML
+
+The sources live in static_src/ (the logo is drawn with PIL). Building
+minifies them and writes content-hashed copies to static/, which Streamlit
+serves at app/static/ with enableStaticServing. static/manifest.json maps
+each asset to its hashed file and records a digest of the sources, so the
+bundle is only rebuilt when a source changes.
+
+Run with:
+    python static_assets.py          # rebuild static/ and print the manifest
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT, "static_src")
+STATIC_DIR = os.path.join(ROOT, "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+
+# URL path Streamlit serves the static folder under
+STATIC_URL_PATH = "app/static"
+
+# Bump this whenever the build itself changes (minifiers, logo drawing)
+BUILD_VERSION = 1
+
+# Length of the content hash in file names
+HASH_LENGTH = 12
+
+_build_lock = threading.Lock()
+
+
+def _read_source(name):
+    with open(os.path.join(SOURCE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def minify_html(markup):
+    """Collapse whitespace in an HTML fragment, minifying its inline stylesheet"""
+    markup = re.sub(r"<style>(.*?)</style>", lambda m: f"<style>{minify_css(m.group(1))}</style>", markup, flags=re.S)
+    markup = re.sub(r">\s+<", "><", markup)
+    return re.sub(r"\s+", " ", markup).strip()
+
+def render_logo():
+    """Draw the logo as PNG bytes"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    # Create a transparent canvas
+    img = Image.new('RGBA', (200, 200), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+
+    # Draw a circular background
+    draw.ellipse((10, 10, 190, 190), fill=(78, 137, 174, 255))
+
+    # Add text
+    try:
+        # Try to load a font, fall back to default if not available
+        font = ImageFont.truetype("Arial.ttf", 65)
+    except IOError:
+        font = ImageFont.load_default()
+
+    draw.text((100, 100), "BW", fill=(255, 255, 255, 255), font=font, anchor="mm")
+
+    buffered = io.BytesIO()
+    img.save(buffered, format="PNG", optimize=True)
+    return buffered.getvalue()
+
+def source_digest():
+    """Digest of every source and the build version, used to detect a stale bundle"""
+    digest = hashlib.sha256(str(BUILD_VERSION).encode())
+    for name in sorted(os.listdir(SOURCE_DIR)):
+        digest.update(name.encode())
+        with open(os.path.join(SOURCE_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def build(output_dir=STATIC_DIR):
+    """
+    Build every asset into output_dir and return the manifest
+
+    Files are named after their content hash, e.g. app.3f2a9c1e5b7d.css, and
+    previous builds of the same asset are removed.
+    """
+    assets = {
+        "app.css": minify_css(_read_source("app.css")).encode("utf-8"),
+        "intro.html": minify_html(_read_source("intro.html")).encode("utf-8"),
+        "logo.png": render_logo()
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = {}
+    for name, content in assets.items():
+        stem, extension = os.path.splitext(name)
+        content_hash = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        file_name = f"{stem}.{content_hash}{extension}"
+        path = os.path.join(output_dir, file_name)
+        if not os.path.exists(path):
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(content)
+            os.replace(temporary, path)
+
+        # Remove earlier builds of this asset
+        stale = re.compile(rf"{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(extension)}$")
+        for existing in os.listdir(output_dir):
+            if existing != file_name and stale.match(existing):
+                os.remove(os.path.join(output_dir, existing))
+
+        files[name] = {'file': file_name, 'hash': content_hash, 'bytes': len(content)}
+
+    manifest = {'source_digest': source_digest(), 'files': files}
+    temporary = os.path.join(output_dir, f"manifest.json.{os.getpid()}.tmp")
+    with open(temporary, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(temporary, os.path.join(output_dir, "manifest.json"))
+    return manifest
+
+@lru_cache(maxsize=None)
+def get_manifest():
+    """
+    Manifest of the built assets, building them first if they are missing or stale
+
+    Runs once per process; later calls return the cached manifest.
+    """
+    with _build_lock:
+        try:
+            with open(MANIFEST_PATH) as f:
+                manifest = json.load(f)
+            files_present = all(
+                os.path.exists(os.path.join(STATIC_DIR, entry['file'])) for entry in manifest['files'].values()
+            )
+            if files_present and manifest['source_digest'] == source_digest():
+                return manifest
+        except (OSError, ValueError, KeyError):
+            pass
+
+        print("Building static assets")
+        return build()
+
+def asset_url(name):
+    """
+    URL of a built asset
+
+    The ?v= content hash makes Streamlit's static file handler send a
+    far-future Cache-Control header. With STATIC_ASSET_BASE_URL set, the
+    files are referenced from there instead, e.g. a CDN or reverse proxy
+    serving a copy of static/.
+    """
+    entry = get_manifest()['files'][name]
+    base_url = os.environ.get("STATIC_ASSET_BASE_URL")
+    if base_url:
+        return f"{base_url.rstrip('/')}/{entry['file']}"
+    return f"{STATIC_URL_PATH}/{entry['file']}?v={entry['hash']}"
+
+@lru_cache(maxsize=None)
+def asset_text(name):
+    """Contents of a built text asset, read once per process"""
+    with open(os.path.join(STATIC_DIR, get_manifest()['files'][name]['file']), encoding="utf-8") as f:
+        return f.read()
+
+@lru_cache(maxsize=None)
+def stylesheet_html():
+    """
+    Markup that applies the app stylesheet
+
+    Streamlit's static file handler serves .css as text/plain, which
+    browsers refuse as a stylesheet, so the built stylesheet is inlined
+    unless STATIC_ASSET_BASE_URL points at a server that sends text/css.
+    The inlined block is identical on every rerun, so with
+    global.minCachedMessageSize below its size Streamlit sends it once per
+    session and only a hash reference afterwards.
+    """
+    if os.environ.get("STATIC_ASSET_BASE_URL"):
+        return f'<link rel="stylesheet" href="{asset_url("app.css")}">'
+    return f"<style>{asset_text('app.css')}</style>"
+
+
+if __name__ == "__main__":
+    print(json.dumps(build(), indent=2, sort_keys=True))
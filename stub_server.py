@@ -0,0 +1,355 @@
+"""
+Local stand-in for the protobots generate endpoint
+
+Speaks the same form-data protocol as https://api.protobots.ai/proto_bots/generate_v2
+and answers with plausible topics, scenarios, scenario batches, analyses and
+business profiles, so the app can be load and latency tested offline.
+
+Run it and point the app at it:
+    python stub_server.py --port 8765 --latency lognormal:0.0,0.6 --error-rate 0.02
+    PROTOBOTS_URL=http://127.0.0.1:8765/proto_bots/generate_v2 PROTOBOTS_API_KEY=stub streamlit run app.py
+
+GET /stats returns request, error and malformed-response counts as JSON.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from scenarios import SCENARIO_DATABASE
+
+# Status codes returned when an error is injected
+DEFAULT_ERROR_CODES = (429, 500, 502, 503, 504)
+
+# Generated topics handed out in next_scenarios, topic lists and batches
+STUB_TOPICS = [
+    "Vendor Contract Review",
+    "Seasonal Menu Launch",
+    "Staff Management",
+    "Marketing Strategy",
+    "Financial Planning",
+    "Customer Service",
+    "Technology Implementation",
+    "Delivery Partnership",
+    "Franchise Fee Renegotiation",
+    "Health Inspection Prep",
+    "Local Sponsorship Deal",
+    "Inventory Shrinkage",
+    "Online Review Crisis",
+    "Second Location Scouting",
+    "Energy Cost Spike"
+]
+
+STUB_ANALYSIS = (
+    "Your decisions balanced growth against risk reasonably well. Cash reserves are adequate "
+    "but several investments have not paid off yet, so keep a close eye on spending over the next quarter. "
+    "Customer satisfaction is your strongest asset; protect it while you pursue expansion, "
+    "and revisit the choices that raised your risk level before committing to new locations."
+)
+
+STUB_PROFILE = {
+    "industry": "Quick-service coffee",
+    "location": "Mid-sized college town in the Midwest",
+    "size": "3 locations, 42 employees",
+    "target_market": "Students, young professionals and commuters",
+    "challenges": ["Rising bean costs", "High staff turnover", "New national competitor"],
+    "opportunities": ["Campus catering", "Mobile ordering", "Seasonal drinks"],
+    "goals": ["Open a fourth location", "Cut turnover by 20%"]
+}
+
+# Ways a malformed response can be broken
+MALFORMED_KINDS = ("truncated_json", "missing_object", "not_json", "missing_fields", "empty_object")
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution into a function of a random.Random returning seconds
+
+    Supported specs (all values in seconds):
+    - fixed:0.5
+    - uniform:0.2,1.5
+    - normal:1.0,0.3
+    - lognormal:0.0,0.6 (mu and sigma of the underlying normal, so the median is e**mu)
+    - exponential:0.8 (mean)
+    - pareto:0.5,2.5 (scale and shape; heavy tail)
+    Negative samples are clamped to zero.
+    """
+    name, _, args = (spec or "fixed:0").partition(":")
+    values = [float(value) for value in args.split(",") if value.strip()]
+    samplers = {
+        "fixed": (1, lambda rng, a: a[0]),
+        "uniform": (2, lambda rng, a: rng.uniform(a[0], a[1])),
+        "normal": (2, lambda rng, a: rng.gauss(a[0], a[1])),
+        "lognormal": (2, lambda rng, a: rng.lognormvariate(a[0], a[1])),
+        "exponential": (1, lambda rng, a: rng.expovariate(1 / a[0]) if a[0] > 0 else 0.0),
+        "pareto": (2, lambda rng, a: a[0] * rng.paretovariate(a[1])),
+    }
+    if name not in samplers:
+        raise ValueError(f"Unknown latency distribution: {name}")
+    count, sampler = samplers[name]
+    if len(values) != count:
+        raise ValueError(f"Latency distribution {name} takes {count} value(s)")
+    return lambda rng: max(0.0, sampler(rng, values))
+
+
+def _random_consequences(rng, best):
+    if best:
+        return {
+            "cash_flow": rng.randint(-60000, 30000),
+            "customer_satisfaction": rng.randint(0, 25),
+            "growth_potential": rng.randint(0, 25),
+            "risk_level": rng.randint(-20, 10)
+        }
+    return {
+        "cash_flow": rng.randint(-30000, 10000),
+        "customer_satisfaction": rng.randint(-20, 10),
+        "growth_potential": rng.randint(-15, 10),
+        "risk_level": rng.randint(-5, 20)
+    }
+
+def build_scenario(topic, rng, next_topics=None):
+    """Scenario dictionary for a topic, reusing the wording of a predefined scenario"""
+    template = SCENARIO_DATABASE[rng.choice(list(SCENARIO_DATABASE))]
+    pool = [candidate for candidate in (next_topics or STUB_TOPICS) if candidate != topic] or STUB_TOPICS
+    scenario = {"description": f"{topic}: {template['description']}"}
+    for option in ("best_case", "worst_case"):
+        scenario[option] = {
+            "title": template[option]["title"],
+            "description": template[option]["description"],
+            "consequences": _random_consequences(rng, option == "best_case"),
+            "next_scenarios": rng.sample(pool, min(2, len(pool)))
+        }
+    return scenario
+
+def build_reply(form, rng):
+    """Return the generated text for a request, based on its assistant message and prompt"""
+    assistant = form.get("message.assistant.0", "")
+    prompt = form.get("message.user.1", "")
+
+    if "profile generator" in assistant:
+        return "```json\n" + json.dumps(STUB_PROFILE, indent=2) + "\n```"
+
+    if "analyst" in assistant:
+        return STUB_ANALYSIS
+
+    if "scenario topics" in assistant:
+        topics = rng.sample(STUB_TOPICS, 10)
+        return "\n".join(f"{i + 1}. {topic}" for i, topic in enumerate(topics))
+
+    start = re.search(r"^Starting Topic: (.+)$", prompt, re.MULTILINE)
+    if start:
+        count = re.search(r"connected set of (\d+)", prompt)
+        count = int(count.group(1)) if count else 10
+        topic = start.group(1).strip()
+        topics = [topic] + rng.sample([t for t in STUB_TOPICS if t != topic], min(count - 1, len(STUB_TOPICS) - 1))
+        scenarios = {name: build_scenario(name, rng, topics) for name in topics}
+        return "```json\n" + json.dumps({"scenarios": scenarios}, indent=2) + "\n```"
+
+    topic = re.search(r"^Topic: (.+)$", prompt, re.MULTILINE)
+    topic = topic.group(1).strip() if topic else rng.choice(STUB_TOPICS)
+    return "```json\n" + json.dumps(build_scenario(topic, rng), indent=2) + "\n```"
+
+def malformed_body(kind, text):
+    """Response body (bytes) for a 200 response broken in the given way"""
+    if kind == "truncated_json":
+        return json.dumps({"object": text[:max(1, len(text) // 2)]}).encode("utf-8")
+    if kind == "missing_object":
+        return json.dumps({"result": text}).encode("utf-8")
+    if kind == "not_json":
+        return b"<html><body>Upstream error</body></html>"
+    if kind == "missing_fields":
+        return json.dumps({"object": "```json\n{\"description\": \"Incomplete\"}\n```"}).encode("utf-8")
+    return json.dumps({"object": ""}).encode("utf-8")
+
+
+def parse_form(content_type, body):
+    """Parse a urlencoded or multipart form body into a dictionary of strings"""
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+        )
+        form = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name:
+                form[name] = part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8")
+        return form
+    return {key: values[-1] for key, values in parse_qs(body.decode("utf-8"), keep_blank_values=True).items()}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the pooled client reuses connections like it does in production
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send(200, json.dumps(self.server.stats()).encode("utf-8"))
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_form(self.headers.get("Content-Type", ""), self.rfile.read(length))
+        stream = form.get("stream", "false").lower() == "true"
+        server = self.server
+
+        # Draw every random decision for this request up front under the lock
+        with server.lock:
+            server.counts["requests"] += 1
+            latency = server.latency(server.rng)
+            error = server.rng.random() < server.error_rate
+            status = server.rng.choice(server.error_codes) if error else 200
+            malformed = not error and server.rng.random() < server.malformed_rate
+            kind = server.rng.choice(MALFORMED_KINDS) if malformed else None
+            reply = build_reply(form, random.Random(server.rng.random()))
+            if error:
+                server.counts["errors"] += 1
+            elif malformed:
+                server.counts["malformed"] += 1
+            if stream:
+                server.counts["streams"] += 1
+
+        time.sleep(latency)
+
+        if error:
+            self._send(status, json.dumps({"error": f"Injected status {status}"}).encode("utf-8"))
+            return
+
+        if not stream:
+            if malformed:
+                self._send(200, malformed_body(kind, reply))
+            else:
+                self._send(200, json.dumps({"object": reply}).encode("utf-8"))
+            return
+
+        # Streaming returns the generated text itself as a chunked body
+        if malformed:
+            reply = reply[:max(1, len(reply) // 2)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for offset in range(0, len(reply), server.chunk_size):
+                chunk = reply[offset:offset + server.chunk_size].encode("utf-8")
+                self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.flush()
+                if server.chunk_delay:
+                    time.sleep(server.chunk_delay)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Threaded stub of the protobots generate endpoint
+
+    Parameters:
+    - host, port: Address to listen on (port 0 picks a free port)
+    - latency: Latency distribution spec, see parse_latency
+    - error_rate: Fraction of requests answered with an error status
+    - error_codes: Status codes to pick from for injected errors
+    - malformed_rate: Fraction of successful requests answered with a broken payload
+    - chunk_size: Characters per chunk for streaming responses
+    - chunk_delay: Seconds between streamed chunks
+    - seed: Seed for every random decision, for reproducible runs
+    - verbose: Log every request to stderr
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=8765, latency="fixed:0", error_rate=0.0, error_codes=DEFAULT_ERROR_CODES,
+                 malformed_rate=0.0, chunk_size=24, chunk_delay=0.02, seed=None, verbose=False):
+        super().__init__((host, port), StubHandler)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.malformed_rate = malformed_rate
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "errors": 0, "malformed": 0, "streams": 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL of the generate endpoint, suitable for PROTOBOTS_URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/proto_bots/generate_v2"
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the protobots generate endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0", help="Latency distribution, e.g. lognormal:0.0,0.6 or uniform:0.2,1.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error status")
+    parser.add_argument("--error-codes", default=",".join(str(code) for code in DEFAULT_ERROR_CODES), help="Comma-separated error statuses")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of successful requests with a broken payload")
+    parser.add_argument("--chunk-size", type=int, default=24, help="Characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = StubServer(
+        args.host, args.port, args.latency, args.error_rate,
+        [int(code) for code in args.error_codes.split(",") if code.strip()],
+        args.malformed_rate, args.chunk_size, args.chunk_delay, args.seed, args.verbose
+    )
+    print(f"Stub protobots endpoint listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
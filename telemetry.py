@@ -0,0 +1,397 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from cache hits up to slow generations with retries
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Response size buckets in bytes
+DEFAULT_SIZE_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with labels
+
+    Parameters:
+    - name: Metric name without the _total suffix
+    - documentation: Help text
+    - labelnames: Names of the labels every sample carries
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """List of (suffix, label values, extra labels, value)"""
+        with self._lock:
+            return [("_total", key, None, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """
+    Cumulative histogram with labels
+
+    Parameters:
+    - name: Metric name
+    - documentation: Help text
+    - labelnames: Names of the labels every sample carries
+    - buckets: Upper bounds of the buckets, in increasing order
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, _ = self._values.get(key) or ([0], 0.0)
+            return sum(counts)
+
+    def samples(self):
+        """List of (suffix, label values, extra labels, value) with cumulative buckets"""
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(("_bucket", key, [("le", _format_value(float(bound)))], cumulative))
+            samples.append(("_count", key, None, cumulative))
+            samples.append(("_sum", key, None, total))
+        return samples
+
+
+class Registry:
+    """Collection of metrics that can be rendered for scraping"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, openmetrics=True):
+        """
+        Render every metric in the OpenMetrics text format
+
+        With openmetrics=False the older Prometheus text format is produced
+        instead, which is what the node_exporter textfile collector reads.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+
+        lines = []
+        for metric in metrics:
+            # Prometheus text format names counter families with the _total suffix
+            family = metric.name if openmetrics or metric.kind != "counter" else metric.name + "_total"
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            for suffix, key, extra, value in metric.samples():
+                name = metric.name + suffix
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+GENERATION_CALLS = REGISTRY.counter(
+    "generation_calls", "Generator calls by outcome (success, cache_hit, coalesced, fallback, error)", ["operation", "outcome"]
+)
+GENERATION_DURATION = REGISTRY.histogram(
+    "generation_duration_seconds", "End-to-end generator call duration including retries and streaming", ["operation"]
+)
+GENERATION_FALLBACKS = REGISTRY.counter(
+    "generation_fallbacks", "Generator calls answered by a fallback instead of the LLM", ["operation"]
+)
+GENERATION_PARSE_FAILURES = REGISTRY.counter(
+    "generation_parse_failures", "LLM responses that could not be parsed or validated", ["operation"]
+)
+PROTOBOTS_REQUESTS = REGISTRY.counter(
+    "protobots_requests", "HTTP attempts against the protobots API by status code or error", ["operation", "status"]
+)
+PROTOBOTS_DURATION = REGISTRY.histogram(
+    "protobots_request_duration_seconds", "Duration of single HTTP attempts until the response (or its headers when streaming)", ["operation"]
+)
+PROTOBOTS_RETRIES = REGISTRY.counter(
+    "protobots_retries", "HTTP attempts that were retries of a failed attempt", ["operation"]
+)
+PROTOBOTS_RESPONSE_BYTES = REGISTRY.histogram(
+    "protobots_response_bytes", "Size of protobots response bodies", ["operation"], DEFAULT_SIZE_BUCKETS
+)
+PROTOBOTS_FIRST_CHUNK = REGISTRY.histogram(
+    "protobots_stream_first_chunk_seconds", "Time from sending a streaming request to its first chunk", ["operation"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "generation_cache_requests", "Generation cache lookups by result (hit, miss, error)", ["namespace", "result"]
+)
+CACHE_WRITES = REGISTRY.counter(
+    "generation_cache_writes", "Generation cache writes by outcome (stored, oversize, error)", ["namespace", "outcome"]
+)
+CACHE_VALUE_BYTES = REGISTRY.histogram(
+    "generation_cache_value_bytes", "Size of stored generation cache payloads after compression", ["namespace"], DEFAULT_SIZE_BUCKETS
+)
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "generation_singleflight_calls", "Coalesced generator calls by role (leader, follower, remote_follower)", ["flight", "role"]
+)
+APP_RERUN_SECTION_DURATION = REGISTRY.histogram(
+    "app_rerun_section_seconds", "Duration of the sections of app.py reruns, with section=\"total\" for whole reruns", ["section"]
+)
+
+
+# Generator operations currently running on each thread
+_local = threading.local()
+
+
+class _Operation:
+    def __init__(self, name):
+        self.name = name
+        self.outcome = "success"
+        self.started = time.perf_counter()
+
+    def finish(self, outcome=None):
+        outcome = outcome or self.outcome
+        GENERATION_CALLS.inc(operation=self.name, outcome=outcome)
+        GENERATION_DURATION.observe(time.perf_counter() - self.started, operation=self.name)
+
+
+def _push(operation):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(operation)
+
+def _pop():
+    _local.stack.pop()
+
+def _current():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+def current_operation():
+    """Name of the generator operation running on this thread, or "unknown" outside of one"""
+    operation = _current()
+    return operation.name if operation is not None else "unknown"
+
+def record_fallback():
+    """Mark the running operation as answered by a fallback"""
+    operation = _current()
+    name = operation.name if operation is not None else "unknown"
+    GENERATION_FALLBACKS.inc(operation=name)
+    if operation is not None:
+        operation.outcome = "fallback"
+
+def record_parse_failure():
+    """Count an LLM response of the running operation that could not be parsed"""
+    GENERATION_PARSE_FAILURES.inc(operation=current_operation())
+
+def record_cache_hit():
+    """Mark the running operation as answered from a cache"""
+    operation = _current()
+    if operation is not None:
+        operation.outcome = "cache_hit"
+
+def record_coalesced():
+    """Mark the running operation as answered by an identical call already in flight"""
+    operation = _current()
+    if operation is not None:
+        operation.outcome = "coalesced"
+
+
+def instrumented(name):
+    """
+    Decorator recording the calls, outcome and duration of a generator function
+
+    Works for plain functions and for generator functions, where the
+    operation is active only while the generator itself is running and is
+    finished once it is exhausted or closed. Exceptions are recorded with
+    the "error" outcome and re-raised.
+    """
+    def decorate(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                operation = _Operation(name)
+                generator = func(*args, **kwargs)
+                outcome = None
+                try:
+                    while True:
+                        _push(operation)
+                        try:
+                            item = next(generator)
+                        except StopIteration:
+                            return
+                        finally:
+                            _pop()
+                        yield item
+                except GeneratorExit:
+                    generator.close()
+                    raise
+                except BaseException:
+                    outcome = "error"
+                    raise
+                finally:
+                    operation.finish(outcome)
+            return wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            operation = _Operation(name)
+            _push(operation)
+            outcome = None
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                outcome = "error"
+                raise
+            finally:
+                _pop()
+                operation.finish(outcome)
+        return wrapper
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        # Prometheus asks for OpenMetrics in its Accept header
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "") or "openmetrics" in self.path
+        body = REGISTRY.render(openmetrics=openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serve /metrics for Prometheus from a background thread and return the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="telemetry-http", daemon=True).start()
+    return server
+
+def write_textfile(path):
+    """Atomically write every metric to path in the format read by the node_exporter textfile collector"""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        f.write(REGISTRY.render(openmetrics=False))
+    os.replace(temporary, path)
+
+def start_textfile_exporter(path, interval=15.0):
+    """Rewrite the textfile every interval seconds from a background thread"""
+    def export():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError as e:
+                print(f"Telemetry textfile export failed: {str(e)}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=export, name="telemetry-textfile", daemon=True)
+    thread.start()
+    return thread
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """
+    Start the exporters configured through the environment, once per process
+
+    - TELEMETRY_PORT: Serve /metrics on this port
+    - TELEMETRY_TEXTFILE: Periodically write metrics to this file
+    - TELEMETRY_TEXTFILE_INTERVAL: Seconds between textfile writes (default 15)
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    port = os.environ.get("TELEMETRY_PORT")
+    if port:
+        try:
+            start_http_server(int(port), os.environ.get("TELEMETRY_HOST", "0.0.0.0"))
+            print(f"Serving metrics on port {port}")
+        except OSError as e:
+            print(f"Could not start the metrics endpoint on port {port}: {str(e)}")
+
+    path = os.environ.get("TELEMETRY_TEXTFILE")
+    if path:
+        start_textfile_exporter(path, float(os.environ.get("TELEMETRY_TEXTFILE_INTERVAL", 15.0)))
@@ -0,0 +1,36 @@
+import random
+import re
+
+from assets import PathVisualRenderer
+
+
+def random_history(rng, length):
+    return [
+        {'topic': rng.choice(["Staff Management", "Marketing Strategy", "Financial Planning"]),
+         'choice': rng.choice(["Best Case", "Worst Case"])}
+        for _ in range(length)
+    ]
+
+
+def test_incremental_renders_match_fresh_renders():
+    rng = random.Random(21)
+    renderer = PathVisualRenderer(cache_size=8)
+    history = []
+    for _ in range(400):
+        if history and rng.random() < 0.1:
+            # Undo back to an earlier decision, then continue on another branch
+            history = history[:rng.randrange(len(history))]
+        history = history + random_history(rng, 1)
+        assert renderer.render(history) == PathVisualRenderer().render(history), len(history)
+
+def test_collapsed_buckets_count_best_case_choices():
+    history = [{'topic': "Step", 'choice': "Best Case" if i % 3 == 0 else "Worst Case"} for i in range(300)]
+    renderer = PathVisualRenderer()
+    for length in range(1, len(history) + 1):
+        svg = renderer.render(history[:length])
+    head = tail = min(renderer.per_row, renderer.max_nodes // 3)
+    assert svg.count("<title>Steps") == renderer.max_nodes - head - tail
+    assert sum(map(int, re.findall(r": (\d+) best", svg))) == sum(decision['choice'] == "Best Case" for decision in history[head:len(history) - tail])
+
+def test_empty_history():
+    assert PathVisualRenderer().render([]) == ""
@@ -0,0 +1,156 @@
+import time
+
+import pytest
+
+import cache
+from cache import Cache, MemoryBackend, RedisBackend, SQLiteBackend, decode_value, encode_value
+from resp_server import RespServer
+
+
+@pytest.fixture
+def redis_url():
+    with RespServer(port=0) as server:
+        yield server.url
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    return RedisBackend(request.getfixturevalue("redis_url"))
+
+
+def test_encode_decode_round_trip():
+    value = {"description": "Open a second location", "next_scenarios": ["A", "B"], "n": 1.5}
+    data = encode_value(value)
+    assert data[:1] == cache.PLAIN_PAYLOAD
+    assert decode_value(data) == value
+
+def test_large_payloads_are_compressed():
+    value = {"text": "franchise " * 500}
+    data = encode_value(value, compress_min_bytes=100)
+    assert data[:1] == cache.COMPRESSED_PAYLOAD
+    assert len(data) < len(encode_value(value))
+    assert decode_value(data) == value
+
+def test_payloads_that_do_not_shrink_stay_plain():
+    value = "franchise"
+    assert encode_value(value, compress_min_bytes=10)[:1] == cache.PLAIN_PAYLOAD
+
+def test_unknown_payload_format_is_rejected():
+    with pytest.raises(ValueError):
+        decode_value(b"x{}")
+
+def test_get_set_delete(backend):
+    store = Cache("test", backend)
+    assert store.get("key") is None
+    assert store.set("key", {"topics": ["A", "B"]})
+    assert store.get("key") == {"topics": ["A", "B"]}
+    store.delete("key")
+    assert store.get("key") is None
+
+def test_get_returns_a_fresh_copy(backend):
+    store = Cache("test", backend)
+    store.set("key", {"topics": ["A"]})
+    store.get("key")["topics"].append("B")
+    assert store.get("key") == {"topics": ["A"]}
+
+def test_namespaces_are_separate(backend):
+    scenarios, topics = Cache("scenario", backend), Cache("topics", backend)
+    scenarios.set("key", 1)
+    assert topics.get("key") is None
+    topics.clear()
+    assert scenarios.get("key") == 1
+    assert len(scenarios) == 1
+
+def test_entries_expire_after_their_ttl(backend):
+    store = Cache("test", backend, ttl=0.05)
+    store.set("key", 1)
+    store.set("long", 2, ttl=60)
+    assert store.get("key") == 1
+    time.sleep(0.1)
+    assert store.get("key") is None
+    assert store.get("long") == 2
+
+def test_add_only_stores_absent_keys(backend):
+    store = Cache("test", backend)
+    assert store.add("lock", "first", ttl=0.05)
+    assert not store.add("lock", "second")
+    assert store.get("lock") == "first"
+    time.sleep(0.1)
+    assert store.add("lock", "third")
+
+def test_oversized_values_are_not_stored(backend):
+    store = Cache("test", backend, max_value_bytes=100)
+    assert not store.set("key", "x" * 200)
+    assert store.get("key") is None
+    assert store.stats()['oversize'] == 1
+
+def test_stats_count_hits_and_misses():
+    store = Cache("test", MemoryBackend())
+    store.get("key")
+    store.set("key", "value")
+    store.get("key")
+    stats = store.stats()
+    assert (stats['hits'], stats['misses'], stats['writes']) == (1, 1, 1)
+    assert stats['hit_ratio'] == 0.5
+    assert stats['bytes_read'] == stats['bytes_written'] > 0
+
+def test_backend_failures_are_misses():
+    store = Cache("test", RedisBackend("redis://127.0.0.1:1/0", timeout=0.5))
+    assert store.get("key") is None
+    assert not store.set("key", 1)
+    assert store.stats()['errors'] == 2
+
+def test_memory_backend_evicts_least_recently_used():
+    store = Cache("test", MemoryBackend(max_entries=2), ttl=None)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1 and store.get("c") == 3
+
+def test_memory_backend_evicts_by_bytes():
+    backend = MemoryBackend(max_bytes=100)
+    for i in range(10):
+        backend.set("test", str(i), b"x" * 30)
+    assert backend.count("test") == 3
+    assert backend.get("test", "9") is not None
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for key in ("a", "b", "c"):
+        backend.set("test", key, b"value")
+        time.sleep(0.01)
+    backend.evict("test")
+    assert backend.count("test") == 2
+    assert backend.get("test", "a") is None
+
+def test_sqlite_backend_evicts_by_bytes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=None, max_bytes=200)
+    for i in range(10):
+        backend.set("test", str(i), b"x" * 50)
+        time.sleep(0.01)
+    backend.evict("test")
+    assert backend.count("test") == 4
+    assert backend.get("test", "9") is not None
+
+def test_sqlite_hits_refresh_recency_at_most_once_per_interval(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    backend.set("test", "key", b"value")
+
+    def accessed_at():
+        return backend._connection().execute(
+            "SELECT accessed_at FROM cache_entries WHERE namespace = 'test' AND key = 'key'"
+        ).fetchone()[0]
+
+    written = accessed_at()
+    backend.get("test", "key")
+    assert accessed_at() == written
+
+    backend._connection().execute("UPDATE cache_entries SET accessed_at = accessed_at - ?", (cache.TOUCH_INTERVAL + 1,))
+    backend.get("test", "key")
+    assert accessed_at() > written
@@ -0,0 +1,101 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from metrics import METRICS, MetricsVector, apply_batch, consequences_array, health_batch, to_array
+from utils import apply_scenario_consequences, calculate_business_health
+
+# apply_batch clamps every bounded metric, while apply_scenario_consequences
+# only clamps the metrics a decision touches. The two agree for states that
+# start within bounds (0-100 for everything but cash flow), which is all a
+# simulation ever produces, so states starting out of bounds are excluded.
+
+
+def random_state(rng):
+    return {
+        'cash_flow': rng.randint(-200000, 200000),
+        'customer_satisfaction': rng.randint(0, 100),
+        'growth_potential': rng.randint(0, 100),
+        'risk_level': rng.randint(0, 100),
+    }
+
+def random_consequences(rng):
+    consequences = {
+        'cash_flow': rng.randint(-50000, 50000),
+        'customer_satisfaction': rng.randint(-120, 120),
+        'growth_potential': rng.randint(-120, 120),
+        'risk_level': rng.randint(-120, 120),
+    }
+    # Decisions do not always touch every metric
+    return {metric: value for metric, value in consequences.items() if rng.random() < 0.8}
+
+def edge_cases():
+    """States on the 0/100 bounds with consequences landing exactly on, inside and past them"""
+    for value, delta in itertools.product((0, 1, 50, 99, 100), (-101, -100, -1, 0, 1, 100, 101)):
+        state = {'cash_flow': 100000, 'customer_satisfaction': value, 'growth_potential': 100 - value, 'risk_level': value}
+        yield state, {'customer_satisfaction': delta, 'growth_potential': -delta, 'risk_level': delta}
+
+def health_ties():
+    """In-bounds states whose health score lies exactly halfway between two integers"""
+    ties = []
+    for state in itertools.product(range(0, 120001, 1250), range(0, 101, 5), range(0, 101, 5), range(0, 101, 25)):
+        metrics = dict(zip(METRICS, state))
+        score = (
+            (0.4 * min(metrics['cash_flow'] / 100000, 1)) +
+            (0.3 * (metrics['customer_satisfaction'] / 100)) +
+            (0.2 * (metrics['growth_potential'] / 100)) -
+            (0.1 * (metrics['risk_level'] / 100))
+        )
+        if 0 <= score <= 1 and (score * 100) % 1 == 0.5:
+            ties.append(metrics)
+    return ties
+
+
+def cases():
+    rng = random.Random(12)
+    return [(random_state(rng), random_consequences(rng)) for _ in range(5000)] + list(edge_cases())
+
+def test_vector_apply_matches_apply_scenario_consequences():
+    for state, consequences in cases():
+        expected = apply_scenario_consequences(consequences, state)
+        assert MetricsVector.from_mapping(state).apply(consequences).as_dict() == expected
+
+def test_apply_batch_matches_apply_scenario_consequences():
+    states, consequences = zip(*cases())
+    expected = to_array([apply_scenario_consequences(c, s) for s, c in zip(states, consequences)])
+    deltas = np.array([consequences_array(c) for c in consequences])
+    assert np.array_equal(apply_batch(to_array(states), deltas), expected)
+
+    metrics = to_array(states)
+    apply_batch(metrics, deltas, out=metrics)
+    assert np.array_equal(metrics, expected)
+
+def test_apply_batch_broadcasts_one_decision():
+    states = [state for state, _ in cases()]
+    consequences = {'cash_flow': -15000, 'customer_satisfaction': 12, 'risk_level': -7}
+    expected = to_array([apply_scenario_consequences(consequences, state) for state in states])
+    assert np.array_equal(apply_batch(to_array(states), consequences_array(consequences)), expected)
+
+def test_health_matches_calculate_business_health():
+    ties = health_ties()
+    assert ties
+    states = ties + [state for state, _ in cases()]
+    expected = [calculate_business_health(state) for state in states]
+    assert [MetricsVector.from_mapping(state).health() for state in states] == expected
+    batch = health_batch(to_array(states))
+    assert batch.tolist() == expected
+    assert batch.dtype == np.int64
+
+@pytest.mark.parametrize("state, expected", [
+    # Clamped at 0
+    ({'cash_flow': -10**9, 'customer_satisfaction': 0, 'growth_potential': 0, 'risk_level': 100}, 0),
+    ({'cash_flow': 0, 'customer_satisfaction': 0, 'growth_potential': 0, 'risk_level': 1}, 0),
+    # Cash flow counts up to 100000; this is the highest score within bounds
+    ({'cash_flow': 10**9, 'customer_satisfaction': 100, 'growth_potential': 100, 'risk_level': 0}, 90),
+])
+def test_health_extremes(state, expected):
+    assert calculate_business_health(state) == expected
+    assert MetricsVector.from_mapping(state).health() == expected
+    assert health_batch(to_array([state])).tolist() == [expected]
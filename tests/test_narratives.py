@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+
+from metrics import METRICS
+from narratives import NARRATIVE_TABLE, describe_impact, impact_label, narrate, narrate_batch, narrate_runs
+
+
+def ladder_phrase(metric, value):
+    """Phrase picked by the if/elif ladder narratives.py replaced"""
+    t1, t2 = NARRATIVE_TABLE[metric]['thresholds']
+    phrases = NARRATIVE_TABLE[metric]['phrases']
+    if value >= t2:
+        return phrases[6]
+    elif value >= t1:
+        return phrases[5]
+    elif value > 0:
+        return phrases[4]
+    elif value <= -t2:
+        return phrases[0]
+    elif value <= -t1:
+        return phrases[1]
+    elif value < 0:
+        return phrases[2]
+    return phrases[3]
+
+def ladder_narrative(consequences):
+    cash, satisfaction, growth, risk = (ladder_phrase(metric, consequences[metric]) for metric in METRICS)
+    return f"This decision {cash}. It {satisfaction}, {growth}, and {risk}."
+
+def boundary_values(metric):
+    t1, t2 = NARRATIVE_TABLE[metric]['thresholds']
+    values = [0, 1, t1 - 1, t1, t1 + 1, t2 - 1, t2, t2 + 1, 10 * t2]
+    return values + [-value for value in values]
+
+def random_consequences(rng, count):
+    return [
+        {metric: rng.randint(-2 * NARRATIVE_TABLE[metric]['thresholds'][1], 2 * NARRATIVE_TABLE[metric]['thresholds'][1])
+         for metric in METRICS}
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("metric", METRICS)
+def test_describe_impact_matches_the_ladder(metric):
+    for value in boundary_values(metric):
+        assert describe_impact(metric, value) == ladder_phrase(metric, value), value
+
+def test_narrate_matches_the_ladder():
+    for consequences in random_consequences(random.Random(5), 500):
+        assert narrate(consequences) == ladder_narrative(consequences)
+
+def test_narrate_batch_matches_narrate():
+    consequences = random_consequences(random.Random(6), 500)
+    consequences += [dict.fromkeys(METRICS, value) for value in boundary_values('cash_flow')]
+    expected = [narrate(c) for c in consequences]
+    assert narrate_batch(consequences) == expected
+    array = np.array([[c[metric] for metric in METRICS] for c in consequences])
+    assert narrate_batch(array) == expected
+    assert narrate_batch([]) == []
+
+def test_narrate_runs_splits_by_run():
+    runs = [[{'consequences': c} for c in random_consequences(random.Random(7), size)] for size in (3, 0, 2)]
+    narratives = narrate_runs(runs)
+    assert [len(run) for run in narratives] == [3, 0, 2]
+    assert narratives[2][1] == narrate(runs[2][1]['consequences'])
+
+def test_impact_label():
+    assert impact_label('cash_flow', 20000) == "**Cash Flow**: ↑ $20000"
+    assert impact_label('risk_level', -5) == "**Risk Level**: ↓ 5%"
+    assert impact_label('growth_potential', 0) == "**Growth Potential**: → 0%"
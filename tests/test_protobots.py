@@ -0,0 +1,62 @@
+import json
+
+import pytest
+import requests
+
+from protobots import ProtobotsClient
+
+TEXT = "Café owners’ margins — up"
+
+
+class FakeRaw:
+    """Raw body delivering fixed chunks, as urllib3 does for a chunked response"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, chunk_size=None, decode_content=True):
+        yield from self.chunks
+
+    def close(self):
+        pass
+
+
+def fake_response(chunks, content_type):
+    response = requests.Response()
+    response.status_code = 200
+    if content_type is not None:
+        response.headers["Content-Type"] = content_type
+    # As set by requests' HTTPAdapter, which assumes ISO-8859-1 for text/* without a charset
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.raw = FakeRaw(chunks)
+    return response
+
+def split_bytes(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def stream_text(monkeypatch, chunks, content_type):
+    client = ProtobotsClient(url="http://127.0.0.1:1/generate", max_retries=0)
+    monkeypatch.setattr(client, "post", lambda data, headers=None, stream=False: fake_response(chunks, content_type))
+    return "".join(client.stream({'prompt': "topics"}))
+
+
+@pytest.mark.parametrize("content_type", [
+    "text/plain",
+    "text/event-stream",
+    "text/plain; charset=utf-8",
+    'text/plain; charset="UTF-8"',
+    "text/plain; charset=unknown-charset",
+    None,
+])
+def test_stream_decodes_utf8_unless_another_charset_is_named(monkeypatch, content_type):
+    # Two-byte chunks split the multi-byte characters across chunks
+    assert stream_text(monkeypatch, split_bytes(TEXT.encode("utf-8"), 2), content_type) == TEXT
+
+def test_stream_uses_an_explicit_charset(monkeypatch):
+    text = "Café"
+    assert stream_text(monkeypatch, [text.encode("latin-1")], "text/plain; charset=ISO-8859-1") == text
+
+@pytest.mark.parametrize("content_type", ["application/json", "text/plain"])
+def test_stream_unwraps_envelopes(monkeypatch, content_type):
+    body = json.dumps({'object': TEXT}, ensure_ascii=False).encode("utf-8")
+    assert stream_text(monkeypatch, split_bytes(body, 5), content_type) == TEXT
@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from metrics import METRICS
+from scenario_index import SCENARIO_INDEX, ScenarioIndex, build_alias_table
+from scenarios import SCENARIO_DATABASE
+
+
+def option(next_scenarios, next_weights=None, cash_flow=0):
+    chosen = {
+        'consequences': dict(dict.fromkeys(METRICS, 0), cash_flow=cash_flow),
+        'next_scenarios': next_scenarios,
+    }
+    if next_weights is not None:
+        chosen['next_weights'] = next_weights
+    return chosen
+
+def database(**options):
+    """Two-topic database; options override the best_case of topic A"""
+    return {
+        "A": {'description': "A", 'best_case': option(["B"], **options), 'worst_case': option(["A", "B"])},
+        "B": {'description': "B", 'best_case': option([]), 'worst_case': option(["A"])},
+    }
+
+
+def test_shipped_database_compiles():
+    assert len(SCENARIO_INDEX) == len(SCENARIO_DATABASE)
+    assert SCENARIO_INDEX.consequences.shape == (len(SCENARIO_DATABASE), 2, len(METRICS))
+
+def test_consequences_follow_metric_order():
+    index = ScenarioIndex(database(cash_flow=5000))
+    assert index.consequences[0, 0, METRICS.index('cash_flow')] == 5000
+
+@pytest.mark.parametrize("next_scenarios, next_weights", [
+    (["Missing"], None),
+    (["B"], [1, 1]),
+    (["B"], [-1]),
+    (["B"], [0]),
+])
+def test_malformed_graphs_are_rejected(next_scenarios, next_weights):
+    broken = database()
+    broken["A"]['best_case'] = option(next_scenarios, next_weights)
+    with pytest.raises(ValueError, match="A \\(best_case\\)"):
+        ScenarioIndex(broken)
+
+def test_alias_table_matches_weights():
+    weights = [1, 2, 3, 4]
+    probabilities, aliases = build_alias_table(weights)
+    # Probability mass of each outcome summed over the table's columns
+    mass = [0.0] * len(weights)
+    for k, (probability, alias) in enumerate(zip(probabilities, aliases)):
+        mass[k] += probability / len(weights)
+        mass[alias] += (1 - probability) / len(weights)
+    assert mass == pytest.approx([weight / sum(weights) for weight in weights])
+
+def test_sampling_follows_the_graph():
+    index = ScenarioIndex(database())
+    rng = random.Random(1)
+    assert {index.sample_next_topic("A", 'best_case', rng) for _ in range(50)} == {"B"}
+    assert {index.sample_next_topic("A", 'worst_case', rng) for _ in range(50)} == {"A", "B"}
+    # An option without next scenarios continues with any topic
+    assert {index.sample_next_topic("B", 'best_case', rng) for _ in range(50)} == {"A", "B"}
+
+def test_weighted_sampling():
+    weighted = database()
+    weighted["A"]['worst_case'] = option(["A", "B"], [1, 3])
+    index = ScenarioIndex(weighted)
+    rng = random.Random(2)
+    counts = Counter(index.sample_next_topic("A", 'worst_case', rng) for _ in range(20000))
+    assert counts["B"] / 20000 == pytest.approx(0.75, abs=0.02)
+
+def test_batch_sampling_stays_on_the_graph():
+    index = ScenarioIndex(database())
+    rng = np.random.default_rng(3)
+    topic_ids = np.array([0, 0, 1, 1] * 250)
+    option_ids = np.array([0, 1, 0, 1] * 250)
+    next_ids = index.sample_next_batch(topic_ids, option_ids, rng)
+    for topic_id, option_id, next_id in zip(topic_ids, option_ids, next_ids):
+        allowed = index.next_ids(topic_id, option_id) or range(len(index))
+        assert next_id in allowed
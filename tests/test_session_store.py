@@ -0,0 +1,181 @@
+import json
+import random
+import time
+import zlib
+
+import pytest
+
+from engine import Simulation, run_simulation
+from scenarios import SCENARIO_DATABASE
+from session_store import (
+    FileSessionBackend,
+    MemorySessionBackend,
+    SNAPSHOT_VERSION,
+    SQLiteSessionBackend,
+    SessionStore,
+    create_backend,
+    decode_snapshot,
+    encode_snapshot,
+)
+
+SESSION_ID = "0123456789abcdef0123456789abcdef"
+TOPIC = next(iter(SCENARIO_DATABASE))
+
+
+def played_simulation():
+    simulation = Simulation(rng=random.Random(7))
+    simulation.set_multiplier("cash_flow", 1.5)
+    simulation.start(TOPIC)
+    simulation.choose(SCENARIO_DATABASE[TOPIC], "best_case")
+    return simulation
+
+def snapshot_payload(data):
+    return json.loads(zlib.decompress(data[1:]))
+
+
+def test_simulation_round_trips_through_dict():
+    simulation = played_simulation()
+    restored = Simulation.from_dict(json.loads(json.dumps(simulation.to_dict())))
+    assert restored.to_dict() == simulation.to_dict()
+    assert restored.step == simulation.step
+    assert restored.metrics.as_dict() == simulation.metrics.as_dict()
+
+def test_finished_simulation_round_trips():
+    simulation = run_simulation(TOPIC, SCENARIO_DATABASE.get, simulation=Simulation(rng=random.Random(3)))
+    restored = Simulation.from_dict(simulation.to_dict())
+    assert restored.finished and restored.history == simulation.history
+
+def test_snapshot_round_trip():
+    custom = {'description': "A custom dilemma", 'best_case': {}, 'worst_case': {}}
+    state = {
+        'simulation': played_simulation(),
+        'step': 'simulation',
+        'business_profile': {'name': "Bean There", 'industry': "Coffee"},
+        'custom_scenarios': {TOPIC: SCENARIO_DATABASE[TOPIC], "Custom": custom},
+        'current_scenario_data': SCENARIO_DATABASE[TOPIC],
+        'current_scenario_data_key': TOPIC,
+        'analysis_cache': {'key': "Analysis"},
+        'unpersisted': object(),
+    }
+    data = encode_snapshot(state)
+    assert data[0] == SNAPSHOT_VERSION
+
+    restored = decode_snapshot(data)
+    assert restored['simulation'].to_dict() == state['simulation'].to_dict()
+    assert restored['custom_scenarios'] == state['custom_scenarios']
+    assert restored['current_scenario_data'] == SCENARIO_DATABASE[TOPIC]
+    assert restored['business_profile'] == state['business_profile']
+    assert 'unpersisted' not in restored
+
+def test_database_scenarios_are_stored_by_reference():
+    state = {
+        'simulation': Simulation(),
+        'custom_scenarios': {TOPIC: SCENARIO_DATABASE[TOPIC]},
+        'current_scenario_data': SCENARIO_DATABASE[TOPIC],
+        'current_scenario_data_key': TOPIC,
+    }
+    payload = snapshot_payload(encode_snapshot(state))
+    assert payload['custom_scenarios'] == {TOPIC: {'$db': TOPIC}}
+    assert payload['current_scenario_data'] == {'$db': TOPIC}
+
+def test_edited_database_scenarios_are_stored_in_full():
+    edited = dict(SCENARIO_DATABASE[TOPIC], description="Edited")
+    payload = snapshot_payload(encode_snapshot({'simulation': Simulation(), 'custom_scenarios': {TOPIC: edited}}))
+    assert payload['custom_scenarios'][TOPIC] == edited
+
+@pytest.mark.parametrize("data", [b"", bytes([SNAPSHOT_VERSION + 1]) + zlib.compress(b"{}")])
+def test_unsupported_snapshots_are_rejected(data):
+    with pytest.raises(ValueError, match="Unsupported session snapshot version"):
+        decode_snapshot(data)
+
+
+@pytest.fixture(params=["memory", "sqlite", "file"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionBackend(ttl=60)
+    if request.param == "sqlite":
+        return SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"), ttl=60)
+    return FileSessionBackend(str(tmp_path / "sessions"), ttl=60)
+
+def test_backend_save_load_delete(backend):
+    assert backend.load(SESSION_ID) is None
+    backend.save_many({SESSION_ID: b"snapshot"})
+    assert backend.load(SESSION_ID) == b"snapshot"
+    backend.save_many({SESSION_ID: b"newer"})
+    assert backend.load(SESSION_ID) == b"newer"
+    backend.delete(SESSION_ID)
+    assert backend.load(SESSION_ID) is None
+
+def test_backend_expires_sessions(backend):
+    backend.ttl = 0.05
+    backend.save_many({SESSION_ID: b"snapshot"})
+    time.sleep(0.1)
+    assert backend.load(SESSION_ID) is None
+
+def test_file_backend_rejects_malformed_ids(tmp_path):
+    backend = FileSessionBackend(str(tmp_path))
+    with pytest.raises(ValueError):
+        backend.load("../../etc/passwd")
+
+def test_create_backend(tmp_path):
+    assert create_backend("none") is None
+    assert isinstance(create_backend("file", str(tmp_path), ttl=1), FileSessionBackend)
+    with pytest.raises(ValueError):
+        create_backend("postgres")
+
+
+class FlakyBackend(MemorySessionBackend):
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+        self.batches = []
+
+    def save_many(self, snapshots):
+        if self.fail:
+            raise OSError("disk full")
+        self.batches.append(dict(snapshots))
+        super().save_many(snapshots)
+
+def test_store_queues_writes_until_flushed():
+    backend = FlakyBackend()
+    store = SessionStore(backend, flush_interval=60)
+    assert store.save(SESSION_ID, b"first")
+    assert store.save(SESSION_ID, b"second")
+    assert store.load(SESSION_ID) == b"second"
+    assert backend.load(SESSION_ID) is None
+
+    store.flush()
+    assert backend.batches == [{SESSION_ID: b"second"}]
+    assert store.load(SESSION_ID) == b"second"
+
+def test_store_skips_unchanged_snapshots():
+    backend = FlakyBackend()
+    store = SessionStore(backend, flush_interval=60)
+    store.save(SESSION_ID, b"snapshot")
+    store.flush()
+    assert not store.save(SESSION_ID, b"snapshot")
+    store.flush()
+    assert len(backend.batches) == 1
+    assert store.save(SESSION_ID, b"changed")
+
+def test_store_retries_failed_flushes():
+    backend = FlakyBackend()
+    store = SessionStore(backend, flush_interval=60)
+    backend.fail = True
+    store.save(SESSION_ID, b"snapshot")
+    store.flush()
+    assert store.load(SESSION_ID) == b"snapshot"
+
+    backend.fail = False
+    store.flush()
+    assert backend.load(SESSION_ID) == b"snapshot"
+
+def test_store_flushes_full_batches_in_the_background():
+    backend = FlakyBackend()
+    store = SessionStore(backend, flush_interval=60, batch_size=2)
+    store.save(SESSION_ID, b"a")
+    store.save("f" * 32, b"b")
+    deadline = time.monotonic() + 5
+    while not backend.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert backend.batches == [{SESSION_ID: b"a", "f" * 32: b"b"}]
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+import singleflight
+from cache import Cache, MemoryBackend
+from singleflight import FlightError, SingleFlight
+
+
+def run_concurrently(flight, key, func, callers):
+    """Run flight.do from several threads while the leader is held, returning results and errors by caller"""
+    release = threading.Event()
+    results, errors = {}, {}
+
+    def held():
+        release.wait(5)
+        return func()
+
+    def call(i):
+        try:
+            results[i] = flight.do(key, held)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.stats()['followers'] < callers - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return {"topics": ["A", "B"]}
+
+    results, errors = run_concurrently(flight, "key", generate, 5)
+    assert not errors
+    assert len(calls) == 1
+    assert list(results.values()) == [{"topics": ["A", "B"]}] * 5
+    assert flight.stats() == {'leaders': 1, 'followers': 4, 'remote_followers': 0, 'deduplicated': 4}
+    assert flight.in_flight() == 0
+
+def test_followers_get_isolated_copies():
+    flight = SingleFlight("test")
+    results, _ = run_concurrently(flight, "key", lambda: {"topics": ["A"]}, 3)
+    results[0]["topics"].append("B")
+    assert len({id(result) for result in results.values()}) == 3
+    assert sum(result == {"topics": ["A"]} for result in results.values()) == 2
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("model unavailable")
+
+    results, errors = run_concurrently(flight, "key", fail, 4)
+    assert not results
+    assert len(errors) == 4
+    assert all(isinstance(e, ValueError) and str(e) == "model unavailable" for e in errors.values())
+    assert flight.in_flight() == 0
+
+def test_different_keys_and_sequential_calls_are_not_coalesced():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("a", lambda: 2) == 2
+    assert flight.do("b", lambda: 3) == 3
+    assert flight.stats()['leaders'] == 3
+    assert flight.stats()['deduplicated'] == 0
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    store = Cache("singleflight", MemoryBackend())
+    monkeypatch.setattr(singleflight, "get_cache", lambda namespace, ttl=None: store)
+    return store
+
+def test_shared_leader_publishes_its_outcome(shared_cache):
+    flight = SingleFlight("test", shared=True)
+    assert flight.do("key", lambda: [1, 2]) == [1, 2]
+    assert shared_cache.get("lock:test:key") is None
+
+def test_shared_follower_waits_for_remote_outcome(shared_cache):
+    shared_cache.add("lock:test:key", "remote")
+    shared_cache.set("outcome:test:remote", {'result': [1, 2]})
+    flight = SingleFlight("test", shared=True, poll_interval=0.01)
+    assert flight.do("key", lambda: pytest.fail("generated despite a remote leader")) == [1, 2]
+    assert flight.stats()['remote_followers'] == 1
+
+def test_shared_follower_raises_remote_errors(shared_cache):
+    shared_cache.add("lock:test:key", "remote")
+    shared_cache.set("outcome:test:remote", {'error': "ValueError: model unavailable"})
+    flight = SingleFlight("test", shared=True, poll_interval=0.01)
+    with pytest.raises(FlightError, match="model unavailable"):
+        flight.do("key", lambda: None)
+
+def test_shared_follower_generates_when_no_outcome_arrives(shared_cache):
+    shared_cache.add("lock:test:key", "remote")
+    flight = SingleFlight("test", shared=True, lock_ttl=0.1, poll_interval=0.01)
+    assert flight.do("key", lambda: "generated") == "generated"
+    assert flight.stats()['leaders'] == 1
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("true", True), ("Yes", True), (" on ", True),
+    ("0", False), ("false", False), ("NO", False), ("off", False), ("", False),
+    ("maybe", False),
+])
+def test_boolean_settings(monkeypatch, value, expected):
+    monkeypatch.setenv("SINGLEFLIGHT_SHARED", value)
+    assert singleflight._setting("SINGLEFLIGHT_SHARED") is expected
+
+def test_numeric_settings(monkeypatch):
+    monkeypatch.setenv("SINGLEFLIGHT_LOCK_TTL", "12")
+    assert singleflight._setting("SINGLEFLIGHT_LOCK_TTL") == 12.0
+    monkeypatch.delenv("SINGLEFLIGHT_POLL_INTERVAL", raising=False)
+    assert singleflight._setting("SINGLEFLIGHT_POLL_INTERVAL") == 0.1
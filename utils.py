@@ -1,6 +1,8 @@
 import streamlit as st
 import random
 
+from static_assets import stylesheet_html
+
 # Import assets for visualization
 try:
     from assets import styled_metric, styled_card
@@ -83,102 +85,8 @@ def generate_random_scenario():
 
 # Apply custom CSS for better UI
 def apply_custom_css():
-    st.markdown("""
-    <style>
-    .main {
-        background-color: #1e1e1e;
-    }
-    .stApp {
-        max-width: 1200px;
-        margin: 0 auto;
-    }
-    .stButton button {
-        background-color: #4e89ae;
-        color: white;
-        font-weight: bold;
-        border-radius: 10px;
-        padding: 0.5rem 1rem;
-        border: none;
-        transition: all 0.3s;
-    }
-    .stButton button:hover {
-        background-color: #43658b;
-        transform: translateY(-2px);
-        box-shadow: 0 5px 15px rgba(0,0,0,0.3);
-    }
-    .best-case {
-        background-color: rgba(40, 167, 69, 0.2);
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-left: 5px solid #28a745;
-    }
-    .worst-case {
-        background-color: rgba(220, 53, 69, 0.2);
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-left: 5px solid #dc3545;
-    }
-    .scenario-card {
-        background-color: #2d2d2d;
-        border-radius: 10px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.3);
-    }
-    .metrics-container {
-        display: flex;
-        justify-content: space-between;
-        flex-wrap: wrap;
-        margin: 1rem 0;
-    }
-    h1, h2, h3 {
-        color: #4e89ae;
-    }
-    .stProgress > div > div {
-        background-color: #4e89ae;
-    }
-    .status-thriving {
-        color: #28a745;
-        font-weight: bold;
-    }
-    .status-stable {
-        color: #17a2b8;
-        font-weight: bold;
-    }
-    .status-challenged {
-        color: #ffc107;
-        font-weight: bold;
-    }
-    .status-struggling {
-        color: #fd7e14;
-        font-weight: bold;
-    }
-    .status-critical {
-        color: #dc3545;
-        font-weight: bold;
-    }
-    .business-health-container {
-        background-color: #2d2d2d;
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 1rem 0;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.3);
-        text-align: center;
-    }
-    .decision-history {
-        max-height: 300px;
-        overflow-y: auto;
-    }
-    .metrics-box {
-        border: 2px solid #4e89ae;
-        border-radius: 0.5rem;
-        padding: 1rem;
-        margin-bottom: 1rem;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    """Apply the app stylesheet, built once into static/ by static_assets.py"""
+    st.markdown(stylesheet_html(), unsafe_allow_html=True)
 
 # Function to display visually appealing metric changes
 def display_metric_changes(consequences):